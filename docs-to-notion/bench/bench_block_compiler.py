@@ -0,0 +1,111 @@
+"""
+要素 → ブロック変換のベンチマーク。
+
+読み込み済みの要素（Word の DocElement、Excel の要素 dict）を、Markdown を経由する従来の方法
+（convert_to_markdown / excel_element_markdown → markdown_to_notion_blocks）と、
+block_compiler で直接ブロックにする方法で変換し、1文書あたりの CPU 時間と
+tracemalloc で数えたメモリ確保（残った数・ピーク・途中で捨てた分）を比較する。
+読み込みの時間は含めない。
+
+    python bench/bench_block_compiler.py                  # Word 300ページ・Excel 5000行
+    python bench/bench_block_compiler.py --pages 1000 --rows 20000
+"""
+import os, sys, time, argparse, tempfile, tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_word_reader import make_manual
+from bench_upload import make_workbooks
+from word_reader import read_word
+from excel_reader import read_excel, iter_elements
+from markdown_converter import convert_to_markdown, excel_element_markdown
+from block_builder import markdown_to_notion_blocks
+from block_compiler import word_blocks, sheet_element_blocks
+
+
+def word_via_markdown(elements):
+    return markdown_to_notion_blocks(convert_to_markdown(elements, source_type="word"))
+
+
+def sheet_via_markdown(elements):
+    blocks = []
+    for element in elements:
+        md = excel_element_markdown(element)
+        if md:
+            blocks.extend(markdown_to_notion_blocks(md))
+    return blocks
+
+
+def sheet_direct(elements):
+    blocks = []
+    for element in elements:
+        blocks.extend(sheet_element_blocks(element))
+    return blocks
+
+
+def cpu_time(fn, elements, repeat: int) -> float:
+    """repeat 回のうち最良の CPU 時間（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(elements)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def allocations(fn, elements):
+    """
+    1回の変換で tracemalloc が数えたメモリ確保。(残った確保の数, 残ったバイト数, ピークのバイト数)。
+    残るのは結果のブロックの分で、ピークとの差が途中で作って捨てたもの（Markdown 文字列など）。
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    blocks = fn(elements)
+    after = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del blocks
+    return count, current - start, peak - start
+
+
+def compare(label: str, elements, via_markdown, direct, repeat: int):
+    t_md, t_direct = cpu_time(via_markdown, elements, repeat), cpu_time(direct, elements, repeat)
+    (n_md, kept_md, peak_md), (n_direct, kept_direct, peak_direct) = (
+        allocations(via_markdown, elements), allocations(direct, elements))
+    print(f"{label}: {len(elements)} elements → {len(direct(elements))} blocks")
+    print(f"  CPU:       markdown {t_md * 1000:8.1f}ms  direct {t_direct * 1000:8.1f}ms"
+          f"  ({t_md / t_direct:.1f}x)")
+    print(f"  allocs:    markdown {n_md:8d}    direct {n_direct:8d}    (結果のブロックとして残った数)")
+    print(f"  peak:      markdown {peak_md / 1024:8.0f}KB  direct {peak_direct / 1024:8.0f}KB")
+    print(f"  transient: markdown {(peak_md - kept_md) / 1024:8.0f}KB  "
+          f"direct {(peak_direct - kept_direct) / 1024:8.0f}KB  (ピーク − 結果)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="要素 → ブロック変換のベンチマーク")
+    parser.add_argument("--pages", type=int, default=300, help="Word 文書のページ数")
+    parser.add_argument("--rows", type=int, default=5000, help="Excel の表の行数")
+    parser.add_argument("--repeat", type=int, default=3, help="CPU 時間の計測回数（最良値を表示）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        docx_path = os.path.join(work, "manual.docx")
+        make_manual(docx_path, args.pages)
+        doc_elements = read_word(docx_path)
+        make_workbooks(work, 1, args.rows)
+        xlsx_path = next(os.path.join(work, f) for f in os.listdir(work) if f.endswith(".xlsx"))
+        sheet_elements = list(iter_elements(read_excel(xlsx_path)[0]))
+
+    print("\n=== bench_block_compiler ===")
+    compare(f"word ({args.pages} pages)", doc_elements, word_via_markdown, word_blocks, args.repeat)
+    compare(f"excel ({args.rows} rows)", sheet_elements, sheet_via_markdown, sheet_direct,
+            args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+markdown_to_notion_blocks のマイクロベンチマーク。
+
+日本語の業務文書を模した Markdown（議事録・手順書・名簿・規程・通知）ごとに変換を繰り返し、
+lines/s と blocks/s を表示する。インライン書式の解析と箇条書き記号の除去も単体で計る。
+--baseline に別の block_builder.py を渡すと、同じ入力で比較する（結果が同じことも確認する）。
+
+    python bench/bench_markdown_blocks.py
+    git show HEAD~1:docs-to-notion/src/block_builder.py > /tmp/old_block_builder.py
+    python bench/bench_markdown_blocks.py --baseline /tmp/old_block_builder.py
+"""
+import os, sys, time, argparse, importlib.util
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import block_builder
+
+
+def minutes(n: int) -> str:
+    """議事録: 見出し・日本語の箇条書き・決定事項（太字）・番号付きの次回までの課題"""
+    parts = ["# 第12回 業務改善委員会 議事録", "",
+             "日時：令和8年4月15日（水）14:00〜15:30", "場所：本庁舎 3階 第2会議室", ""]
+    for i in range(n):
+        parts += [f"## 議題{i + 1} 窓口業務の見直しについて", "",
+                  "・事務局より資料1に基づき、申請件数の推移と待ち時間の現状を説明した。",
+                  "・委員より、繁忙期の臨時窓口の設置について質問があった。",
+                  "● オンライン申請の利用率は前年度比で12ポイント増加している。",
+                  f"決定事項：**臨時窓口を{i % 3 + 2}月から試行する**こと。", "",
+                  "1. 事務局は試行計画を次回までに作成する", "2. 各課は必要な人員を報告する", ""]
+    return "\n".join(parts)
+
+
+def manual(n: int) -> str:
+    """手順書: 丸数字の手順・注意書き（※）・リンク・区切り線"""
+    parts = ["# 電子決裁システム 操作手順書", ""]
+    for i in range(n):
+        parts += [f"## {i + 1}. 起案の手順", "",
+                  "① ポータルにログインし、「文書管理」を開く。",
+                  "② 「新規起案」を選び、件名と文書分類を入力する。",
+                  "③ 添付ファイルを登録し、決裁ルートを確認する。",
+                  "※ 決裁ルートを変更する場合は、*所属長の承認*が必要です。",
+                  "詳しくは [操作マニュアル](https://intra.example.jp/manual) を参照してください。",
+                  "", "---", ""]
+    return "\n".join(parts)
+
+
+def roster(n: int) -> str:
+    """名簿: 1つの大きな表"""
+    parts = ["# 委員会名簿", "", "| 氏名 | 所属 | 役職 | 任期 | 備考 |", "| --- | --- | --- | --- | --- |"]
+    parts += [f"| 委員{i} | 第{i % 7 + 1}部 {i % 4 + 1}課 | {'委員長' if i == 0 else '委員'} "
+              f"| 2026-04-01〜2028-03-31 | {'欠席' if i % 9 == 0 else ''} |" for i in range(n)]
+    return "\n".join(parts)
+
+
+def regulation(n: int) -> str:
+    """規程: 長い本文の段落（書式記号なし）と条項の番号付きリスト"""
+    parts = ["# 文書管理規程", ""]
+    for i in range(n):
+        parts += [f"### 第{i + 1}条（目的）", "",
+                  "この規程は、本会における文書の作成、収受、保存及び廃棄に関し必要な事項を定め、"
+                  "事務の適正かつ能率的な遂行に資することを目的とする。" * 3, "",
+                  "1. 文書は、正確かつ迅速に取り扱わなければならない。",
+                  "2. 文書は、常にその所在を明らかにしておかなければならない。", ""]
+    return "\n".join(parts)
+
+
+def notice(n: int) -> str:
+    """通知: 書式付きの短い段落が続く文書"""
+    parts = ["# 令和8年度 健康診断の実施について（通知）", ""]
+    for i in range(n):
+        parts += [f"**対象者**：{i + 1}班の職員（~~非常勤職員を除く~~ 全職員）",
+                  "実施日は別紙のとおりです。都合が悪い場合は**必ず**人事課へ連絡してください。",
+                  "→ 受診票は各所属長から配布します。", ""]
+    return "\n".join(parts)
+
+
+DOCUMENTS = (("議事録", minutes), ("手順書", manual), ("名簿", roster),
+             ("規程", regulation), ("通知", notice))
+
+
+def load_baseline(path: str):
+    spec = importlib.util.spec_from_file_location("baseline_block_builder", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_time(fn, arg, repeat: int, number: int) -> float:
+    """number 回の実行を repeat 回計り、1回あたりの最良の時間（秒）を返す"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="markdown_to_notion_blocks のマイクロベンチマーク")
+    parser.add_argument("--size", type=int, default=200, help="各文書の繰り返し単位の数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=3, help="1回の計測で変換する回数")
+    parser.add_argument("--baseline", help="比較する別の block_builder.py")
+    args = parser.parse_args()
+
+    modules = [("current", block_builder)]
+    if args.baseline:
+        modules.insert(0, ("baseline", load_baseline(args.baseline)))
+
+    print("\n=== bench_markdown_blocks ===")
+    print(f"{'document':<8} {'impl':<9} {'lines':>7} {'blocks':>7} {'ms':>8} "
+          f"{'lines/s':>10} {'blocks/s':>10}")
+    for name, make in DOCUMENTS:
+        markdown = make(args.size)
+        lines = markdown.count("\n") + 1
+        results = []
+        for label, module in modules:
+            blocks = module.markdown_to_notion_blocks(markdown)
+            results.append(blocks)
+            t = best_time(module.markdown_to_notion_blocks, markdown, args.repeat, args.number)
+            print(f"{name:<8} {label:<9} {lines:>7} {len(blocks):>7} {t * 1000:>8.2f} "
+                  f"{lines / t:>10.0f} {len(blocks) / t:>10.0f}")
+        assert all(r == results[0] for r in results), f"{name}: 変換結果が異なります"
+
+    # 行単位の処理を単体で計る（1行あたりの変換回数/s）
+    samples = (
+        ("inline plain", "_parse_inline_markdown",
+         "この規程は、本会における文書の作成、収受、保存及び廃棄に関し必要な事項を定める。"),
+        ("inline marks", "_parse_inline_markdown",
+         "**対象者**：全職員（~~非常勤~~）。詳しくは [案内](https://intra.example.jp) を参照。"),
+        ("list prefix", "clean_list_text", "・（1）申請書を提出する"),
+    )
+    print(f"\n{'line':<13} {'impl':<9} {'ops/s':>10}")
+    for name, func, text in samples:
+        for label, module in modules:
+            fn = getattr(module, func)
+            t = best_time(fn, text, args.repeat, 20000)
+            print(f"{name:<13} {label:<9} {1 / t:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+結合セル判定のベンチマーク。
+
+結合範囲の多いシート（委員会名簿を想定）で、セルごとに全結合範囲を走査する
+従来の判定と、merged_cell_index による集合引きの判定を比較する。
+
+    python bench/bench_merged_cells.py
+    python bench/bench_merged_cells.py --rows 2000 --merges 300   # 実データ相当（従来方式は数分かかる）
+"""
+import os, sys, time, argparse, tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import openpyxl
+from excel_reader import read_excel, merged_cell_index
+
+
+def make_workbook(path: str, rows: int, cols: int, merges: int):
+    """rows × cols のセルと、縦横に散らばった結合範囲を持つブックを作成する"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "名簿"
+    for r in range(1, rows + 1):
+        ws.append([f"値{r}-{c}" for c in range(1, cols + 1)])
+    step = max(rows // max(merges, 1), 2)
+    for n in range(merges):
+        top = 1 + n * step
+        if top + 1 > rows:
+            break
+        if n % 2:
+            ws.merge_cells(start_row=top, start_column=1, end_row=top, end_column=cols)
+        else:
+            ws.merge_cells(start_row=top, start_column=2, end_row=top + 1, end_column=2)
+    wb.save(path)
+
+
+def scan_linear(ws) -> int:
+    ranges = list(ws.merged_cells.ranges)
+    return sum(1 for row in ws.iter_rows() for cell in row
+               if any(cell.coordinate in mr for mr in ranges))
+
+
+def scan_indexed(ws) -> int:
+    merged = merged_cell_index(ws.merged_cells.ranges)
+    return sum(1 for row in ws.iter_rows() for cell in row
+               if (cell.row, cell.column) in merged)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="結合セル判定のベンチマーク")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--merges", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, "merged.xlsx")
+        make_workbook(path, args.rows, args.cols, args.merges)
+        ws = openpyxl.load_workbook(path, data_only=True).active
+        ranges = len(ws.merged_cells.ranges)
+
+        linear, t_linear = timed(scan_linear, ws)
+        indexed, t_indexed = timed(scan_indexed, ws)
+        assert linear == indexed, (linear, indexed)
+        _, t_read = timed(read_excel, path)
+
+    cells = args.rows * args.cols
+    print("\n=== bench_merged_cells ===")
+    print(f"cells: {cells}, merged ranges: {ranges}, merged cells: {indexed}")
+    print(f"linear scan : {t_linear:.3f}s")
+    print(f"indexed     : {t_indexed:.3f}s  ({t_linear / t_indexed:.1f}x)")
+    print(f"read_excel  : {t_read:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
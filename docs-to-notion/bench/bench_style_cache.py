@@ -0,0 +1,97 @@
+"""
+書式判定（太字・フォントサイズ・背景色）のマイクロベンチマーク。
+
+10万セルのシートで、セルごとに cell.font / cell.fill のスタイルプロキシを辿る従来の方法と、
+StyleCache によるスタイルID単位のメモ化を比較する（通常モード・読み取り専用モードの両方）。
+
+    python bench/bench_style_cache.py
+    python bench/bench_style_cache.py --rows 20000 --cols 10 --styles 40
+"""
+import os, sys, time, argparse, tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+import openpyxl
+from openpyxl.styles import Font, PatternFill
+from excel_reader import StyleCache, read_excel
+
+COLORS = ["FFFF00", "DDEBF7", "FCE4D6", "E2EFDA", "FFF2CC"]
+
+
+def make_workbook(path: str, rows: int, cols: int, styles: int):
+    """rows × cols のセルに styles 種類の書式を巡回で割り当てたブックを作成する"""
+    palette = []
+    for n in range(styles):
+        font = Font(bold=bool(n % 2), size=10 + n % 5)
+        fill = PatternFill("solid", start_color=COLORS[n % len(COLORS)]) if n % 3 == 0 else PatternFill()
+        palette.append((font, fill))
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for r in range(1, rows + 1):
+        for c in range(1, cols + 1):
+            cell = ws.cell(r, c, f"値{r}-{c}")
+            cell.font, cell.fill = palette[(r * cols + c) % styles]
+    wb.save(path)
+
+
+def scan_proxy(ws) -> int:
+    """従来の方法: セルごとにスタイルプロキシから読む"""
+    hits = 0
+    for row in ws.iter_rows():
+        for cell in row:
+            try:
+                bg = cell.fill.start_color.rgb if cell.fill and cell.fill.start_color else None
+                bg = bg if bg and bg != "00000000" else None
+            except Exception:
+                bg = None
+            bold = cell.font.bold if cell.font else False
+            size = cell.font.size if cell.font else None
+            hits += bool(bold) + bool(bg) + bool(size)
+    return hits
+
+
+def scan_cached(ws, styles: StyleCache) -> int:
+    hits = 0
+    for row in ws.iter_rows():
+        for cell in row:
+            bold, size, has_bg = styles.lookup(cell)
+            hits += bool(bold) + bool(has_bg) + bool(size)
+    return hits
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="書式判定のベンチマーク")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--styles", type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, "styles.xlsx")
+        make_workbook(path, args.rows, args.cols, args.styles)
+        print("\n=== bench_style_cache ===")
+        print(f"cells: {args.rows * args.cols}, styles: {args.styles}")
+        for read_only in (False, True):
+            wb = openpyxl.load_workbook(path, read_only=read_only, data_only=True)
+            ws = wb.worksheets[0]
+            proxy, t_proxy = timed(scan_proxy, ws)
+            styles = StyleCache(wb)
+            cached, t_cached = timed(scan_cached, ws, styles)
+            assert proxy == cached, (proxy, cached)
+            mode = "read-only" if read_only else "full     "
+            print(f"{mode}: proxy {t_proxy:.3f}s, cached {t_cached:.3f}s "
+                  f"({t_proxy / t_cached:.1f}x, {len(styles._memo)} distinct)")
+            wb.close()
+        _, t_read = timed(read_excel, path)
+        print(f"read_excel: {t_read:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+アップロード処理のスループット計測。
+
+fake_notion_server をローカルに立ち上げ、main.py と同じパイプライン
+（読み込み → Markdown → ブロック → アップロード）で入力ファイルを処理して、
+ページあたりのリクエスト数・所要時間・応答時間の p50/p99・再試行数を表示する。
+
+    python bench/bench_upload.py --files 20 --rows 300 --workers 4 --latency 0.15
+    python bench/bench_upload.py --input path/to/samples --rate-429 0.05
+    python bench/bench_upload.py --images --files 50   # 共通のロゴ入りの Word 文書
+"""
+import os, sys, time, zlib, struct, shutil, argparse, tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_notion_server import FakeNotionState, start_server
+
+
+def make_workbooks(out_dir: str, files: int, rows: int):
+    """委員会名簿風の合成Excelファイルを作成する"""
+    import openpyxl
+    from openpyxl.styles import Font
+    for n in range(files):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "名簿"
+        ws["A1"] = f"R8 委員会名簿 {n}"
+        ws["A1"].font = Font(bold=True, size=14)
+        ws.merge_cells("A1:E1")
+        ws.append([])
+        ws.append(["氏名", "所属", "役職", "任期", "備考"])
+        for r in range(rows):
+            ws.append([f"氏名{r}", f"第{r % 7}部", "委員", "2026-04-01", "特記事項なし" if r % 5 else ""])
+        ws.append([])
+        ws.append(["※本名簿は委員会事務局が管理しています。" * 3])
+        wb.save(os.path.join(out_dir, f"委員会_{n:03d}.xlsx"))
+
+
+def make_png(rgb: tuple, size: int = 64) -> bytes:
+    """単色の PNG を作る（Pillow を使わない）"""
+    raw = b"".join(b"\0" + bytes(rgb) * size for _ in range(size))
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data)))
+
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def make_documents(out_dir: str, files: int, rows: int):
+    """全文書に共通のロゴ・印影と、文書ごとに異なる図を1つずつ含む合成Word文書を作成する"""
+    from docx import Document
+    logo, stamp = os.path.join(out_dir, "logo.png"), os.path.join(out_dir, "stamp.png")
+    with open(logo, "wb") as f:
+        f.write(make_png((20, 60, 160)))
+    with open(stamp, "wb") as f:
+        f.write(make_png((200, 30, 30)))
+    for n in range(files):
+        doc = Document()
+        doc.add_picture(logo)
+        doc.add_heading(f"R8 委員会報告 {n}", level=1)
+        for r in range(rows // 10):
+            doc.add_paragraph(f"報告事項{r}: 特記事項なし。" * 3)
+        figure = os.path.join(out_dir, f"figure_{n}.png")
+        with open(figure, "wb") as f:
+            f.write(make_png((n % 256, (n * 7) % 256, 90)))
+        doc.add_picture(figure)
+        doc.add_picture(stamp)
+        doc.save(os.path.join(out_dir, f"委員会報告_{n:03d}.docx"))
+        os.remove(figure)
+    os.remove(logo)
+    os.remove(stamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notion アップロードのベンチマーク")
+    parser.add_argument("--input", help="入力ファイルのフォルダ（省略時は合成Excelを生成）")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--parse-workers", type=int, default=1, help="変換に使うプロセス数")
+    parser.add_argument("--table-db-rows", type=int, default=0,
+                        help="この行数以上の表をインラインデータベースにする（0 = 表ブロック）")
+    parser.add_argument("--async", dest="use_async", action="store_true")
+    parser.add_argument("--rate", type=float, default=3.0, help="クライアント側のレート上限 (req/s)")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.03)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--server-rate", type=float, default=0.0)
+    parser.add_argument("--images", action="store_true",
+                        help="合成Excelの代わりに画像入りの Word 文書を生成する")
+    args = parser.parse_args()
+
+    state = FakeNotionState(args.latency, args.jitter, args.rate_429, args.retry_after,
+                            args.server_rate)
+    server, base_url = start_server(state)
+    os.environ["NOTION_API_KEY"] = "fake-token"
+    os.environ["NOTION_BASE_URL"] = base_url
+    os.environ["NOTION_RATE_LIMIT"] = str(args.rate)
+    os.environ["NOTION_TABLE_DB_ROWS"] = str(args.table_db_rows)
+    work = tempfile.mkdtemp(prefix="bench_upload_")
+    os.environ["NOTION_MEDIA_DIR"] = os.path.join(work, "media")
+
+    import asyncio
+    import main as pipeline
+    from rate_limiter import RequestScheduler, AsyncRequestScheduler
+    from notion_client_wrapper import NotionPageCreator, AsyncNotionPageCreator
+
+    try:
+        input_dir = os.path.join(work, "input")
+        os.makedirs(input_dir)
+        if args.input:
+            for name in os.listdir(args.input):
+                if os.path.splitext(name)[1].lower() in pipeline.SUPPORTED:
+                    shutil.copy(os.path.join(args.input, name), input_dir)
+        elif args.images:
+            make_documents(input_dir, args.files, args.rows)
+        else:
+            make_workbooks(input_dir, args.files, args.rows)
+        pipeline.ARCHIVE_DIR = os.path.join(work, "archive")
+        files = sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir))
+
+        started = time.perf_counter()
+        if args.use_async:
+            creator = AsyncNotionPageCreator(scheduler=AsyncRequestScheduler(rate=args.rate),
+                                             max_connections=max(args.workers, 1))
+            stats = asyncio.run(pipeline.run_files_async(files, creator, workers=args.workers,
+                                                         parse_workers=args.parse_workers))
+        else:
+            creator = NotionPageCreator(scheduler=RequestScheduler(rate=args.rate))
+            stats = pipeline.run_files(files, creator, workers=args.workers,
+                                       parse_workers=args.parse_workers)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        shutil.rmtree(work, ignore_errors=True)
+
+    scheduler = creator.scheduler
+    # カテゴリーフォルダ・インラインデータベースの行を除いた、データベース項目として作られたページ数
+    pages = max(1, sum(1 for p in state.pages.values() if "Name" in p["properties"]))
+    db_rows = sum(db["rows"] for db in state.databases.values())
+    print("\n=== bench_upload ===")
+    print(f"files: {stats['files']} ok / {stats['failed']} failed, pages: {pages}, blocks: {stats['blocks']}")
+    if state.databases:
+        print(f"inline databases: {len(state.databases)}, rows: {db_rows}")
+    print(f"wall time: {elapsed:.2f}s  ({stats['blocks'] / elapsed:.1f} blocks/s)")
+    print(f"requests: {scheduler.stats['sent']}  ({scheduler.stats['sent'] / pages:.2f} / page)")
+    print(f"latency: p50 {scheduler.latency_percentile(50) * 1000:.0f}ms, "
+          f"p99 {scheduler.latency_percentile(99) * 1000:.0f}ms")
+    print(f"retries: {scheduler.stats['retried']}, throttled: {scheduler.stats['throttled']}, "
+          f"failed: {scheduler.stats['failed']}")
+    if state.uploads:
+        images = sum(1 for blocks in state.children.values() for b in blocks if b["type"] == "image")
+        print(f"images: {images} blocks, {len(state.uploads)} uploads")
+    print(f"server: {state.stats}  {state.by_endpoint}")
+
+
+if __name__ == "__main__":
+    main()
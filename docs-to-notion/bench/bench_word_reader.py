@@ -0,0 +1,100 @@
+"""
+Word 読み込みのベンチマーク。
+
+手順書を模した文書（見出し・書式付き本文・箇条書き・番号付きリスト・結合セルを含む表）を
+python-docx で作成し、python-docx のオブジェクトを経由する read_word_docx と、
+document.xml を lxml で1回だけ読む read_word を比較する。両者の結果が一致することも確認する。
+
+    python bench/bench_word_reader.py              # 300ページ相当
+    python bench/bench_word_reader.py --pages 1000
+"""
+import os, sys, time, argparse, tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from word_reader import read_word, read_word_docx
+
+# 既定テンプレートの numbering.xml: numId 1 = 箇条書き、numId 5 = 番号付き
+BULLET_NUM_ID, DECIMAL_NUM_ID = "1", "5"
+
+
+def make_manual(path: str, pages: int):
+    """1ページ ≒ 見出し1つ・本文4段落・リスト4項目、2ページごとに表1つの文書を作成する"""
+    doc = Document()
+    doc.add_heading("業務手順書", level=0)
+    for page in range(1, pages + 1):
+        if page % 10 == 1:
+            doc.add_heading(f"第{page // 10 + 1}章 概要", level=1)
+        doc.add_heading(f"{page}. 作業手順", level=2)
+        for n in range(4):
+            para = doc.add_paragraph(f"手順{page}-{n}の説明です。")
+            para.add_run("必ず確認すること").bold = True
+            para.add_run("。担当者は").italic = True
+            para.add_run("申請書").underline = True
+            para.add_run("を記入し、上長の承認を得てから次の作業に進みます。" * 2)
+        for n in range(4):
+            numbered = n % 2
+            para = doc.add_paragraph(f"項目{page}-{n}",
+                                     style="List Number" if numbered else "List Bullet")
+            _set_num(para, DECIMAL_NUM_ID if numbered else BULLET_NUM_ID, n // 2)
+        if page % 2 == 0:
+            table = doc.add_table(rows=8, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"R{r}C{c}"
+            table.cell(0, 0).merge(table.cell(0, 1))
+            table.cell(2, 3).merge(table.cell(4, 3))
+    doc.save(path)
+
+
+def _set_num(para, num_id: str, ilvl: int):
+    ppr = para._p.get_or_add_pPr()
+    num_pr = OxmlElement("w:numPr")
+    for tag, value in (("w:ilvl", ilvl), ("w:numId", num_id)):
+        el = OxmlElement(tag)
+        el.set(qn("w:val"), str(value))
+        num_pr.append(el)
+    ppr.append(num_pr)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word 読み込みのベンチマーク")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3, help="各方式の実行回数（最良値を表示）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, "manual.docx")
+        make_manual(path, args.pages)
+        print("\n=== bench_word_reader ===")
+        print(f"pages: {args.pages}, size: {os.path.getsize(path) / 1024:.0f}KB")
+
+        best = {}
+        for name, reader in (("python-docx", read_word_docx), ("lxml", read_word)):
+            times = []
+            for _ in range(args.repeat):
+                elements, t = timed(reader, path)
+                times.append(t)
+            best[name] = (elements, min(times))
+
+        (docx_elements, t_docx), (fast_elements, t_fast) = best["python-docx"], best["lxml"]
+        assert docx_elements == fast_elements, "read_word と read_word_docx の結果が異なります"
+        counts = {}
+        for el in fast_elements:
+            counts[el.type] = counts.get(el.type, 0) + 1
+        print(f"elements: {len(fast_elements)} {counts}")
+        print(f"python-docx: {t_docx:.3f}s, lxml: {t_fast:.3f}s ({t_docx / t_fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Word の表の解析のベンチマーク。
+
+結合セル（横結合・縦結合）を含む大きな表を作成し、python-docx の Table / row.cells を
+行ごとに2回辿って重複を除く従来の方法と、w:tr / w:tc を直接読む parse_table を比較する。
+
+    python bench/bench_word_tables.py               # 1000行 × 8列
+    python bench/bench_word_tables.py --rows 5000
+"""
+import os, sys, time, argparse, tempfile, zipfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "src"))
+
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from lxml import etree
+from word_reader import W_NS, parse_table
+
+
+def make_document(path: str, rows: int, cols: int):
+    """見出し行・10行ごとの縦結合・5行ごとの横結合を持つ rows × cols の表の文書を作成する"""
+    doc = Document()
+    table = doc.add_table(rows=rows, cols=cols)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"列{c}" if r == 0 else f"手順{r}-{c}"
+    for r in range(1, rows - 10, 10):
+        table.cell(r, 0).merge(table.cell(r + 9, 0))
+    for r in range(3, rows, 5):
+        table.cell(r, cols - 2).merge(table.cell(r, cols - 1))
+    doc.save(path)
+
+
+def proxy_parse(tbl, doc):
+    """従来の方法: python-docx のプロキシで row.cells を辿り、_tc の id で重複を除く"""
+    rows_data = []
+    for row in Table(tbl, doc).rows:
+        texts = [cell.text.strip() for cell in row.cells]
+        seen, unique = set(), []
+        for i, cell in enumerate(row.cells):
+            if id(cell._tc) not in seen:
+                seen.add(id(cell._tc))
+                unique.append(texts[i])
+        rows_data.append(unique)
+    return rows_data
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Word の表の解析のベンチマーク")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--cols", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        path = os.path.join(work, "table.docx")
+        make_document(path, args.rows, args.cols)
+        doc = Document(path)
+        tbl = doc.element.body.find(qn("w:tbl"))
+        # read_word と同じく python-docx の要素クラスを使わない lxml の木で計る
+        with zipfile.ZipFile(path) as zf:
+            plain_tbl = etree.fromstring(zf.read("word/document.xml")).find(f".//{{{W_NS}}}tbl")
+
+        print("\n=== bench_word_tables ===")
+        print(f"table: {args.rows} rows × {args.cols} cols")
+        proxy_rows, t_proxy = timed(proxy_parse, tbl, doc)
+        element, t_grid = timed(parse_table, plain_tbl)
+        grid_rows = element.children
+        assert len(proxy_rows) == len(grid_rows) == args.rows
+        # 横結合で覆われた列（parse_table では空欄）を除けば従来と同じ値になる
+        covered = {(s["row"] + i, s["col"] + j) for s in element.metadata["spans"]
+                   for i in range(s["rows"]) for j in range(1, s["cols"])}
+        for r, (old, new) in enumerate(zip(proxy_rows, grid_rows)):
+            assert old == [v for c, v in enumerate(new) if (r, c) not in covered], (r, old, new)
+        print(f"spans: {len(element.metadata['spans'])}, header rows: {element.metadata['header_rows']}")
+        print(f"proxy: {t_proxy:.3f}s, parse_table: {t_grid * 1000:.1f}ms ({t_proxy / t_grid:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+ローカルで動く Notion API の代用サーバー（性能測定・回帰確認用）。
+
+実装しているエンドポイント:
+- POST   /v1/pages                 ページ作成（children 付き、親はページまたはデータベース）
+- POST   /v1/databases             インラインデータベース作成
+- GET    /v1/pages/{id}            ページ取得
+- PATCH  /v1/pages/{id}            プロパティ更新
+- PATCH  /v1/blocks/{id}/children  ブロック追加（after 指定可）
+- GET    /v1/blocks/{id}/children  子ブロック一覧（ページング）
+- DELETE /v1/blocks/{id}           ブロック削除
+- POST   /v1/search                タイトル検索
+- POST   /v1/file_uploads          ファイルアップロード作成（single_part / multi_part）
+- POST   /v1/file_uploads/{id}/send      ファイル（パート）送信（multipart/form-data）
+- POST   /v1/file_uploads/{id}/complete  multi_part の完了
+
+遅延（平均・ゆらぎ）、429 の注入率、サーバー側のレート制限を設定でき、
+リクエストは本物と同じ上限（配列100件・要素1000件・500KB・テキスト2000文字）で検証する。
+file_upload を参照する image ブロックは、送信が済んだアップロードを指しているかも検証する。
+
+単体起動:
+    python bench/fake_notion_server.py --port 8787 --latency 0.2 --rate-429 0.05
+"""
+import re, json, time, uuid, random, argparse, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+MAX_ARRAY = 100
+MAX_BLOCK_ELEMENTS = 1000
+MAX_PAYLOAD_BYTES = 500_000
+MAX_TEXT = 2000
+MAX_PART_BYTES = 20 * 1024 * 1024
+PART_NUMBER = re.compile(rb'name="part_number"\r\n\r\n(\d+)')
+
+
+class FakeNotionState:
+    """ページ・ブロックと統計情報を保持する"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_429: float = 0.0,
+                 retry_after: float = 1.0, server_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.server_rate = server_rate   # 0 ならサーバー側のレート制限なし
+        self.lock = threading.Lock()
+        self.pages = {}       # page_id -> {"title", "properties", "archived"}
+        self.children = {}    # parent_id -> [block, ...]
+        self.blocks = {}      # block_id -> (parent_id, block)
+        self.databases = {}   # database_id -> {"parent_id", "properties", "rows"}
+        self.uploads = {}     # file_upload_id -> {"filename", "parts", "received", "status", "bytes"}
+        self.stats = {"requests": 0, "rejected_429": 0, "invalid": 0}
+        self.by_endpoint = {}
+        self._window = []     # サーバー側レート制限の直近リクエスト時刻
+
+    def count(self, endpoint: str):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+
+    def should_throttle(self) -> bool:
+        with self.lock:
+            if self.rate_429 and random.random() < self.rate_429:
+                self.stats["rejected_429"] += 1
+                return True
+            if self.server_rate:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.server_rate:
+                    self.stats["rejected_429"] += 1
+                    return True
+                self._window.append(now)
+        return False
+
+    def add_children(self, parent_id: str, blocks: list, after: str = None) -> list:
+        created = []
+        for block in blocks:
+            block = dict(block)
+            block["id"] = str(uuid.uuid4())
+            block["object"] = "block"
+            created.append(block)
+        with self.lock:
+            siblings = self.children.setdefault(parent_id, [])
+            pos = len(siblings)
+            if after:
+                ids = [b["id"] for b in siblings]
+                pos = ids.index(after) + 1 if after in ids else len(siblings)
+            siblings[pos:pos] = created
+            for block in created:
+                self.blocks[block["id"]] = (parent_id, block)
+        return created
+
+
+def validate_children(children: list, uploads: dict = None) -> str:
+    """上限違反・アップロードされていない画像の参照があればエラーメッセージを返す"""
+    if len(children) > MAX_ARRAY:
+        return f"body.children.length should be ≤ {MAX_ARRAY}, instead was {len(children)}."
+    total = 0
+    stack = list(children)
+    while stack:
+        block = stack.pop()
+        total += 1
+        body = block.get(block.get("type"), {})
+        if not isinstance(body, dict):
+            continue
+        nested = body.get("children", [])
+        if len(nested) > MAX_ARRAY:
+            return f"children array of {block.get('type')} exceeds {MAX_ARRAY} elements."
+        stack.extend(nested)
+        if uploads is not None and body.get("type") == "file_upload":
+            upload_id = body.get("file_upload", {}).get("id")
+            if uploads.get(upload_id, {}).get("status") != "uploaded":
+                return f"File upload {upload_id} has not been uploaded."
+        for rt in body.get("rich_text", []):
+            if len(rt.get("text", {}).get("content", "")) > MAX_TEXT:
+                return f"rich_text content exceeds {MAX_TEXT} characters."
+        for cell in body.get("cells", []):
+            for rt in cell:
+                if len(rt.get("text", {}).get("content", "")) > MAX_TEXT:
+                    return f"table cell content exceeds {MAX_TEXT} characters."
+    if total > MAX_BLOCK_ELEMENTS:
+        return f"request exceeds {MAX_BLOCK_ELEMENTS} block elements ({total})."
+    return ""
+
+
+def validate_properties(properties: dict, schema: dict = None) -> str:
+    """プロパティ値の上限違反・スキーマにない列があればエラーメッセージを返す"""
+    for name, value in properties.items():
+        if schema is not None and name not in schema:
+            return f"{name} is not a property that exists."
+        for key in ("title", "rich_text"):
+            items = value.get(key, []) if isinstance(value, dict) else []
+            if len(items) > MAX_ARRAY:
+                return f"body.properties.{name}.{key}.length should be ≤ {MAX_ARRAY}."
+            for rt in items:
+                if len(rt.get("text", {}).get("content", "")) > MAX_TEXT:
+                    return f"body.properties.{name}.{key}[].text.content.length should be ≤ {MAX_TEXT}."
+    return ""
+
+
+def make_handler(state: FakeNotionState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # キープアライブ
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: dict, headers: dict = None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, status: int, code: str, message: str, headers: dict = None):
+            self._send(status, {"object": "error", "status": status, "code": code,
+                                "message": message}, headers)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            if self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+                return raw, {}
+            return raw, (json.loads(raw) if raw else {})
+
+        def _handle(self, method: str):
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p][1:]  # "v1" を除く
+            raw, body = self._body()
+            endpoint = f"{method} /{parts[0] if parts else ''}"
+            if len(parts) > 2:
+                endpoint += f"/*/{parts[2]}"
+            state.count(endpoint)
+
+            if state.latency or state.jitter:
+                time.sleep(max(0.0, random.gauss(state.latency, state.jitter)))
+            if state.should_throttle():
+                return self._error(429, "rate_limited", "Rate limited",
+                                   {"Retry-After": str(state.retry_after)})
+            limit = MAX_PART_BYTES if parts[:1] == ["file_uploads"] else MAX_PAYLOAD_BYTES
+            if len(raw) > limit:
+                state.stats["invalid"] += 1
+                return self._error(413, "validation_error", "Request body too large.")
+
+            route = (method, parts[0] if parts else "", len(parts))
+            handler = ROUTES.get(route)
+            if not handler:
+                return self._error(400, "invalid_request_url", f"Invalid request URL: {url.path}")
+            self.raw = raw
+            return handler(self, parts, body, parse_qs(url.query))
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+        # --- エンドポイント ---
+
+        def create_page(self, parts, body, query):
+            children = body.get("children", [])
+            # インポート先の既存データベースは存在するものとし、作成したデータベースだけ検証する
+            database = state.databases.get(body.get("parent", {}).get("database_id"))
+            error = (validate_children(children, state.uploads)
+                     or validate_properties(body.get("properties", {}),
+                                            database["properties"] if database else None))
+            if error:
+                state.stats["invalid"] += 1
+                return self._error(400, "validation_error", error)
+            page_id = str(uuid.uuid4())
+            props = body.get("properties", {})
+            title_prop = props.get("title") or props.get("Name", {}).get("title", [])
+            title = "".join(t.get("text", {}).get("content", "") for t in title_prop)
+            with state.lock:
+                state.pages[page_id] = {"title": title, "properties": props, "archived": False}
+                if database:
+                    database["rows"] += 1
+            state.add_children(page_id, children)
+            self._send(200, _page_json(page_id, title))
+
+        def create_database(self, parts, body, query):
+            parent_id = body.get("parent", {}).get("page_id")
+            if parent_id not in state.pages:
+                return self._error(404, "object_not_found", f"Could not find page with ID: {parent_id}.")
+            properties = (body.get("initial_data_source") or {}).get("properties") \
+                or body.get("properties", {})
+            if sum(1 for p in properties.values() if "title" in p) != 1:
+                state.stats["invalid"] += 1
+                return self._error(400, "validation_error", "Database must have exactly one title property.")
+            created = state.add_children(parent_id, [{"type": "child_database", "child_database": {}}])
+            database_id = created[0]["id"]
+            with state.lock:
+                state.databases[database_id] = {"parent_id": parent_id, "properties": properties,
+                                                "rows": 0}
+            self._send(200, {"object": "database", "id": database_id, "is_inline": True,
+                             "url": f"https://www.notion.so/{database_id.replace('-', '')}"})
+
+        def get_page(self, parts, body, query):
+            page = state.pages.get(parts[1])
+            if not page:
+                return self._error(404, "object_not_found", f"Could not find page with ID: {parts[1]}.")
+            self._send(200, {**_page_json(parts[1], page["title"]), "archived": page["archived"]})
+
+        def update_page(self, parts, body, query):
+            page = state.pages.get(parts[1])
+            if not page:
+                return self._error(404, "object_not_found", f"Could not find page with ID: {parts[1]}.")
+            page["properties"].update(body.get("properties", {}))
+            self._send(200, _page_json(parts[1], page["title"]))
+
+        def append_children(self, parts, body, query):
+            parent_id = parts[1]
+            if parent_id not in state.pages and parent_id not in state.blocks:
+                return self._error(404, "object_not_found", f"Could not find block with ID: {parent_id}.")
+            children = body.get("children", [])
+            error = validate_children(children, state.uploads)
+            if error:
+                state.stats["invalid"] += 1
+                return self._error(400, "validation_error", error)
+            created = state.add_children(parent_id, children, body.get("after"))
+            self._send(200, {"object": "list", "results": created, "has_more": False,
+                             "next_cursor": None})
+
+        def list_children(self, parts, body, query):
+            siblings = state.children.get(parts[1])
+            if siblings is None:
+                return self._error(404, "object_not_found", f"Could not find block with ID: {parts[1]}.")
+            size = min(int(query.get("page_size", ["100"])[0]), MAX_ARRAY)
+            start = int(query.get("start_cursor", ["0"])[0])
+            chunk = siblings[start:start + size]
+            more = start + size < len(siblings)
+            self._send(200, {"object": "list", "results": chunk, "has_more": more,
+                             "next_cursor": str(start + size) if more else None})
+
+        def delete_block(self, parts, body, query):
+            block_id = parts[1]
+            with state.lock:
+                entry = state.blocks.pop(block_id, None)
+                if entry:
+                    parent_id, block = entry
+                    state.children[parent_id] = [b for b in state.children[parent_id]
+                                                 if b["id"] != block_id]
+            if not entry:
+                return self._error(404, "object_not_found", f"Could not find block with ID: {block_id}.")
+            self._send(200, {**entry[1], "archived": True})
+
+        def search(self, parts, body, query):
+            q = body.get("query", "")
+            with state.lock:
+                hits = [_page_json(pid, p["title"]) for pid, p in state.pages.items()
+                        if q in p["title"] and not p["archived"]]
+            self._send(200, {"object": "list", "results": hits[:100], "has_more": False,
+                             "next_cursor": None})
+
+        def create_upload(self, parts, body, query):
+            mode = body.get("mode", "single_part")
+            count = int(body.get("number_of_parts") or 1) if mode == "multi_part" else 1
+            if mode not in ("single_part", "multi_part") or count < 1:
+                state.stats["invalid"] += 1
+                return self._error(400, "validation_error", f"Invalid file upload mode: {mode}.")
+            upload_id = str(uuid.uuid4())
+            with state.lock:
+                state.uploads[upload_id] = {"filename": body.get("filename"), "parts": count,
+                                            "received": set(), "status": "pending", "bytes": 0,
+                                            "multi_part": mode == "multi_part"}
+            self._send(200, _upload_json(upload_id, state.uploads[upload_id]))
+
+        def upload_action(self, parts, body, query):
+            upload = state.uploads.get(parts[1])
+            if not upload:
+                return self._error(404, "object_not_found", f"Could not find file upload with ID: {parts[1]}.")
+            if parts[2] == "send":
+                m = PART_NUMBER.search(self.raw)
+                number = int(m.group(1)) if m else 1
+                if upload["status"] != "pending" or not 1 <= number <= upload["parts"]:
+                    state.stats["invalid"] += 1
+                    return self._error(400, "validation_error", f"Invalid part number: {number}.")
+                with state.lock:
+                    upload["received"].add(number)
+                    upload["bytes"] += len(self.raw)
+                    if not upload["multi_part"]:
+                        upload["status"] = "uploaded"
+            elif parts[2] == "complete":
+                if not upload["multi_part"] or len(upload["received"]) != upload["parts"]:
+                    state.stats["invalid"] += 1
+                    return self._error(400, "validation_error", "File upload is not ready to complete.")
+                upload["status"] = "uploaded"
+            else:
+                return self._error(400, "invalid_request_url", f"Invalid request URL: {self.path}")
+            self._send(200, _upload_json(parts[1], upload))
+
+    ROUTES = {
+        ("POST", "pages", 1): Handler.create_page,
+        ("GET", "pages", 2): Handler.get_page,
+        ("PATCH", "pages", 2): Handler.update_page,
+        ("PATCH", "blocks", 3): Handler.append_children,
+        ("GET", "blocks", 3): Handler.list_children,
+        ("DELETE", "blocks", 2): Handler.delete_block,
+        ("POST", "search", 1): Handler.search,
+        ("POST", "databases", 1): Handler.create_database,
+        ("POST", "file_uploads", 1): Handler.create_upload,
+        ("POST", "file_uploads", 3): Handler.upload_action,
+    }
+    return Handler
+
+
+def _page_json(page_id: str, title: str) -> dict:
+    return {
+        "object": "page",
+        "id": page_id,
+        "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+        "archived": False,
+        "properties": {"title": {"title": [{"plain_text": title, "text": {"content": title}}]}},
+    }
+
+
+def _upload_json(upload_id: str, upload: dict) -> dict:
+    return {"object": "file_upload", "id": upload_id, "status": upload["status"],
+            "filename": upload["filename"], "number_of_parts": {
+                "total": upload["parts"], "sent_count": len(upload["received"])}}
+
+
+def start_server(state: FakeNotionState, port: int = 0):
+    """バックグラウンドスレッドでサーバーを起動し、(server, base_url) を返す"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notion API の代用サーバー")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="平均遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延の標準偏差（秒）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 を返す確率")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--server-rate", type=float, default=0.0,
+                        help="1秒あたりの許容リクエスト数（超過分は 429）")
+    args = parser.parse_args()
+
+    state = FakeNotionState(args.latency, args.jitter, args.rate_429, args.retry_after,
+                            args.server_rate)
+    server, base_url = start_server(state, args.port)
+    print(f"Fake Notion API: {base_url} (NOTION_BASE_URL に設定してください)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps({**state.stats, "by_endpoint": state.by_endpoint}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
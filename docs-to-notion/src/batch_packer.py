@@ -0,0 +1,113 @@
+"""
+Notion API のリクエスト上限に合わせてブロックをバッチに詰める。
+
+上限（https://developers.notion.com/reference/request-limits）:
+- 1つの配列（children, table_row など）は 100 要素まで
+- 1リクエスト内のブロック要素数はネストを含めて 1000 まで
+- ペイロードは 500KB まで
+
+固定の100件区切りではなく、ネストした子要素数とJSONのバイト数を数えながら
+上限ぎりぎりまで詰めることで、リクエスト数を最小にする。
+上限を超えるテーブルブロックは、見出し行を複製して複数のテーブルに分割する。
+インラインデータベースの擬似ブロック（database_builder）は常に単独のバッチにする。
+"""
+import json
+from typing import List
+from database_builder import is_database_block
+
+MAX_CHILDREN = 100
+MAX_BLOCK_ELEMENTS = 1000
+MAX_PAYLOAD_BYTES = 500_000
+# children 以外（parent, properties, JSONの枠など）のための余裕
+PAYLOAD_MARGIN = 10_000
+
+def payload_size(obj) -> int:
+    """送信時のJSONバイト数（非ASCIIをエスケープした場合の最大値で見積もる）"""
+    return len(json.dumps(obj, separators=(",", ":")))
+
+def count_elements(block: dict) -> int:
+    """ブロック自身とネストした子ブロックの総数"""
+    body = block.get(block.get("type"), {})
+    children = body.get("children", []) if isinstance(body, dict) else []
+    return 1 + sum(count_elements(c) for c in children)
+
+def pack_blocks(blocks: List[dict], first_reserve: int = 0) -> List[List[dict]]:
+    """
+    ブロックをリクエスト単位のバッチに分割する。
+    first_reserve: 最初のバッチ（pages.create）で properties などが使うバイト数
+    """
+    batches = []
+    current, elements, size = [], 0, 0
+    budget = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN - first_reserve
+
+    for block in _iter_split_oversized(blocks):
+        if is_database_block(block):
+            if current:
+                batches.append(current)
+            batches.append([block])
+            current, elements, size = [], 0, 0
+            budget = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN
+            continue
+        b_elements = count_elements(block)
+        b_size = payload_size(block) + 1  # 区切りのカンマ
+        if current and (len(current) >= MAX_CHILDREN
+                        or elements + b_elements > MAX_BLOCK_ELEMENTS
+                        or size + b_size > budget):
+            batches.append(current)
+            current, elements, size = [], 0, 0
+            budget = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN
+        current.append(block)
+        elements += b_elements
+        size += b_size
+
+    if current:
+        batches.append(current)
+    return batches
+
+def split_oversized_blocks(blocks: List[dict]) -> List[dict]:
+    """1リクエストに収まらないテーブルを分割した、実際にページ直下に並ぶブロック列を返す"""
+    return list(_iter_split_oversized(blocks))
+
+def _iter_split_oversized(blocks: List[dict]):
+    budget = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN
+    for block in blocks:
+        if block.get("type") == "table" and (
+                len(block["table"].get("children", [])) > MAX_CHILDREN
+                or count_elements(block) > MAX_BLOCK_ELEMENTS
+                or payload_size(block) > budget):
+            yield from split_table_block(block, budget)
+        else:
+            yield block
+
+def split_table_block(block: dict, max_bytes: int = MAX_PAYLOAD_BYTES - PAYLOAD_MARGIN) -> List[dict]:
+    """
+    テーブルブロックを行数・バイト数の上限に収まる複数のテーブルに分割する。
+    列見出しがある場合は各テーブルの先頭に見出し行を複製する。
+    """
+    table = block["table"]
+    rows = table.get("children", [])
+    has_header = table.get("has_column_header", False) and len(rows) > 1
+    header = rows[0] if has_header else None
+    body_rows = rows[1:] if has_header else rows
+
+    shell = {**block, "table": {**table, "children": []}}
+    base_size = payload_size(shell)
+    header_size = payload_size(header) + 1 if header else 0
+    max_rows = min(MAX_CHILDREN, MAX_BLOCK_ELEMENTS - 1)
+
+    chunks, current, size = [], [], base_size + header_size
+    for row in body_rows:
+        r_size = payload_size(row) + 1
+        if current and (len(current) + (1 if header else 0) >= max_rows
+                        or size + r_size > max_bytes):
+            chunks.append(current)
+            current, size = [], base_size + header_size
+        current.append(row)
+        size += r_size
+    if current or not chunks:
+        chunks.append(current)
+
+    return [
+        {**block, "table": {**table, "children": ([header] if header else []) + chunk}}
+        for chunk in chunks
+    ]
@@ -1,69 +1,129 @@
-from typing import List
+"""
+Markdown → Notion ブロックの変換（--debug-markdown の出力や手書きの Markdown の取り込み用）。
+
+行ごとに先頭の1文字で処理を選び（_LINE_HANDLERS）、startswith や正規表現を上から順に試さない。
+正規表現はすべてモジュール読み込み時にコンパイルし、書式記号（* ~ [）を含まない文字列は
+インライン書式の解析自体を省く。
+"""
+from typing import Callable, Dict, List
 import re
+from media_store import local_image_block
+
+IMAGE_LINE = re.compile(r"^!\[(.*?)\]\((.+)\)$")
+NUMBERED_LINE = re.compile(r"\d+\.\s")
+TABLE_SEPARATOR = re.compile(r"^\|[\s|:\-]+\|$")
+ESCAPED_PIPE_SPLIT = re.compile(r"(?<!\\)\|")
+# 箇条書き記号・番号の接頭辞（「・」「1.」「(1)」「①」の順に、あれば1つずつ除く）
+LIST_PREFIX = re.compile(r"^(?:[・●○■□◆※→]\s*)?(?:\d+[.）)]\s*)?(?:[（(]\d+[）)]\s*)?"
+                         r"(?:[①②③④⑤⑥⑦⑧⑨⑩]\s*)?")
+# インライン書式: bold > italic > strikethrough > link > plain text
+INLINE = re.compile(
+    r"(\*\*(.+?)\*\*)"       # group 1,2: bold
+    r"|(\*(.+?)\*)"           # group 3,4: italic
+    r"|(~~(.+?)~~)"           # group 5,6: strikethrough
+    r"|(\[(.+?)\]\((.+?)\))" # group 7,8,9: link
+    r"|([^*~\[]+)",           # group 10: plain text
+    re.DOTALL)
+
+# 日本語箇条書き記号
+JP_BULLETS = ("・", "●", "○", "■", "□", "◆", "※", "→")
+CIRCLED_NUMBERS = "①②③④⑤⑥⑦⑧⑨⑩"
 
 def markdown_to_notion_blocks(markdown: str) -> list:
     """MarkdownをNotionブロックのリストに変換する"""
     blocks = []
     lines = markdown.split("\n")
+    count = len(lines)
     i = 0
 
-    # 日本語箇条書き記号
-    JP_BULLETS = ("・", "●", "○", "■", "□", "◆", "※", "→")
-
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.strip()
-
-        if stripped.startswith("### "):
-            blocks.append(_heading_block(3, stripped[4:]))
-        elif stripped.startswith("## "):
-            blocks.append(_heading_block(2, stripped[3:]))
-        elif stripped.startswith("# "):
-            blocks.append(_heading_block(1, stripped[2:]))
-        elif stripped.startswith("|"):
+    while i < count:
+        stripped = lines[i].strip()
+        i += 1
+        if not stripped:
+            continue
+        first = stripped[0]
+        if first == "|":
             # テーブルブロック: 連続する|行をまとめる
-            table_lines = []
-            while i < len(lines) and lines[i].strip().startswith("|"):
-                table_lines.append(lines[i].strip())
+            table_lines = [stripped]
+            while i < count:
+                next_line = lines[i].strip()
+                if not next_line.startswith("|"):
+                    break
+                table_lines.append(next_line)
                 i += 1
-            i -= 1
             table_block = _build_table_block(table_lines)
             if table_block:
                 blocks.append(table_block)
-        elif stripped.startswith("- "):
-            text = _clean_jp_bullets(stripped[2:])
-            blocks.append(_list_block("bulleted", text))
-        elif re.match(r"^\d+\.\s", stripped):
-            text = re.sub(r"^\d+\.\s", "", stripped)
-            blocks.append(_list_block("numbered", text))
-        elif stripped == "---":
-            blocks.append({"object": "block", "type": "divider", "divider": {}})
-        elif stripped.startswith(JP_BULLETS):
-            # 日本語箇条書き記号で始まる行をbulletedリストとして扱う
-            text = _clean_jp_bullets(stripped)
-            blocks.append(_list_block("bulleted", text))
-        elif re.match(r"^[①②③④⑤⑥⑦⑧⑨⑩]", stripped):
-            text = re.sub(r"^[①②③④⑤⑥⑦⑧⑨⑩]\s*", "", stripped)
-            blocks.append(_list_block("bulleted", text))
-        elif stripped:
-            # 通常段落 - 2000文字制限対応
-            rich_text = _parse_inline_markdown(stripped)
-            for chunk in _split_rich_text(rich_text, 2000):
-                blocks.append({
-                    "object": "block", "type": "paragraph",
-                    "paragraph": {"rich_text": chunk}
-                })
-        i += 1
+            continue
+        handler = _LINE_HANDLERS.get(first)
+        if handler is None and first.isdecimal():
+            handler = _numbered_line
+        if handler is None or not handler(stripped, blocks):
+            _paragraph_line(stripped, blocks)
 
     return blocks
 
-def _clean_jp_bullets(text: str) -> str:
+def _heading_line(stripped: str, blocks: list) -> bool:
+    level = len(stripped) - len(stripped.lstrip("#"))
+    if level > 3 or stripped[level:level + 1] != " ":
+        return False
+    blocks.append(_heading_block(level, stripped[level + 1:]))
+    return True
+
+def _dash_line(stripped: str, blocks: list) -> bool:
+    if stripped.startswith("- "):
+        blocks.append(_list_block("bulleted", clean_list_text(stripped[2:])))
+    elif stripped == "---":
+        blocks.append({"object": "block", "type": "divider", "divider": {}})
+    else:
+        return False
+    return True
+
+def _numbered_line(stripped: str, blocks: list) -> bool:
+    m = NUMBERED_LINE.match(stripped)
+    if not m:
+        return False
+    blocks.append(_list_block("numbered", stripped[m.end():]))
+    return True
+
+def _image_line(stripped: str, blocks: list) -> bool:
+    # 画像（送信時に UploadEngine がアップロードして image ブロックにする）
+    m = IMAGE_LINE.match(stripped)
+    if not m:
+        return False
+    blocks.append(local_image_block(m.group(2), m.group(1)))
+    return True
+
+def _jp_bullet_line(stripped: str, blocks: list) -> bool:
+    # 日本語箇条書き記号で始まる行をbulletedリストとして扱う
+    blocks.append(_list_block("bulleted", clean_list_text(stripped)))
+    return True
+
+def _circled_number_line(stripped: str, blocks: list) -> bool:
+    blocks.append(_list_block("bulleted", stripped[1:].lstrip()))
+    return True
+
+def _paragraph_line(stripped: str, blocks: list):
+    # 通常段落 - 2000文字制限対応
+    for chunk in split_rich_text(_parse_inline_markdown(stripped), 2000):
+        blocks.append({
+            "object": "block", "type": "paragraph",
+            "paragraph": {"rich_text": chunk}
+        })
+
+# 行の先頭の文字 → 処理（False を返した行と、表にない文字で始まる行は通常段落。
+# 数字（全角を含む）は表に載せきれないため markdown_to_notion_blocks で判定する）
+_LINE_HANDLERS: Dict[str, Callable[[str, list], bool]] = {
+    "#": _heading_line,
+    "-": _dash_line,
+    "!": _image_line,
+    **{c: _jp_bullet_line for c in JP_BULLETS},
+    **{c: _circled_number_line for c in CIRCLED_NUMBERS},
+}
+
+def clean_list_text(text: str) -> str:
     """日本語箇条書き記号やプレフィックスを除去する"""
-    text = re.sub(r"^[・●○■□◆※→]\s*", "", text)
-    text = re.sub(r"^\d+[.）)]\s*", "", text)
-    text = re.sub(r"^[（(]\d+[）)]\s*", "", text)
-    text = re.sub(r"^[①②③④⑤⑥⑦⑧⑨⑩]\s*", "", text)
-    return text.strip()
+    return LIST_PREFIX.sub("", text, count=1).strip()
 
 def _heading_block(level: int, text: str) -> dict:
     level = min(level, 3)  # Notionは H1〜H3 のみ
@@ -82,62 +142,57 @@ def _parse_inline_markdown(text: str) -> list:
     """
     Markdownインライン書式をNotion rich_textに変換する。
     対応: **bold**, *italic*, ~~strikethrough~~, [text](url)
+    書式記号を含まない文字列（ほとんどの行）は1要素のテキストとしてそのまま返す。
     """
+    if "*" not in text and "~" not in text and "[" not in text:
+        return [{"type": "text", "text": {"content": text}}]
+
     rich_text = []
-    # パターン: bold > italic > strikethrough > link > plain text
-    pattern = (
-        r"(\*\*(.+?)\*\*)"       # group 1,2: bold
-        r"|(\*(.+?)\*)"           # group 3,4: italic
-        r"|(~~(.+?)~~)"           # group 5,6: strikethrough
-        r"|(\[(.+?)\]\((.+?)\))" # group 7,8,9: link
-        r"|([^*~\[]+)"            # group 10: plain text
-    )
-
-    for match in re.finditer(pattern, text, re.DOTALL):
-        if match.group(2):  # bold
+    for match in INLINE.finditer(text):
+        kind = match.lastindex
+        if kind == 1:  # bold
             rich_text.append({
                 "type": "text",
                 "text": {"content": match.group(2)},
                 "annotations": {"bold": True}
             })
-        elif match.group(4):  # italic
+        elif kind == 3:  # italic
             rich_text.append({
                 "type": "text",
                 "text": {"content": match.group(4)},
                 "annotations": {"italic": True}
             })
-        elif match.group(6):  # strikethrough
+        elif kind == 5:  # strikethrough
             rich_text.append({
                 "type": "text",
                 "text": {"content": match.group(6)},
                 "annotations": {"strikethrough": True}
             })
-        elif match.group(8) and match.group(9):  # link
+        elif kind == 7:  # link
             rich_text.append({
                 "type": "text",
                 "text": {"content": match.group(8), "link": {"url": match.group(9)}}
             })
-        elif match.group(10):  # plain text
-            content = match.group(10)
-            if content:
-                rich_text.append({"type": "text", "text": {"content": content}})
+        else:  # plain text
+            rich_text.append({"type": "text", "text": {"content": match.group(10)}})
 
     if not rich_text:
         rich_text.append({"type": "text", "text": {"content": text}})
     return rich_text
 
+def _table_cells(line: str) -> List[str]:
+    """テーブルの1行をセルに分ける（\\| はセル内の | として扱う）"""
+    if "\\|" not in line:
+        return [c.strip() for c in line.strip("|").split("|")]
+    body = line[1:] if line.startswith("|") else line
+    if body.endswith("|") and not body.endswith("\\|"):
+        body = body[:-1]
+    return [c.strip().replace("\\|", "|") for c in ESCAPED_PIPE_SPLIT.split(body)]
+
 def _build_table_block(table_lines: list) -> dict:
     """Markdownテーブルの行リストからNotionテーブルブロックを構築する"""
     # セパレータ行（|---|---| など）を除外
-    data_lines = [l for l in table_lines if not re.match(r"^\|[\s|:\-]+\|$", l)]
-    if not data_lines:
-        return None
-
-    rows = []
-    for line in data_lines:
-        cells = [c.strip() for c in line.strip("|").split("|")]
-        rows.append(cells)
-
+    rows = [_table_cells(l) for l in table_lines if not TABLE_SEPARATOR.match(l)]
     if not rows:
         return None
 
@@ -145,11 +200,8 @@ def _build_table_block(table_lines: list) -> dict:
     table_rows = []
     for row in rows:
         padded = (row + [""] * col_count)[:col_count]
-        safe_cells = []
-        for cell in padded:
-            # 2000文字制限
-            content = cell[:2000]
-            safe_cells.append([{"type": "text", "text": {"content": content}}])
+        # 2000文字制限: 超える場合は複数の rich_text に分ける
+        safe_cells = [split_text(cell) for cell in padded]
         table_rows.append({
             "type": "table_row",
             "table_row": {"cells": safe_cells}
@@ -165,7 +217,17 @@ def _build_table_block(table_lines: list) -> dict:
         }
     }
 
-def _split_rich_text(rich_text: list, max_len: int) -> list:
+def split_text(text: str, max_len: int = 2000, max_items: int = 100) -> list:
+    """
+    プレーンテキストを max_len 文字ごとの rich_text 要素に分ける。
+    1つの rich_text 配列は max_items 要素までのため、それを超える分は切り捨てる。
+    """
+    if len(text) <= max_len:
+        return [{"type": "text", "text": {"content": text}}]
+    pieces = [text[i:i + max_len] for i in range(0, len(text), max_len)][:max_items]
+    return [{"type": "text", "text": {"content": piece}} for piece in pieces]
+
+def split_rich_text(rich_text: list, max_len: int) -> list:
     """
     rich_textリストの合計文字数が max_len を超える場合、
     複数のチャンクに分割する（1ブロック = 1チャンク）。
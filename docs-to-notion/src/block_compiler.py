@@ -0,0 +1,184 @@
+"""
+読み込んだ要素（Word の DocElement、Excel / CSV の要素 dict）から Notion ブロックを直接作る。
+
+Markdown の文字列を経由しないので、行の分割・正規表現による再解析・表の | のエスケープが要らず、
+Word の下線やリンク、入れ子のリストもそのまま残る。
+Markdown は確認用の出力（main.py の --debug-markdown）にだけ使う。
+"""
+from typing import Iterable, List, Optional
+from block_builder import clean_list_text, split_rich_text, split_text
+from media_store import local_image_block
+
+MAX_TEXT = 2000        # rich_text 1要素の文字数の上限
+MAX_RICH_TEXT = 100    # rich_text 配列の要素数の上限
+MAX_CHILDREN = 100     # children 配列の要素数の上限
+MAX_LIST_DEPTH = 2     # 1リクエストで送れる入れ子の深さ（これより深い項目は最も深い階層に並べる）
+ANNOTATIONS = ("bold", "italic", "strikethrough", "underline", "code")
+# Notion が受け付けるリンク先。相対パス・UNC・file: などのリンクは文字だけ残す
+LINK_SCHEMES = ("http://", "https://", "mailto:")
+
+def word_blocks(elements: Iterable) -> List[dict]:
+    """DocElement のリストを Notion ブロックのリストにする（リストの階層は入れ子にする）"""
+    blocks = []
+    lists = _ListNester(blocks)
+    for el in elements:
+        if el.type == "list":
+            style = "numbered" if el.style == "numbered" else "bulleted"
+            lists.add(el.level, list_item_block(style, split_text(clean_list_text(el.content))))
+            continue
+        lists.reset()
+        if el.type == "heading":
+            blocks.append(heading_block(el.level, split_text(el.content)))
+        elif el.type == "paragraph":
+            rich_text = runs_to_rich_text(el.metadata.get("rich_text", []))
+            blocks.extend(paragraph_blocks(rich_text or split_text(el.content)))
+        elif el.type == "table":
+            table = table_block(el.metadata.get("headers", []), el.metadata.get("data_rows", []))
+            if table:
+                blocks.append(table)
+        elif el.type == "image":
+            blocks.append(image_element_block(el.metadata.get("path"),
+                                              el.metadata.get("caption", ""), el.content))
+        elif el.type == "divider":
+            blocks.append(divider_block())
+    return blocks
+
+def sheet_blocks(sheet) -> List[dict]:
+    """Excel SheetData をブロックにする（先頭にシート名の見出し）"""
+    from excel_reader import iter_elements
+    blocks = [heading_block(1, split_text(sheet.name))]
+    for element in iter_elements(sheet):
+        blocks.extend(sheet_element_blocks(element))
+    return blocks
+
+def sheet_element_blocks(element: dict) -> List[dict]:
+    """Excel / CSV の要素1つをブロックにする。対象外の要素は空リスト"""
+    etype = element["type"]
+    if etype == "heading":
+        return [heading_block(element.get("level", 2), split_text(element["text"]))]
+    if etype == "table":
+        table = table_block(element["headers"], element["rows"])
+        return [table] if table else []
+    if etype == "paragraph":
+        return paragraph_blocks(split_text(element["text"].strip()))
+    if etype == "list":
+        style = "bulleted" if element.get("style") == "bullet" else "numbered"
+        return [list_item_block(style, split_text(clean_list_text(item["text"])))
+                for item in element.get("items", [])]
+    if etype == "image":
+        return [image_element_block(element.get("path"), element.get("caption", ""),
+                                    element.get("name", ""))]
+    if etype == "divider":
+        return [divider_block()]
+    return []
+
+def heading_block(level: int, rich_text: list) -> dict:
+    htype = f"heading_{min(max(level, 1), 3)}"  # Notionは H1〜H3 のみ
+    return {"object": "block", "type": htype, htype: {"rich_text": rich_text}}
+
+def list_item_block(style: str, rich_text: list) -> dict:
+    btype = f"{style}_list_item"
+    return {"object": "block", "type": btype, btype: {"rich_text": rich_text}}
+
+def divider_block() -> dict:
+    return {"object": "block", "type": "divider", "divider": {}}
+
+def paragraph_blocks(rich_text: list) -> List[dict]:
+    """段落を上限（合計2000文字・100要素）ごとの paragraph ブロックに分ける"""
+    blocks = []
+    for chunk in split_rich_text(rich_text, MAX_TEXT):
+        for i in range(0, max(len(chunk), 1), MAX_RICH_TEXT):
+            blocks.append({"object": "block", "type": "paragraph",
+                           "paragraph": {"rich_text": chunk[i:i + MAX_RICH_TEXT]}})
+    return blocks
+
+def runs_to_rich_text(runs: List[dict]) -> list:
+    """
+    read_word のラン（text と bold / italic / underline / strikethrough / link）を rich_text にする。
+    書式とリンクが同じ隣り合うランは1要素にまとめ、段落の前後の空白は除く。
+    リンクは http / https / mailto のものだけ付ける（それ以外は1つで送信全体が失敗するため）。
+    """
+    merged = []  # [文字列のリスト, 書式, リンク]
+    for run in runs:
+        text = run.get("text", "")
+        if not text:
+            continue
+        annotations = {key: True for key in ANNOTATIONS if run.get(key)}
+        link = run.get("link")
+        if link and not link.strip().lower().startswith(LINK_SCHEMES):
+            link = None
+        if merged and merged[-1][1] == annotations and merged[-1][2] == link:
+            merged[-1][0].append(text)
+        else:
+            merged.append([[text], annotations, link])
+
+    rich_text = []
+    for n, (parts, annotations, link) in enumerate(merged):
+        content = "".join(parts)
+        if n == 0:
+            content = content.lstrip()
+        if n == len(merged) - 1:
+            content = content.rstrip()
+        if not content:
+            continue
+        text = {"content": content}
+        if link:
+            text["link"] = {"url": link.strip()}
+        item = {"type": "text", "text": text}
+        if annotations:
+            item["annotations"] = annotations
+        rich_text.append(item)
+    return rich_text
+
+def table_block(headers: List, rows: List) -> Optional[dict]:
+    """見出し行と行データから table ブロックを作る（列数は見出し行に合わせる）"""
+    if not headers:
+        return None
+    width = len(headers)
+    table_rows = []
+    for row in [headers, *rows]:
+        cells = [split_text(_cell_text(c)) for c in row[:width]]
+        cells.extend(split_text("") for _ in range(width - len(cells)))
+        table_rows.append({"type": "table_row", "table_row": {"cells": cells}})
+    return {
+        "object": "block", "type": "table",
+        "table": {
+            "table_width": width,
+            "has_column_header": True,
+            "has_row_header": False,
+            "children": table_rows
+        }
+    }
+
+def _cell_text(value) -> str:
+    return "" if value is None else str(value).replace("\r", "").strip()
+
+def image_element_block(path: Optional[str], caption: str, label: str) -> dict:
+    """保存済みの画像は画像の擬似ブロック、保存できなかった画像（EMF など）は [画像: 名前] の段落"""
+    if path:
+        return local_image_block(path, caption)
+    return paragraph_blocks(split_text(f"[画像: {caption or label}]"))[0]
+
+class _ListNester:
+    """リスト項目を階層（level）に従って親の項目の children に入れていく"""
+
+    def __init__(self, blocks: List[dict]):
+        self.blocks = blocks
+        self.stack = []  # (level, ブロック) の親の並び
+
+    def reset(self):
+        self.stack = []
+
+    def add(self, level: int, block: dict):
+        stack = self.stack
+        while stack and (stack[-1][0] >= level or len(stack) > MAX_LIST_DEPTH
+                         or len(_body(stack[-1][1]).get("children", ())) >= MAX_CHILDREN):
+            stack.pop()
+        if stack:
+            _body(stack[-1][1]).setdefault("children", []).append(block)
+        else:
+            self.blocks.append(block)
+        stack.append((level, block))
+
+def _body(block: dict) -> dict:
+    return block[block["type"]]
@@ -3,54 +3,40 @@
 その中にExcelデータをインポートするスクリプト。
 """
 import os, sys, glob
-from notion_client import Client
 from dotenv import load_dotenv
 from rich.console import Console
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from excel_reader import read_excel
-from markdown_converter import convert_to_markdown
-from block_builder import markdown_to_notion_blocks
+from block_compiler import sheet_blocks
+from upload_engine import get_engine
 
 load_dotenv()
 console = Console()
-BATCH_SIZE = 100
 
-NOTION_API_KEY = os.environ["NOTION_API_KEY"]
 NOTION_PARENT_PAGE_ID = os.environ["NOTION_PARENT_PAGE_ID"]  # Accessible parent
 
-client = Client(auth=NOTION_API_KEY)
+# main.py と同じアップロードエンジン（接続プール・レート制限・バッチ分割）を使う
+engine = get_engine()
 
 def create_container_page(parent_id: str, title: str) -> str:
     """新しいコンテナページを作成してそのIDを返す"""
     console.print(f"[bold green]📁 コンテナページ作成中: '{title}'[/bold green]")
-    response = client.pages.create(
+    page_id, url = engine.create_page(
         parent={"page_id": parent_id},
         properties={"title": [{"text": {"content": title}}]},
-        children=[]
+        blocks=[]
     )
-    page_id = response["id"]
-    url = response["url"]
     console.print(f"  ✅ コンテナページ作成: {url}")
     return page_id
 
 def create_page_with_content(parent_id: str, title: str, blocks: list) -> str:
     """コンテンツ付きのページを作成してそのURLを返す"""
-    first_batch = blocks[:BATCH_SIZE]
-    remaining = blocks[BATCH_SIZE:]
-
-    response = client.pages.create(
+    _, url = engine.create_page(
         parent={"page_id": parent_id},
         properties={"title": [{"text": {"content": title}}]},
-        children=first_batch
+        blocks=blocks
     )
-    page_id = response["id"]
-    url = response["url"]
-
-    for i in range(0, len(remaining), BATCH_SIZE):
-        batch = remaining[i:i + BATCH_SIZE]
-        client.blocks.children.append(block_id=page_id, children=batch)
-
     return url
 
 def main():
@@ -75,8 +61,7 @@ def main():
             sheets = read_excel(file_path)
             console.print(f"  ✅ {len(sheets)}シート検出")
             for sheet in sheets:
-                md = convert_to_markdown(sheet, source_type="excel")
-                blocks = markdown_to_notion_blocks(md)
+                blocks = sheet_blocks(sheet)
                 title = f"{os.path.splitext(name)[0]} - {sheet.name}"
                 url = create_page_with_content(container_page_id, title, blocks)
                 console.print(f"  ✅ ページ作成: {url}")
@@ -85,5 +70,7 @@ def main():
             import traceback
             traceback.print_exc()
 
+    console.print(f"\n📡 API: {engine.scheduler.summary()}")
+
 if __name__ == "__main__":
     main()
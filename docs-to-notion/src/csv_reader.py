@@ -0,0 +1,104 @@
+"""
+CSV / TSV の読み込み（ERP の出力など、書式のない表データ用）。
+
+ファイル全体を復号できる文字コードと、先頭の一部から区切り文字を判定し、最初のチャンクで列の型と
+見出し行の有無を判定する。以降は CHUNK_ROWS 行ずつ表要素（excel_reader の
+iter_elements と同じ形式）として返すため、ファイルサイズによらずメモリ使用量は一定。
+"""
+import csv, codecs, os
+from typing import Iterator, List
+from database_builder import infer_column_type
+
+CHUNK_ROWS = 1000
+SAMPLE_BYTES = 64 * 1024
+DETECT_BLOCK_BYTES = 1024 * 1024
+ENCODINGS = ("utf-8-sig", "cp932")   # 社内のERP出力は UTF-8（BOM付き）か Shift_JIS
+TYPED_COLUMNS = ("number", "date", "checkbox")
+
+def detect_encoding(path: str) -> str:
+    """
+    ファイル全体を各文字コードで復号してみて、最後まで成功したものを返す。
+    先頭が ASCII だけ（コード・数値の列など）の Shift_JIS ファイルを UTF-8 と誤判定しないよう、
+    一部ではなく全体を確かめる（DETECT_BLOCK_BYTES ずつ読むのでメモリ使用量は一定）。
+    どれでも復号できなければ ValueError。
+    """
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(DETECT_BLOCK_BYTES), b""):
+                    decoder.decode(block)
+                decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"文字コードを判定できません（{' / '.join(ENCODINGS)} のいずれでもありません）: {path}")
+
+def detect_dialect(path: str, encoding: str):
+    if os.path.splitext(path)[1].lower() == ".tsv":
+        return csv.excel_tab
+    with open(path, encoding=encoding, newline="") as f:
+        sample = f.read(SAMPLE_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",\t;")
+    except csv.Error:
+        return csv.excel
+
+def iter_csv_elements(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[dict]:
+    """
+    CSV / TSV を chunk_rows 行ずつの表要素として返す（各要素に同じ見出し行を付ける）。
+    要素にはチャンク内の値から推定した列ごとの型 "types" も付け、
+    インラインデータベース化で再利用する。2つ目以降のチャンクは "continued": True
+    （同じ表の続き）になる。
+    """
+    encoding = detect_encoding(path)
+    dialect = detect_dialect(path, encoding)
+    with open(path, encoding=encoding, newline="") as f:
+        rows = (row for row in csv.reader(f, dialect) if any(cell.strip() for cell in row))
+        headers = None
+        chunk, continued = [], False
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) < chunk_rows + (headers is None):
+                continue
+            if headers is None:
+                headers, chunk = _split_header(chunk)
+            yield _table_element(headers, chunk, continued)
+            chunk, continued = [], True
+        if headers is None and chunk:
+            headers, chunk = _split_header(chunk)
+        if chunk:
+            yield _table_element(headers, chunk, continued)
+
+def _table_element(headers: List[str], rows: List[List[str]], continued: bool) -> dict:
+    element = {"type": "table", "headers": headers, "rows": rows,
+               "types": column_types(rows, len(headers))}
+    if continued:
+        element["continued"] = True
+    return element
+
+def column_types(rows: List[List[str]], width: int) -> List[str]:
+    """列ごとに値をまとめ、列単位で型を推定する"""
+    columns = zip(*((row + [""] * width)[:width] for row in rows)) if rows else [[]] * width
+    return [infer_column_type(list(col)) for col in columns]
+
+def _split_header(chunk: List[List[str]]):
+    """最初のチャンクから見出し行を取り出す。見出しがなければ「列1, 列2, ...」を付ける"""
+    width = max(len(row) for row in chunk)
+    first, rest = chunk[0], chunk[1:]
+    types = column_types(rest, width)
+    if _looks_like_header(first, types):
+        return (first + [""] * width)[:width], rest
+    return [f"列{i + 1}" for i in range(width)], chunk
+
+def _looks_like_header(first: List[str], types: List[str]) -> bool:
+    """
+    数値・日付などの型が決まる列があれば、その列で先頭行だけが型に合わない場合を見出しとみなす。
+    文字列の列しかない場合は、先頭行がすべて埋まっていて重複がなければ見出しとみなす。
+    """
+    first = (first + [""] * len(types))[:len(types)]
+    typed = [(value, t) for value, t in zip(first, types) if t in TYPED_COLUMNS]
+    if typed:
+        return all(infer_column_type([value]) != t for value, t in typed)
+    values = [value.strip() for value in first]
+    return all(values) and len(set(values)) == len(values)
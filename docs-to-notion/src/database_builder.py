@@ -0,0 +1,173 @@
+"""
+大きな表を Notion のインラインデータベースとして取り込むための変換。
+
+列ごとに値から型（数値・日付・チェックボックス・セレクト・テキスト）を推定し、
+データベースのスキーマと各行のプロパティ値を作る。結果はブロック列の中に
+"inline_database" 型の擬似ブロックとして置き、UploadEngine がページ作成中に
+データベース作成＋行の追加に置き換える（Notion API のブロック型ではない）。
+"""
+import re
+from datetime import datetime
+from typing import List, Optional
+from block_builder import split_text
+
+DATABASE_BLOCK = "inline_database"
+ROW_NUMBER = "行番号"       # 元の行順で並べ替えるための列（行は並行して追加するため）
+SELECT_MAX_OPTIONS = 25     # これ以下の種類しか値がない列はセレクトにする
+SELECT_MAX_LENGTH = 100
+
+# 先頭が0の値（"0123", "007" などの社員番号・品番）は数値にすると0が消えるため文字列のまま
+_NUMBER = re.compile(r"^[+-]?(?:[1-9]\d{0,2}(?:,\d{3})+|[1-9]\d*|0)(?:\.\d+)?$")
+# 日付らしい形。実在する日時かは _parse_date で datetime に通して確かめる
+_DATE = re.compile(r"^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$")
+_BOOLEANS = {"TRUE": True, "FALSE": False, "True": True, "False": False}
+
+def is_database_block(block: dict) -> bool:
+    return block.get("type") == DATABASE_BLOCK
+
+def is_database_batch(batch: List[dict]) -> bool:
+    """pack_blocks はデータベースの擬似ブロックを単独のバッチにする"""
+    return len(batch) == 1 and is_database_block(batch[0])
+
+def inline_database_block(title: str, headers: List[str], rows: List[List[str]],
+                          types: List[str] = None) -> dict:
+    """
+    表（見出し行＋データ行）からインラインデータベースの擬似ブロックを作る。
+    types（列ごとの推定型）を渡さない場合は値から推定する。一部の行（CSV の最初のチャンクなど）
+    から推定した types を渡した場合も、合わない値がある列は rich_text にする。先頭列は常にタイトル。
+    """
+    names = _column_names(headers)
+    width = len(names)
+    rows = [(row + [""] * width)[:width] for row in rows]
+    if types is None:
+        types = [infer_column_type([row[i] for row in rows]) for i in range(width)]
+    else:
+        types = conform_types((list(types) + ["rich_text"] * width)[:width], rows)
+    types = ["title"] + list(types[1:width])
+
+    schema = {name: _schema_entry(ptype, [row[i] for row in rows])
+              for i, (name, ptype) in enumerate(zip(names, types))}
+    schema[ROW_NUMBER] = {"number": {}}
+    page_rows = []
+    for n, row in enumerate(rows, start=1):
+        props = {ROW_NUMBER: {"number": n}}
+        for name, ptype, value in zip(names, types, row):
+            prop = _property_value(ptype, value)
+            if prop is not None:
+                props[name] = prop
+        page_rows.append(props)
+
+    return {"object": "block", "type": DATABASE_BLOCK,
+            DATABASE_BLOCK: {"title": title, "properties": schema, "rows": page_rows}}
+
+def database_create_kwargs(page_id: str, spec: dict) -> dict:
+    """
+    databases.create の引数。API 2025-09-03 以降は initial_data_source、
+    それより前は properties でスキーマを渡す（SDK は対応していない方を送らない）。
+    """
+    return {
+        "parent": {"type": "page_id", "page_id": page_id},
+        "is_inline": True,
+        "title": split_text(spec["title"]),
+        "properties": spec["properties"],
+        "initial_data_source": {"properties": spec["properties"]},
+    }
+
+def infer_column_type(values: List[str]) -> str:
+    """空欄を除いた値がすべて同じ形式なら、その型を返す（該当なしは rich_text）"""
+    filled = [v.strip() for v in values if v and v.strip()]
+    if not filled:
+        return "rich_text"
+    if all(_NUMBER.match(v) for v in filled):
+        return "number"
+    if all(_parse_date(v) for v in filled):
+        return "date"
+    if all(v in _BOOLEANS for v in filled):
+        return "checkbox"
+    distinct = set(filled)
+    if (len(distinct) <= SELECT_MAX_OPTIONS and len(filled) >= 2 * len(distinct)
+            and all(len(v) <= SELECT_MAX_LENGTH for v in distinct)):
+        return "select"
+    return "rich_text"
+
+def conform_types(types: List[str], rows: List[List[str]]) -> List[str]:
+    """推定した型に合わない値（セレクトでは多すぎる選択肢）がある列を rich_text にする"""
+    conformed = []
+    for i, ptype in enumerate(types):
+        if ptype in ("number", "date", "checkbox", "select"):
+            values = {row[i].strip() for row in rows if row[i] and row[i].strip()}
+            if ptype == "select":
+                fits = (len(values) <= SELECT_MAX_OPTIONS
+                        and all(len(v) <= SELECT_MAX_LENGTH for v in values))
+            else:
+                fits = all(_fits(ptype, v) for v in values)
+            if not fits:
+                ptype = "rich_text"
+        conformed.append(ptype)
+    return conformed
+
+def _fits(ptype: str, value: str) -> bool:
+    if ptype == "number":
+        return bool(_NUMBER.match(value))
+    if ptype == "date":
+        return _parse_date(value) is not None
+    return value in _BOOLEANS
+
+def _column_names(headers: List[str]) -> List[str]:
+    """空・重複した見出しはプロパティ名に使えないため補う"""
+    names, seen = [], set()
+    for i, header in enumerate(headers):
+        name = (header or "").strip() or f"列{i + 1}"
+        if name == ROW_NUMBER:
+            name = f"{name} ({i + 1})"
+        base, n = name, 2
+        while name in seen:
+            name = f"{base} ({n})"
+            n += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+def _schema_entry(ptype: str, values: List[str]) -> dict:
+    if ptype == "select":
+        options = dict.fromkeys(_select_name(v) for v in values if v and v.strip())
+        return {"select": {"options": [{"name": name} for name in options]}}
+    return {ptype: {}}
+
+def _property_value(ptype: str, value: str):
+    """セルの文字列をプロパティ値にする（空欄は None = 送らない）"""
+    value = (value or "").strip()
+    if ptype == "title":
+        return {"title": split_text(value)} if value else None
+    if not value:
+        return None
+    if ptype == "number":
+        number = float(value.replace(",", ""))
+        return {"number": int(number) if number.is_integer() else number}
+    if ptype == "date":
+        return {"date": {"start": _iso_date(value)}}
+    if ptype == "checkbox":
+        return {"checkbox": _BOOLEANS[value]}
+    if ptype == "select":
+        return {"select": {"name": _select_name(value)}}
+    return {"rich_text": split_text(value)}
+
+def _select_name(value: str) -> str:
+    # セレクトの選択肢名にはカンマを使えない
+    return value.strip().replace(",", "、")
+
+def _parse_date(value: str) -> Optional[datetime]:
+    """日付・日時の文字列を datetime にする（2026-02-30 や 25時など実在しない日時は None）"""
+    m = _DATE.match(value)
+    if not m:
+        return None
+    try:
+        return datetime(*(int(part) for part in m.groups() if part is not None))
+    except ValueError:
+        return None
+
+def _iso_date(value: str) -> str:
+    parsed = _parse_date(value)
+    if parsed.time() == datetime.min.time():
+        return parsed.strftime("%Y-%m-%d")
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S")
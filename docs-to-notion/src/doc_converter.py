@@ -0,0 +1,177 @@
+"""
+.doc → .docx 変換（LibreOffice）。
+
+変換結果は元ファイルの内容ハッシュ（SHA-256）をファイル名にしてキャッシュディレクトリに置き、
+同じ内容のファイルは2回目以降変換しない（入力フォルダには何も書き出さない）。
+未変換のファイルは最大 BATCH_SIZE 件ずつ1回の soffice 呼び出しでまとめて変換し、
+起動にかかる数秒を1件ごとに払わないようにする。soffice は最大 workers 個を並行して動かす
+（同じユーザープロファイルでは同時に1つしか起動できないため、呼び出しごとに専用のものを使う）。
+start() はバックグラウンドで変換を始めるので、他のファイルのアップロードと並行して進む。
+"""
+import os, shutil, pathlib, subprocess, tempfile, threading, zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from sync_state import file_sha256
+
+BATCH_SIZE = 50
+TIMEOUT_BASE = 120      # soffice 1回あたりの起動分の待ち時間（秒）
+TIMEOUT_PER_FILE = 30   # 1ファイルあたりの追加の待ち時間（秒）
+SOFFICE_ENV = "SOFFICE_PATH"
+
+def find_soffice() -> str:
+    """環境変数 SOFFICE_PATH → PATH 上の soffice / libreoffice の順に探す"""
+    return (os.environ.get(SOFFICE_ENV) or shutil.which("soffice")
+            or shutil.which("libreoffice") or "libreoffice")
+
+class DocConverter:
+    def __init__(self, cache_dir: str, workers: int = 1, batch_size: int = BATCH_SIZE,
+                 soffice: str = None):
+        self.cache_dir = cache_dir
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.soffice = soffice or find_soffice()
+        self._reset()
+
+    def _reset(self):
+        self._futures: Dict[str, Future] = {}  # 元ファイルのパス → 変換後のパスの Future
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = os.getpid()
+
+    def cache_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest + ".docx")
+
+    def start(self, paths: Iterable[str]) -> Dict[str, Future]:
+        """
+        paths の変換をバックグラウンドで始め、パスごとの Future（変換後の .docx のパス）を返す。
+        キャッシュ済みのファイルの Future は完了済みで返す。内容が同じファイルは1回だけ変換する。
+        """
+        if self._pid != os.getpid():
+            # fork したワーカープロセスでは、親の変換中の Future は完了しないため引き継がない
+            self._reset()
+        paths = list(paths)
+        pending: Dict[str, List[Future]] = {}   # 内容ハッシュ → 待っている Future
+        sources: Dict[str, str] = {}            # 内容ハッシュ → 変換に使う元ファイル
+        for path in paths:
+            with self._lock:
+                if path in self._futures:
+                    continue
+                future = self._futures[path] = Future()
+            try:
+                digest = file_sha256(path)
+            except OSError as e:
+                future.set_exception(e)
+                continue
+            cached = self.cache_path(digest)
+            if os.path.exists(cached):
+                future.set_result(cached)
+                continue
+            pending.setdefault(digest, []).append(future)
+            sources.setdefault(digest, path)
+
+        if pending:
+            items = [(digest, sources[digest], futures) for digest, futures in pending.items()]
+            # 件数が少なくても workers 個の soffice に振り分ける
+            size = min(self.batch_size, -(-len(items) // self.workers))
+            for i in range(0, len(items), size):
+                self._executor().submit(self._convert_batch, items[i:i + size])
+        return {path: self._futures[path] for path in paths}
+
+    def convert(self, path: str) -> str:
+        """path を変換した .docx のパスを返す（start 済みなら、その変換の完了を待つ）"""
+        return self.start([path])[path].result()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="soffice")
+            return self._pool
+
+    def _convert_batch(self, items: List[Tuple[str, str, List[Future]]]):
+        """
+        1回の soffice 呼び出しでまとめて変換する。
+        元のファイル名が重なっても出力がぶつからないよう、内容ハッシュの名前で作業フォルダに置く。
+        soffice が途中で失敗・タイムアウトしても、出力済みのファイルは使う。
+        出力されなかったファイルは1件ずつ soffice を呼び直し、それでも失敗したものだけをエラーにする。
+        """
+        error = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix="doc2docx-") as work:
+                self._convert_in(work, items)
+        except Exception as e:
+            error = e
+        finally:
+            # キャッシュフォルダの作成・コピー・移動で失敗しても、待っている Future を残さない
+            error = error or RuntimeError("変換が中断されました")
+            for _, _, futures in items:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _convert_in(self, work: str, items: List[Tuple[str, str, List[Future]]]):
+        """作業フォルダ work で items を変換し、結果の出たものから Future を完了させる"""
+        in_dir, out_dir = os.path.join(work, "in"), os.path.join(work, "out")
+        profile = os.path.join(work, "profile")
+        os.makedirs(in_dir)
+        staged = {}
+        for digest, source, _ in items:
+            staged[digest] = os.path.join(in_dir, digest + ".doc")
+            _link_or_copy(source, staged[digest])
+        error = self._try_soffice(list(staged.values()), out_dir, profile)
+
+        for digest, source, futures in items:
+            if not self._collect(digest, out_dir, futures):
+                if len(items) > 1:
+                    # 1件だけで変換し直す（壊れたファイル1つでバッチ全体を失敗にしない）
+                    error = self._try_soffice([staged[digest]], out_dir, profile)
+                    if self._collect(digest, out_dir, futures):
+                        continue
+                e = error or FileNotFoundError(f"変換後ファイルが見つかりません: {source}")
+                for future in futures:
+                    future.set_exception(e)
+
+    def _try_soffice(self, inputs: List[str], out_dir: str, profile: str):
+        """soffice を実行し、失敗したときはその例外を返す（成功したら None）"""
+        try:
+            self._run_soffice(inputs, out_dir, profile)
+        except Exception as e:
+            return e
+        return None
+
+    def _collect(self, digest: str, out_dir: str, futures: List[Future]) -> bool:
+        """
+        出力された <digest>.docx をキャッシュに移して futures を完了させる。
+        出力が無い・途中で止まって zip として壊れている場合は False
+        """
+        produced = os.path.join(out_dir, digest + ".docx")
+        if not os.path.exists(produced):
+            return False
+        if not zipfile.is_zipfile(produced):
+            os.remove(produced)
+            return False
+        dest = self.cache_path(digest)
+        # 別プロセスが同じファイルを読んでいても壊れないよう、置き換えは1回で行う
+        partial = f"{dest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.move(produced, partial)
+        os.replace(partial, dest)
+        for future in futures:
+            future.set_result(dest)
+        return True
+
+    def _run_soffice(self, inputs: List[str], out_dir: str, profile: str):
+        result = subprocess.run(
+            [self.soffice, f"-env:UserInstallation={pathlib.Path(profile).as_uri()}",
+             "--headless", "--convert-to", "docx", "--outdir", out_dir, *inputs],
+            capture_output=True, text=True,
+            timeout=TIMEOUT_BASE + TIMEOUT_PER_FILE * len(inputs)
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"LibreOffice変換エラー: {result.stderr}")
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -1,155 +1,386 @@
+import os
+import zipfile
 import openpyxl
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.utils import column_index_from_string
+from openpyxl.xml.constants import SHEET_MAIN_NS
+from lxml import etree
+from media_store import PackageMedia, read_rels
 
-@dataclass
-class CellData:
-    value: str
-    row: int
-    col: int
-    is_bold: bool = False
-    is_merged: bool = False
-    bg_color: Optional[str] = None
-    font_size: Optional[float] = None
+# このサイズ以上のブックは読み取り専用モードで1行ずつ処理する
+STREAMING_MIN_BYTES = 10 * 1024 * 1024
+
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+XDR_NS = "http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+class RowData:
+    """
+    1行分のセル値と、構造解析に使う行単位の集計。
+    セルごとの書式は保持せず、先頭の非空セルの書式と背景色の有無だけを持つ。
+    """
+    __slots__ = ("values", "non_empty", "first_bold", "first_merged", "first_size", "any_bg")
+
+    def __init__(self, values: List[str], non_empty: int = 0, first_bold: bool = False,
+                 first_merged: bool = False, first_size: float = 0.0, any_bg: bool = False):
+        self.values = values
+        self.non_empty = non_empty        # 非空セル数
+        self.first_bold = first_bold      # 先頭の非空セルが太字か
+        self.first_merged = first_merged  # 先頭の非空セルが結合セルか
+        self.first_size = first_size      # 先頭の非空セルのフォントサイズ（不明なら0）
+        self.any_bg = any_bg              # 非空セルのいずれかに背景色があるか
+
+class StyleCache:
+    """
+    ブック内のスタイルごとに (太字, フォントサイズ, 背景色あり) を1回だけ求めて覚える。
+    ブックのスタイル数は数十程度なので、セルごとの書式判定は辞書引き1回で済む。
+    通常モードのセルは (fontId, fillId)、読み取り専用モードのセルは _style_id をキーにする。
+    """
+    __slots__ = ("_wb", "_memo")
+
+    def __init__(self, wb):
+        self._wb = wb
+        self._memo = {}
+
+    def lookup(self, cell) -> Tuple[bool, float, bool]:
+        style_id = getattr(cell, "_style_id", None)
+        if style_id is not None:
+            key = style_id
+        else:
+            style = cell._style
+            key = (style.fontId, style.fillId) if style else (0, 0)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._memo[key] = self._resolve(cell)
+        return hit
+
+    def _resolve(self, cell) -> Tuple[bool, float, bool]:
+        style = cell.style_array if hasattr(cell, "_style_id") else cell._style
+        font = self._wb._fonts[style.fontId if style else 0]
+        fill = self._wb._fills[style.fillId if style else 0]
+        bold = bool(font and font.bold)
+        size = (font.size if font else None) or 0.0
+        return bold, size, _fill_has_bg(fill)
 
 @dataclass
 class SheetData:
+    """
+    1シート分のデータ。rows は read_excel ではリスト、
+    iter_excel では1回だけ読める行のイテレータになる。
+    images はシート上の画像の (アンカーの行, image 要素) を行順に並べたもの。
+    """
     name: str
-    cells: List[List[CellData]] = field(default_factory=list)
-    tables: List[dict] = field(default_factory=list)
-    headings: List[dict] = field(default_factory=list)
-    paragraphs: List[dict] = field(default_factory=list)
+    rows: Iterable[RowData] = field(default_factory=list)
+    images: List[Tuple[int, dict]] = field(default_factory=list)
 
 def read_excel(file_path: str) -> List[SheetData]:
     """Excelファイルを読み込み、構造化データとして返す"""
     wb = openpyxl.load_workbook(file_path, data_only=True)
+    styles = StyleCache(wb)
+    images = sheet_images(file_path)
     sheets = []
 
-    for ws in wb.worksheets:
-        sheet = SheetData(name=ws.title)
-        merged_ranges = list(ws.merged_cells.ranges)
-
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row,
-                                max_col=ws.max_column):
-            row_data = []
-            for cell in row:
-                is_merged = any(cell.coordinate in mr for mr in merged_ranges)
-                try:
-                    bg = cell.fill.start_color.rgb if cell.fill and cell.fill.start_color else None
-                    bg = bg if bg and bg != "00000000" else None
-                except Exception:
-                    bg = None
-                cell_data = CellData(
-                    value=str(cell.value) if cell.value is not None else "",
-                    row=cell.row,
-                    col=cell.column,
-                    is_bold=cell.font.bold if cell.font else False,
-                    is_merged=is_merged,
-                    bg_color=bg,
-                    font_size=cell.font.size if cell.font else None,
-                )
-                row_data.append(cell_data)
-            sheet.cells.append(row_data)
-
-        _analyze_structure(sheet)
+    for i, ws in enumerate(wb.worksheets):
+        sheet = SheetData(name=ws.title, images=images.get(i, []))
+        # max_row / max_column は書式だけのセルでも広がるため、値のある範囲だけを読む
+        max_row, max_col = used_range(ws)
+        merged = merged_cell_index(ws.merged_cells.ranges, max_row, max_col)
+
+        if max_row:
+            for r, row in enumerate(ws.iter_rows(min_row=1, max_row=max_row,
+                                                 max_col=max_col), start=1):
+                sheet.rows.append(_row_data(row, r, merged, styles))
+
         sheets.append(sheet)
 
     return sheets
 
-def _is_row_empty(row_cells: List[CellData]) -> bool:
-    return all(c.value == "" for c in row_cells)
+def iter_excel(file_path: str) -> Iterator[SheetData]:
+    """
+    大きなブック用のストリーミング読み込み。
+    読み取り専用モードで開き、シートごとに SheetData を1つずつ返す。
+    rows は行のイテレータで、iter_elements で読みながら順に解析される。
+    次のシートに進む前に、そのシートの要素を読み切ること。
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        styles = StyleCache(wb)
+        images = sheet_images(file_path)
+        for i, ws in enumerate(wb.worksheets):
+            sheet = _stream_sheet(ws, styles)
+            sheet.images = images.get(i, [])
+            yield sheet
+    finally:
+        wb.close()
 
-def _is_heading_row(row_cells: List[CellData]) -> bool:
+def read_sheet(file_path: str, index: int) -> SheetData:
+    """
+    index 番目のシートだけを読み取り専用モードで読む（シート単位の並列解析用）。
+    他のシートのXMLは読まない。ブックを閉じるため rows はリストにして返す。
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = _stream_sheet(wb.worksheets[index], StyleCache(wb))
+        sheet.rows = list(sheet.rows)
+        sheet.images = sheet_images(file_path, index).get(index, [])
+        return sheet
+    finally:
+        wb.close()
+
+def sheet_count(file_path: str) -> int:
+    wb = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        return len(wb.worksheets)
+    finally:
+        wb.close()
+
+def _stream_sheet(ws, styles: StyleCache) -> SheetData:
+    ranges, (max_row, max_col) = _scan_sheet_xml(ws)
+    merged = merged_cell_index(ranges, max_row, max_col)
+    return SheetData(name=ws.title, rows=_iter_rows(ws, merged, styles, max_row, max_col))
+
+def iter_sheets(file_path: str, streaming: Optional[bool] = None) -> Iterable[SheetData]:
+    """streaming=None の場合はファイルサイズで read_excel / iter_excel を選ぶ"""
+    if streaming is None:
+        streaming = os.path.getsize(file_path) >= STREAMING_MIN_BYTES
+    return iter_excel(file_path) if streaming else read_excel(file_path)
+
+def _iter_rows(ws, merged: set, styles: StyleCache, max_row: int,
+               max_col: int) -> Iterator[RowData]:
+    """読み取り専用シートの行を1行ずつ RowData にして返す"""
+    if not max_row:
+        return
+    for r, row in enumerate(ws.iter_rows(max_row=max_row, max_col=max_col), start=1):
+        yield _row_data(row, r, merged, styles)
+
+def _row_data(cells, row: int, merged: set, styles: StyleCache) -> RowData:
+    """セル値を文字列にしながら行の集計を1回で作る（書式を見るのは非空セルだけ）"""
+    values = []
+    data = RowData(values)
+    for col, cell in enumerate(cells, start=1):
+        value = cell.value
+        text = str(value) if value is not None else ""
+        values.append(text)
+        if not text:
+            continue
+        bold, size, has_bg = styles.lookup(cell)
+        if not data.non_empty:
+            data.first_bold = bold
+            data.first_size = size
+            data.first_merged = (row, col) in merged
+        data.non_empty += 1
+        data.any_bg = data.any_bg or has_bg
+    return data
+
+def _fill_has_bg(fill) -> bool:
+    try:
+        bg = fill.start_color.rgb if fill and fill.start_color else None
+        return bool(bg and bg != "00000000")
+    except Exception:
+        return False
+
+def used_range(ws) -> Tuple[int, int]:
+    """値のある最後の (行, 列) を返す（書式だけのセルは数えない。空シートは (0, 0)）"""
+    max_row = max_col = 0
+    for (r, c), cell in ws._cells.items():
+        if cell.value is not None and cell.value != "":
+            max_row = max(max_row, r)
+            max_col = max(max_col, c)
+    return max_row, max_col
+
+def merged_cell_index(ranges, max_row: int = None, max_col: int = None) -> set:
+    """
+    結合範囲に含まれる全セルの (行, 列) を集合にする。
+    シートごとに1回だけ作り、セルごとの判定を O(1) にする。
+    max_row / max_col を渡すと、使用範囲の外（列全体の結合など）は含めない。
+    """
+    covered = set()
+    for mr in ranges:
+        cols = range(mr.min_col, min(mr.max_col, max_col or mr.max_col) + 1)
+        for r in range(mr.min_row, min(mr.max_row, max_row or mr.max_row) + 1):
+            covered.update((r, c) for c in cols)
+    return covered
+
+def _scan_sheet_xml(ws) -> Tuple[List[CellRange], Tuple[int, int]]:
+    """
+    読み取り専用シートのXMLを1回読み、結合範囲と使用範囲 (最終行, 最終列) を返す。
+    読み取り専用シートは結合範囲を持たず、寸法も書式だけのセルで広がっているため、
+    <mergeCells> と値（<v> / <is>）を持つセルを直接調べる。
+    mergeCells は sheetData の後ろにあるので、読み終えた行要素は捨てながら進める。
+    """
+    merge_tag = f"{{{SHEET_MAIN_NS}}}mergeCell"
+    row_tag = f"{{{SHEET_MAIN_NS}}}row"
+    value_tag = f"{{{SHEET_MAIN_NS}}}v"
+    inline_tag = f"{{{SHEET_MAIN_NS}}}is"
+    ranges = []
+    max_row = max_col = 0
+    row_idx = 0
+    with ws._get_source() as src:
+        for _, el in iterparse(src):
+            if el.tag == merge_tag:
+                ranges.append(CellRange(el.get("ref")))
+            elif el.tag == row_tag:
+                # r 属性は省略できるので、ない場合は出現順で数える
+                row_idx = int(el.get("r") or row_idx + 1)
+                col_idx = 0
+                for c in el:
+                    ref = c.get("r")
+                    col_idx = column_index_from_string(ref.rstrip("0123456789")) if ref else col_idx + 1
+                    v = c.find(value_tag)
+                    if (v is not None and v.text) or c.find(inline_tag) is not None:
+                        max_row = row_idx
+                        max_col = max(max_col, col_idx)
+                el.clear()
+    return ranges, (max_row, max_col)
+
+def sheet_images(file_path: str, index: int = None) -> Dict[int, List[Tuple[int, dict]]]:
+    """
+    ワークシートの画像を媒体フォルダに保存し、{シート番号: [(アンカーの行, image 要素), ...]} で返す
+    （index を渡すとそのシートだけ）。番号は wb.worksheets と同じくグラフシートを数えない。
+    読み取り専用モードの openpyxl は画像を読まないため、ブックの描画パートを直接読む。
+    """
+    images = {}
+    with zipfile.ZipFile(file_path) as zf:
+        book = next((target for rel_type, target, _ in read_rels(zf, "").values()
+                     if rel_type == REL_TYPE + "officeDocument"), "xl/workbook.xml")
+        book_rels = read_rels(zf, book)
+        n = 0
+        for sheet in etree.fromstring(zf.read(book)).iter(f"{{{SHEET_MAIN_NS}}}sheet"):
+            rel_type, target, _ = book_rels.get(sheet.get(f"{{{R_NS}}}id"), ("", "", True))
+            if rel_type != REL_TYPE + "worksheet":
+                continue
+            if index is None or n == index:
+                found = _drawing_images(zf, target)
+                if found:
+                    images[n] = found
+            n += 1
+    return images
+
+def _drawing_images(zf: zipfile.ZipFile, sheet_part: str) -> List[Tuple[int, dict]]:
+    xdr, a = f"{{{XDR_NS}}}", f"{{{A_NS}}}"
+    found = []
+    for rel_type, target, external in read_rels(zf, sheet_part).values():
+        if rel_type != REL_TYPE + "drawing" or external or target not in zf.NameToInfo:
+            continue
+        media = PackageMedia(zf, read_rels(zf, target))
+        # twoCellAnchor / oneCellAnchor / absoluteAnchor（位置の指定がなければ先頭行）
+        for anchor in etree.fromstring(zf.read(target)):
+            row = anchor.find(f"{xdr}from/{xdr}row")
+            row = int(row.text) + 1 if row is not None and row.text else 1
+            for pic in anchor.iter(f"{xdr}pic"):
+                blip = pic.find(f".//{a}blip")
+                r_id = blip.get(f"{{{R_NS}}}embed") if blip is not None else None
+                if not r_id:
+                    continue
+                name, path = media.store(r_id)
+                props = pic.find(f".//{xdr}cNvPr")
+                caption = (props.get("descr") or "") if props is not None else ""
+                found.append((row, {"type": "image", "path": path, "caption": caption,
+                                    "name": name}))
+    found.sort(key=lambda item: item[0])
+    return found
+
+def _is_row_empty(row: RowData) -> bool:
+    return row.non_empty == 0
+
+def _is_heading_row(row: RowData) -> bool:
     """
     以下の条件を1つ以上満たす場合、見出し行とみなす:
     - 結合セル かつ 太字
     - フォントサイズが12pt以上 かつ 太字
     - 背景色あり かつ 非空
     """
-    non_empty = [c for c in row_cells if c.value]
-    if not non_empty:
+    if not row.non_empty:
         return False
-    first = non_empty[0]
-    is_big_bold = first.is_bold and (first.font_size or 0) >= 12
-    is_merged_bold = first.is_merged and first.is_bold
-    has_bg = any(c.bg_color for c in non_empty)
-    return is_big_bold or is_merged_bold or (has_bg and first.is_bold)
+    is_big_bold = row.first_bold and row.first_size >= 12
+    is_merged_bold = row.first_merged and row.first_bold
+    return is_big_bold or is_merged_bold or (row.any_bg and row.first_bold)
 
-def _count_non_empty_cols(row_cells: List[CellData]) -> int:
-    return sum(1 for c in row_cells if c.value)
+def iter_elements(sheet: SheetData) -> Iterator[dict]:
+    """
+    シートの要素（見出し・表・本文・区切り）を先頭から順に返す。
+    解析は要素を取り出すたびに進むため、要素のリスト全体は作らない。
+    """
+    return _iter_structure(sheet.rows, sheet.images)
 
-def _analyze_structure(sheet: SheetData):
+def _iter_structure(rows: Iterable[RowData], images: List[Tuple[int, dict]] = ()) -> Iterator[dict]:
     """
     シートの構造を解析し、見出し・表・本文に分類する。
+    行を先頭から1回だけ読み、要素が確定するたびに返す（保持するのは作成中の表のみ）。
     
     アルゴリズム:
     1. 結合セル + 太字 + 大きいフォント → 見出し
     2. 背景色あり + 太字 → セクション見出し
     3. 連続する同列数の行 → テーブル
-    4. 空行 → セクション区切り（divider）
+    4. 空行 → セクション区切り（divider、連続する空行は1つ）
     5. 単一セルに長いテキスト → 本文（paragraph）
+    画像はアンカーの行に来たところに置く（作成中の表は分けず、表の直後に置く）。
     """
-    elements = []  # {"type": ..., ...}
-    
-    i = 0
-    rows = sheet.cells
-    n = len(rows)
-    
-    while i < n:
-        row = rows[i]
-        
+    table_rows = None  # 作成中のテーブル（空行・見出し行で確定する）
+    after_empty = False  # 直前が空行か（連続する空行は divider 1つにまとめる）
+    pending = list(images)
+
+    for r, row in enumerate(rows, start=1):
+        if table_rows is None:
+            yield from _due_images(pending, r)
+
         # 空行 → divider
         if _is_row_empty(row):
-            elements.append({"type": "divider"})
-            i += 1
+            if table_rows:
+                yield _table_element(table_rows)
+                table_rows = None
+                yield from _due_images(pending, r - 1)
+            if not after_empty:
+                yield {"type": "divider"}
+            after_empty = True
             continue
+        after_empty = False
         
         # 見出し行判定
         if _is_heading_row(row):
-            non_empty = [c for c in row if c.value]
-            text = " ".join(c.value for c in non_empty)
+            if table_rows:
+                yield _table_element(table_rows)
+                table_rows = None
+                yield from _due_images(pending, r)
+            text = " ".join(v for v in row.values if v)
             # レベル決定: merged+bold+big=1, merged+bold=2, bg+bold=3
-            first = non_empty[0]
-            if first.is_merged and first.is_bold and (first.font_size or 0) >= 14:
+            if row.first_merged and row.first_bold and row.first_size >= 14:
                 level = 1
-            elif first.is_merged and first.is_bold:
+            elif row.first_merged and row.first_bold:
                 level = 2
             else:
                 level = 3
-            elements.append({"type": "heading", "text": text, "level": level})
-            i += 1
+            yield {"type": "heading", "text": text, "level": level}
             continue
         
-        # テーブル検出: 次の行も同じ列数の非空行が続く
-        col_count = _count_non_empty_cols(row)
-        if col_count > 1:
-            # テーブル候補: 連続する行をまとめる
-            table_rows = []
-            while i < n and not _is_row_empty(rows[i]) and not _is_heading_row(rows[i]):
-                table_rows.append([c.value for c in rows[i]])
-                i += 1
-            if len(table_rows) >= 1:
-                headers = table_rows[0]
-                data = table_rows[1:]
-                elements.append({"type": "table", "headers": headers, "rows": data})
+        # テーブルの続き: 空行・見出し行までは列数によらず同じテーブル
+        if table_rows is not None:
+            table_rows.append(row.values)
+            continue
+
+        # テーブル検出: 2列以上埋まっている行から始まる
+        if row.non_empty > 1:
+            table_rows = [row.values]
             continue
         
         # 単一セル → 本文
-        text = " ".join(c.value for c in row if c.value)
-        if len(text) > 100:
-            elements.append({"type": "paragraph", "text": text})
-        elif text:
-            elements.append({"type": "paragraph", "text": text})
-        i += 1
-    
-    # SheetDataにelementsを格納（markdown_converterで使う）
-    sheet._elements = elements
-    # tablesにも互換性のために追加
-    for el in elements:
-        if el["type"] == "table":
-            sheet.tables.append(el)
+        text = " ".join(v for v in row.values if v)
+        if text:
+            yield {"type": "paragraph", "text": text}
+
+    if table_rows:
+        yield _table_element(table_rows)
+    for _, image in pending:
+        yield image
 
+def _due_images(pending: List[Tuple[int, dict]], row: int) -> Iterator[dict]:
+    """アンカーが row 行目までの画像を取り出す"""
+    while pending and pending[0][0] <= row:
+        yield pending.pop(0)[1]
 
-def _iterate_elements(sheet: SheetData):
-    """_analyze_structureが作ったelementsを返す（markdown_converter用）"""
-    return getattr(sheet, "_elements", sheet.tables)
+def _table_element(table_rows: List[List[str]]) -> dict:
+    return {"type": "table", "headers": table_rows[0], "rows": table_rows[1:]}
@@ -0,0 +1,69 @@
+"""
+カテゴリーフォルダ（ページ）ID のキャッシュ。
+
+プロセス内のメモリキャッシュに加え、path を指定するとJSONファイルにも保存し、
+次回以降の実行でも search を発行せずにフォルダIDを解決できるようにする。
+"""
+import os, json, time, threading
+from typing import Optional, Tuple
+
+DEFAULT_TTL = 7 * 24 * 3600  # ディスクキャッシュの有効期間（秒）
+
+class FolderCache:
+    def __init__(self, path: str = None, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._memory = {}   # category -> page_id（このプロセスで確認済み）
+        self._disk = {}     # category -> {"id": ..., "fetched_at": ...}
+        self._lock = threading.Lock()
+        self._category_locks = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._disk = json.load(f)
+            except (OSError, ValueError):
+                self._disk = {}
+
+    def lock_for(self, category: str) -> threading.Lock:
+        """カテゴリーごとのロック（並行ワーカーによる重複作成防止）"""
+        with self._lock:
+            return self._category_locks.setdefault(category, threading.Lock())
+
+    def get(self, category: str) -> Optional[Tuple[str, bool]]:
+        """
+        (page_id, fresh) を返す。fresh=False の場合はTTL切れのため、
+        呼び出し側で存在確認してから使うこと。
+        """
+        with self._lock:
+            if category in self._memory:
+                return self._memory[category], True
+            entry = self._disk.get(category)
+        if not entry:
+            return None
+        fresh = time.time() - entry.get("fetched_at", 0) < self.ttl
+        if fresh:
+            with self._lock:
+                self._memory[category] = entry["id"]
+        return entry["id"], fresh
+
+    def set(self, category: str, page_id: str):
+        with self._lock:
+            self._memory[category] = page_id
+            self._disk[category] = {"id": page_id, "fetched_at": time.time()}
+            self._save()
+
+    def invalidate(self, category: str):
+        """削除・アーカイブされたフォルダのエントリを破棄する"""
+        with self._lock:
+            self._memory.pop(category, None)
+            if self._disk.pop(category, None) is not None:
+                self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._disk, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
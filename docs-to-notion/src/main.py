@@ -1,29 +1,57 @@
-import sys, os, shutil
+import sys, os, shutil, time, argparse, asyncio, threading
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from rich.console import Console
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.stdout.reconfigure(encoding='utf-8')
 
-from excel_reader import read_excel
-from word_reader import read_word, convert_doc_to_docx
-from markdown_converter import convert_to_markdown
-from block_builder import markdown_to_notion_blocks
-from notion_client_wrapper import NotionPageCreator
+from excel_reader import iter_sheets, iter_elements, read_sheet, sheet_count
+from word_reader import read_word
+from doc_converter import DocConverter
+from media_store import MEDIA_DIR_ENV
+from markdown_converter import convert_to_markdown, excel_element_markdown
+from block_compiler import word_blocks, sheet_element_blocks, heading_block
+from block_builder import split_text
+from notion_client_wrapper import (NotionPageCreator, AsyncNotionPageCreator,
+                                   database_item_properties)
+from upload_journal import UploadJournal
+from batch_packer import pack_blocks, payload_size
+from database_builder import inline_database_block
+from csv_reader import iter_csv_elements
+from payload_store import EXTENSIONS, PayloadWriter, read_payload
+from upload_engine import UploadEngine, AsyncUploadEngine
+from sync_state import SyncState, file_sha256
 
 console = Console()
-SUPPORTED = {".xlsx", ".docx", ".doc"}
+SUPPORTED = {".xlsx", ".docx", ".doc", ".csv", ".tsv"}
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOLDER_CACHE_PATH = os.path.join(BASE_DIR, ".cache", "category_folders.json")
+JOURNAL_PATH = os.path.join(BASE_DIR, "upload_journal.sqlite3")
+SYNC_STATE_PATH = os.path.join(BASE_DIR, "sync_state.sqlite3")
+ARCHIVE_DIR = os.path.join(BASE_DIR, "archive")
+INPUT_DIR = os.path.join(BASE_DIR, "input")
+COMPILED_DIR = os.path.join(BASE_DIR, "compiled")
+DOC_CACHE_DIR = os.path.join(BASE_DIR, ".cache", "docx")
+MEDIA_DIR = os.path.join(BASE_DIR, ".cache", "media")
+TABLE_DB_ROWS_ENV = "NOTION_TABLE_DB_ROWS"
+DEBUG_MARKDOWN_ENV = "NOTION_DEBUG_MARKDOWN"
+# .doc の変換結果（内容ハッシュ単位のキャッシュ）。main で対象の .doc をまとめて変換し始める
+doc_converter = DocConverter(DOC_CACHE_DIR)
+# 文書から取り出した画像（compile した payload からも参照するため、一時フォルダではなくここに置く）
+os.environ.setdefault(MEDIA_DIR_ENV, MEDIA_DIR)
 
 def detect_type(path: str) -> str:
     ext = os.path.splitext(path)[1].lower()
     if ext == ".xlsx": return "excel"
     if ext == ".docx": return "word"
     if ext == ".doc": return "word_legacy"
+    if ext in (".csv", ".tsv"): return "csv"
     raise ValueError(f"未対応形式: {ext}")
 
 def archive_file(path: str):
     """ファイルを archive フォルダに移動する"""
-    archive_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "archive")
+    archive_dir = ARCHIVE_DIR
     if not os.path.exists(archive_dir):
         os.makedirs(archive_dir)
     
@@ -42,74 +70,555 @@ def guess_category(filename: str) -> str:
     if "事務" in filename: return "事務"
     return "その他"
 
-def process_file(path: str, creator: NotionPageCreator, parent_id: str = None):
+def convert_file(path: str):
+    """
+    ファイルを読み込んでNotionブロックに変換する。
+    (種別ラベル, [(ページタイトル, ブロック), ...]) を返す。
+    """
+    ftype = detect_type(path)
+    if ftype == "excel":
+        return "Excel", convert_excel(path)
+    if ftype == "csv":
+        return "CSV", convert_csv(path)
+    return "Word", convert_word(path)
+
+def convert_excel(path: str) -> list:
+    name = os.path.basename(path)
+    pages = []
+    # 大きなブックは読み取り専用モードで1シートずつ読みながら変換する
+    for sheet in iter_sheets(path):
+        title = f"{os.path.splitext(name)[0]} - {sheet.name}"
+        pages.append((title, sheet_blocks(sheet, title)))
+    console.print(f"  ✅ {len(pages)}シート検出")
+    return pages
+
+def convert_sheet(path: str, index: int) -> list:
+    """ブックの index 番目のシートだけを変換する（プロセスプールで並列実行する単位）"""
     name = os.path.basename(path)
+    sheet = read_sheet(path, index)
+    title = f"{os.path.splitext(name)[0]} - {sheet.name}"
+    return [(title, sheet_blocks(sheet, title))]
+
+def sheet_blocks(sheet, page_title: str = None) -> list:
+    """シートを要素ごとにブロックへ変換する（シート全体を保持しない）"""
+    return element_blocks(sheet.name, iter_elements(sheet), page_title)
+
+def convert_csv(path: str) -> list:
+    """CSV / TSV を1ページに変換する（表はチャンクごとに読みながら変換する）"""
+    title = os.path.splitext(os.path.basename(path))[0]
+    blocks = element_blocks(title, iter_csv_elements(path))
+    console.print(f"  ✅ {len(blocks)}ブロック生成")
+    return [(title, blocks)]
+
+def element_blocks(title: str, elements, page_title: str = None) -> list:
+    """
+    要素（見出し・表・本文・区切り）を1つずつブロックに変換する。
+    環境変数 NOTION_TABLE_DB_ROWS が1以上なら、その行数以上の表はインラインデータベースにする。
+    （プロセスプールの子プロセスにも引き継がれるよう、設定は環境変数で渡す）
+    CSV の表は CHUNK_ROWS 行ずつの要素（2つ目以降は "continued"）で届くため、
+    1つの表のチャンクをまとめ、合計の行数で判定して1つのデータベースにする。
+    環境変数 NOTION_DEBUG_MARKDOWN にフォルダを指定すると、同じ内容の Markdown も書き出す。
+    """
+    database_rows = int(os.environ.get(TABLE_DB_ROWS_ENV) or 0)
+    debug_md = [f"# {title}\n"] if os.environ.get(DEBUG_MARKDOWN_ENV) else None
+    blocks = [heading_block(1, split_text(title))]
+    chunks = []  # データベースにするか判定中の表のチャンク
+    for element in elements:
+        if debug_md is not None:
+            debug_md.append(excel_element_markdown(element))
+        if database_rows and element["type"] == "table":
+            if not (chunks and element.get("continued")):
+                blocks.extend(table_blocks(title, chunks, database_rows))
+                chunks = []
+            chunks.append(element)
+            continue
+        blocks.extend(table_blocks(title, chunks, database_rows))
+        chunks = []
+        blocks.extend(sheet_element_blocks(element))
+    blocks.extend(table_blocks(title, chunks, database_rows))
+    if debug_md is not None:
+        write_debug_markdown(page_title or title, "\n".join(md for md in debug_md if md))
+    return blocks
+
+def table_blocks(title: str, chunks: list, database_rows: int) -> list:
+    """
+    1つの表のチャンクを、合計 database_rows 行以上なら1つのインラインデータベース
+    （列の型は最初のチャンクの推定を使う）に、未満なら表ブロックにする
+    """
+    if not chunks:
+        return []
+    if sum(len(chunk["rows"]) for chunk in chunks) < database_rows:
+        return [block for chunk in chunks for block in sheet_element_blocks(chunk)]
+    first = chunks[0]
+    rows = [row for chunk in chunks for row in chunk["rows"]]
+    return [inline_database_block(title, first["headers"], rows, first.get("types"))]
+
+def write_debug_markdown(title: str, markdown: str):
+    """確認用の Markdown を NOTION_DEBUG_MARKDOWN のフォルダに書き出す"""
+    folder = os.environ[DEBUG_MARKDOWN_ENV]
+    os.makedirs(folder, exist_ok=True)
+    name = "".join("_" if c in '\\/:*?"<>|' else c for c in title)
+    with open(os.path.join(folder, f"{name}.md"), "w", encoding="utf-8") as f:
+        f.write(markdown)
+
+def convert_word(path: str) -> list:
+    name = os.path.basename(path)
+    if detect_type(path) == "word_legacy":
+        console.print("  🔄 .doc → .docx に変換中...")
+        path = doc_converter.convert(path)
+        console.print("  ✅ 変換完了")
+
+    elements = read_word(path)
+    console.print(f"  ✅ {len(elements)}要素検出")
+    title = os.path.splitext(name)[0]
+    if os.environ.get(DEBUG_MARKDOWN_ENV):
+        write_debug_markdown(title, convert_to_markdown(elements, source_type="word"))
+    return [(title, word_blocks(elements))]
+
+def submit_conversion(pool: ProcessPoolExecutor, path: str):
+    """
+    変換をプロセスプールに投入し、(種別ラベル, [Future, ...]) を返す（投入できなければ None）。
+    ブックはシートごとに分けて投入し、各 Future は [(ページタイトル, ブロック)] を返す。
+    """
+    ftype = detect_type(path)
+    if ftype == "csv":
+        return "CSV", [pool.submit(convert_csv, path)]
+    if ftype == "excel":
+        try:
+            count = sheet_count(path)
+        except Exception:
+            return None  # 開けないブックは process_file 側で変換してエラーを報告する
+        return "Excel", [pool.submit(convert_sheet, path, i) for i in range(count)]
+    return "Word", [submit_after_doc(pool, path, convert_word, path)]
+
+class ConversionWindow:
+    """
+    files の変換を先頭から順にプロセスプールへ投入する（先読みは ahead 件まで）。
+    take(path) はそのファイルの変換を返して手放すので、変換結果を持つのは処理中と先読みの分だけになる
+    （全ファイルを一度に投入すると、処理済みの結果まで実行の終わりまで残る）。
+    """
+
+    def __init__(self, pool: ProcessPoolExecutor, files: list, ahead: int):
+        self.pool = pool
+        self.files = list(files)
+        self.index = {f: i for i, f in enumerate(self.files)}
+        self.ahead = max(ahead, 1)
+        self.submitted = 0
+        self.conversions = {}
+        self.lock = threading.Lock()
+        self._fill(0)
+
+    def take(self, path: str):
+        """path の変換（submit_conversion の戻り値）を返し、その分だけ先読みを進める"""
+        with self.lock:
+            self._fill(self.index[path] + 1)
+            return self.conversions.pop(path, None)
+
+    def _fill(self, position: int):
+        while self.submitted < min(position + self.ahead, len(self.files)):
+            path = self.files[self.submitted]
+            self.conversions[path] = submit_conversion(self.pool, path)
+            self.submitted += 1
+
+def submit_after_doc(pool, path: str, fn, *args) -> Future:
+    """
+    fn(*args) をプールに投入する。.doc の場合は doc_converter での変換が終わってから投入し、
+    ワーカープロセスはキャッシュから読むだけにする（変換を重複して起動しない）。
+    """
+    if detect_type(path) != "word_legacy":
+        return pool.submit(fn, *args)
+    result = Future()
+
+    def relay(done: Future):
+        if done.exception():
+            result.set_exception(done.exception())
+        else:
+            result.set_result(done.result())
+
+    def submit(converted: Future):
+        try:
+            converted.result()
+            pool.submit(fn, *args).add_done_callback(relay)
+        except BaseException as e:
+            result.set_exception(e)
+
+    doc_converter.start([path])[path].add_done_callback(submit)
+    return result
+
+def upload_page(creator: NotionPageCreator, title: str, blocks: list, parent_id: str,
+                ftype: str, source: str, cat: str) -> int:
+    """1ページ分を送信し、書き込んだブロック数を返す（差分同期時は変更分のみ）"""
+    if creator.sync:
+        url, written = creator.sync_page(title=title, blocks=blocks, parent_id=parent_id,
+                                         ftype=ftype, source=source, cat=cat)
+    else:
+        url = creator.create_page(title=title, blocks=blocks, parent_id=parent_id,
+                                  ftype=ftype, source=source, cat=cat)
+        written = len(blocks)
+    console.print(f"  ✅ ページ作成: {url}")
+    return written
+
+def process_file(path: str, creator: NotionPageCreator, parent_id: str = None,
+                 conversion=None):
+    """
+    1ファイルを変換・アップロードし、送信したブロック数を返す（失敗時は None）。
+    conversion に submit_conversion の戻り値を渡すと、その変換結果を待って使う。
+    """
+    name = os.path.basename(path)
+    uploaded = 0
     try:
-        current_path = path
-        ftype = detect_type(current_path)
+        ftype = detect_type(path)
         cat = guess_category(name)
         console.print(f"\n[bold blue]📄 処理中: {name} ({ftype}) -> カテゴリー: {cat}[/bold blue]")
 
+        # 差分同期: 前回と同一内容のファイルは送信せずにアーカイブする
+        digest = file_sha256(path) if creator.sync else None
+        if digest and creator.sync.file_unchanged(name, digest):
+            console.print("  ⏭  前回から変更なし、スキップ")
+            archive_file(path)
+            return 0
+
         # ハイブリッド構成：カテゴリーフォルダの存在を確認（なければ作成）
         creator.ensure_category_folder(cat)
 
-        if ftype == "word_legacy":
-            console.print("  🔄 .doc → .docx に変換中...")
-            current_path = convert_doc_to_docx(current_path)
-            ftype = "word"
-            console.print("  ✅ 変換完了")
-
-        if ftype == "excel":
-            sheets = read_excel(current_path)
-            console.print(f"  ✅ {len(sheets)}シート検出")
-            for sheet in sheets:
-                md = convert_to_markdown(sheet, source_type="excel")
-                blocks = markdown_to_notion_blocks(md)
-                title = f"{os.path.splitext(name)[0]} - {sheet.name}"
-                url = creator.create_page(title=title, blocks=blocks, parent_id=parent_id, 
-                                        ftype="Excel", source=name, cat=cat)
-                console.print(f"  ✅ ページ作成: {url}")
-
-        elif ftype == "word":
-            elements = read_word(current_path)
-            console.print(f"  ✅ {len(elements)}要素検出")
-            md = convert_to_markdown(elements, source_type="word")
-            blocks = markdown_to_notion_blocks(md)
-            title = os.path.splitext(name)[0]
-            url = creator.create_page(title=title, blocks=blocks, parent_id=parent_id, 
-                                    ftype="Word", source=name, cat=cat)
-            console.print(f"  ✅ ページ作成: {url}")
+        if conversion:
+            label, futures = conversion
+            pages = [page for fut in futures for page in fut.result()]
+        else:
+            label, pages = convert_file(path)
+        for title, blocks in pages:
+            uploaded += upload_page(creator, title, blocks, parent_id,
+                                    ftype=label, source=name, cat=cat)
+
+        if digest:
+            creator.sync.mark_file(name, digest)
 
         # 正常終了したらアーカイブ移動
         archive_file(path)
+        if creator.journal:
+            creator.journal.forget(name)
+        return uploaded
 
     except Exception as e:
-        console.print(f"  [red]❌ エラー: {e}[/red]")
+        console.print(f"  [red]❌ エラー ({name}): {e}[/red]")
         import traceback
         traceback.print_exc()
+        return None
 
-def main():
+def compile_file(path: str, out_dir: str, compression: str = "none"):
+    """
+    1ファイルを変換し、送信用のプロパティとバッチを out_dir に書き出す（APIは呼ばない）。
+    書き出したブロック数を返す（失敗時は None）。入力ファイルはアーカイブしない。
+    """
+    name = os.path.basename(path)
     try:
-        creator = NotionPageCreator()
+        cat = guess_category(name)
+        console.print(f"\n[bold blue]📄 変換中: {name} -> カテゴリー: {cat}[/bold blue]")
+        label, pages = convert_file(path)
+        out = os.path.join(out_dir, name + EXTENSIONS[compression])
+        written = 0
+        with PayloadWriter(out) as writer:
+            writer.write_file(name, cat, label)
+            for title, blocks in pages:
+                properties = database_item_properties(title, label, name, cat)
+                batches = pack_blocks(blocks, first_reserve=payload_size(properties))
+                writer.write_page(title, properties, batches)
+                written += sum(len(batch) for batch in batches)
+        console.print(f"  💾 書き出し完了: {out}")
+        return written
     except Exception as e:
-        console.print(f"[red]❌ 初期化エラー: {e}[/red]")
-        return
+        console.print(f"  [red]❌ エラー ({name}): {e}[/red]")
+        import traceback
+        traceback.print_exc()
+        return None
 
-    # inputフォルダのファイルを検出
-    input_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "input")
-    files = [
+def replay_file(path: str, creator: NotionPageCreator, parent_id: str = None):
+    """compile で書き出したファイルを Notion に送信し、送信したブロック数を返す（失敗時は None）"""
+    name = os.path.basename(path)
+    uploaded = 0
+    source = name
+    try:
+        console.print(f"\n[bold blue]📤 送信中: {name}[/bold blue]")
+        for record in read_payload(path):
+            if record["kind"] == "file":
+                source = record["source"]
+                creator.ensure_category_folder(record["category"])
+                continue
+            url = creator.replay_page(record["title"], record["properties"], record["batches"],
+                                      source=source)
+            uploaded += sum(len(batch) for batch in record["batches"])
+            console.print(f"  ✅ ページ作成: {url}")
+
+        archive_file(path)
+        if creator.journal:
+            creator.journal.forget(source)
+        return uploaded
+
+    except Exception as e:
+        console.print(f"  [red]❌ エラー ({name}): {e}[/red]")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def run_compile(files: list, out_dir: str, compression: str = "none", workers: int = 1) -> dict:
+    """ファイル群を変換して書き出す。変換はCPU処理のため workers > 1 ではプロセスプールを使う"""
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"files": 0, "failed": 0, "blocks": 0}
+    if workers <= 1:
+        results = [compile_file(f, out_dir, compression) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [submit_after_doc(pool, f, compile_file, f, out_dir, compression)
+                       for f in files]
+            results = [fut.result() for fut in as_completed(futures)]
+    for result in results:
+        if result is None:
+            stats["failed"] += 1
+        else:
+            stats["files"] += 1
+            stats["blocks"] += result
+    return stats
+
+def run_files(files: list, creator: NotionPageCreator, workers: int = 1,
+              handler=process_file, parse_workers: int = 1) -> dict:
+    """
+    ファイル群を処理する。workers > 1 の場合はスレッドプールで並行処理する。
+    1ファイルは常に1ワーカーが担当するため、ページ内のブロック追加順は保たれる。
+    handler には process_file（既定）か replay_file を渡す。
+    parse_workers > 1 の場合は parse_workers * 2 件先までの変換をプロセスプールへ投入し、
+    アップロードと並行して複数コアで変換する。
+    """
+    if parse_workers > 1 and handler is process_file:
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            window = ConversionWindow(pool, files, parse_workers * 2)
+            return run_files(files, creator, workers,
+                             handler=lambda f, c: process_file(f, c, conversion=window.take(f)))
+
+    stats = {"files": 0, "failed": 0, "blocks": 0}
+
+    def record(result):
+        if result is None:
+            stats["failed"] += 1
+        else:
+            stats["files"] += 1
+            stats["blocks"] += result
+
+    if workers <= 1:
+        for f in files:
+            record(handler(f, creator))
+        return stats
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(handler, f, creator) for f in files]
+        for fut in as_completed(futures):
+            record(fut.result())
+    return stats
+
+async def process_file_async(path: str, creator: AsyncNotionPageCreator, parent_id: str = None,
+                             conversion=None):
+    """process_file の非同期版。変換はスレッド（またはプロセスプール）で行い、イベントループを止めない"""
+    name = os.path.basename(path)
+    uploaded = 0
+    try:
+        cat = guess_category(name)
+        console.print(f"\n[bold blue]📄 処理中: {name} ({detect_type(path)}) -> カテゴリー: {cat}[/bold blue]")
+        await creator.ensure_category_folder(cat)
+
+        if conversion:
+            label, futures = conversion
+            pages = [page for fut in futures for page in await asyncio.wrap_future(fut)]
+        else:
+            label, pages = await asyncio.to_thread(convert_file, path)
+        for title, blocks in pages:
+            url = await creator.create_page(title=title, blocks=blocks, parent_id=parent_id,
+                                            ftype=label, source=name, cat=cat)
+            uploaded += len(blocks)
+            console.print(f"  ✅ ページ作成: {url}")
+
+        archive_file(path)
+        if creator.journal:
+            creator.journal.forget(name)
+        return uploaded
+
+    except Exception as e:
+        console.print(f"  [red]❌ エラー ({name}): {e}[/red]")
+        import traceback
+        traceback.print_exc()
+        return None
+
+async def run_files_async(files: list, creator: AsyncNotionPageCreator, workers: int = 1,
+                          parse_workers: int = 1) -> dict:
+    """ファイル群を asyncio で並行処理する（同時処理数は workers まで）"""
+    semaphore = asyncio.Semaphore(max(workers, 1))
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 1 else None
+    window = ConversionWindow(pool, files, parse_workers * 2) if pool else None
+
+    async def run_one(path):
+        async with semaphore:
+            conversion = window.take(path) if window else None
+            return await process_file_async(path, creator, conversion=conversion)
+
+    try:
+        results = await asyncio.gather(*(run_one(f) for f in files))
+    finally:
+        await creator.aclose()
+        if pool:
+            pool.shutdown()
+    return {
+        "files": sum(1 for r in results if r is not None),
+        "failed": sum(1 for r in results if r is None),
+        "blocks": sum(r for r in results if r is not None),
+    }
+
+def start_doc_conversion(files: list, workers: int = 1) -> list:
+    """
+    .doc の変換をまとめてバックグラウンドで始める（他のファイルの処理と並行して進む）。
+    変換を待つ .doc は後ろに回した順で files を返す。
+    """
+    legacy = [f for f in files if detect_type(f) == "word_legacy"]
+    if not legacy:
+        return files
+    doc_converter.workers = max(workers, 1)
+    doc_converter.start(legacy)
+    console.print(f"  🔄 .doc {len(legacy)}件を .docx に変換中 (LibreOffice × {doc_converter.workers})")
+    return [f for f in files if detect_type(f) != "word_legacy"] + legacy
+
+def report_throughput(stats: dict, elapsed: float):
+    """処理件数とスループットを表示する"""
+    minutes = elapsed / 60 if elapsed > 0 else 0
+    files_per_min = stats["files"] / minutes if minutes else 0.0
+    blocks_per_sec = stats["blocks"] / elapsed if elapsed > 0 else 0.0
+    console.print(
+        f"\n[bold green]🏁 完了: 成功 {stats['files']} / 失敗 {stats['failed']} ファイル, "
+        f"{stats['blocks']} ブロック, {elapsed:.1f}秒[/bold green]"
+    )
+    console.print(f"  ⏱  {files_per_min:.1f} ファイル/分, {blocks_per_sec:.1f} ブロック/秒")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Excel / Word / CSV → Notion インポート")
+    parser.add_argument("command", nargs="?", default="upload",
+                        choices=["upload", "compile", "replay"],
+                        help="upload: 変換して送信（既定） / compile: 変換結果をファイルに書き出す"
+                             " / replay: 書き出したファイルを送信する")
+    parser.add_argument("--out", default=COMPILED_DIR,
+                        help="compile の出力先・replay の読み込み元（既定: compiled/）")
+    parser.add_argument("--compress", choices=list(EXTENSIONS), default="none",
+                        help="compile の圧縮形式（zstd は zstandard パッケージが必要）")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="並行処理するファイル数（既定: 1 = 逐次処理）")
+    parser.add_argument("--parse-workers", type=int, default=1,
+                        help="変換に使うプロセス数（既定: 1 = アップロードと同じワーカー内で変換）")
+    parser.add_argument("--doc-workers", type=int, default=1,
+                        help=".doc の変換で同時に動かす LibreOffice の数（既定: 1）")
+    parser.add_argument("--table-db-rows", type=int, default=None,
+                        help="この行数以上の表をインラインデータベースとして取り込む"
+                             "（既定: 環境変数 NOTION_TABLE_DB_ROWS、未設定なら表ブロックのまま）")
+    parser.add_argument("--debug-markdown", metavar="DIR",
+                        help="変換結果を確認用の Markdown としてこのフォルダにも書き出す")
+    parser.add_argument("--no-folder-cache", action="store_true",
+                        help="カテゴリーフォルダIDをディスクにキャッシュしない")
+    parser.add_argument("--sync", action="store_true",
+                        help="既存ページを差分更新する（変更のないファイル・ブロックは送信しない）")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="asyncio 版のクライアントで並行アップロードする（--sync とは併用不可）")
+    parser.add_argument("--http2", action="store_true",
+                        help="HTTP/2 で接続する（h2 パッケージが必要）")
+    return parser.parse_args(argv)
+
+def find_inputs(input_dir: str) -> list:
+    """input フォルダの対応形式のファイルを返す"""
+    return [
         os.path.join(input_dir, f)
         for f in os.listdir(input_dir)
         if os.path.splitext(f)[1].lower() in SUPPORTED
     ]
 
+def find_compiled(out_dir: str) -> list:
+    """compile で書き出したファイルを返す"""
+    if not os.path.isdir(out_dir):
+        return []
+    return sorted(
+        os.path.join(out_dir, f)
+        for f in os.listdir(out_dir)
+        if any(f.endswith(ext) for ext in EXTENSIONS.values())
+    )
+
+def main(argv=None):
+    args = parse_args(argv)
+    folder_cache = None if args.no_folder_cache else FOLDER_CACHE_PATH
+    if args.use_async and args.sync:
+        console.print("[red]❌ --async と --sync は同時に指定できません[/red]")
+        return
+    if args.command != "upload" and (args.use_async or args.sync):
+        console.print(f"[red]❌ {args.command} では --async / --sync は使えません[/red]")
+        return
+    if args.table_db_rows is not None:
+        os.environ[TABLE_DB_ROWS_ENV] = str(args.table_db_rows)
+    if args.debug_markdown:
+        os.environ[DEBUG_MARKDOWN_ENV] = os.path.abspath(args.debug_markdown)
+    if args.sync and int(os.environ.get(TABLE_DB_ROWS_ENV) or 0):
+        # 差分同期はブロック単位の比較のため、データベース化した表は扱えない
+        console.print("[yellow]⚠️ --sync では表をインラインデータベースにせず、表ブロックで送信します[/yellow]")
+        os.environ[TABLE_DB_ROWS_ENV] = "0"
+
+    if args.command == "compile":
+        files = find_inputs(INPUT_DIR)
+        if not files:
+            console.print("[red]❌ input/ にファイルが見つかりません (.xlsx/.docx/.doc/.csv/.tsv)[/red]")
+            return
+        console.print(f"[bold green]🛠  {len(files)}ファイルを変換 (workers={args.workers})[/bold green]")
+        started = time.perf_counter()
+        files = start_doc_conversion(files, args.doc_workers)
+        stats = run_compile(files, args.out, args.compress, workers=args.workers)
+        report_throughput(stats, time.perf_counter() - started)
+        return
+    try:
+        connections = max(args.workers, 1)
+        if args.use_async:
+            engine = AsyncUploadEngine(max_connections=connections, http2=args.http2)
+            creator = AsyncNotionPageCreator(folder_cache_path=folder_cache,
+                                             journal=UploadJournal(JOURNAL_PATH),
+                                             engine=engine)
+        else:
+            engine = UploadEngine(max_connections=connections, http2=args.http2)
+            creator = NotionPageCreator(folder_cache_path=folder_cache,
+                                        journal=UploadJournal(JOURNAL_PATH),
+                                        sync=SyncState(SYNC_STATE_PATH) if args.sync else None,
+                                        engine=engine)
+    except Exception as e:
+        console.print(f"[red]❌ 初期化エラー: {e}[/red]")
+        return
+
+    if args.command == "replay":
+        files = find_compiled(args.out)
+        if not files:
+            console.print(f"[red]❌ {args.out} に送信するファイルがありません[/red]")
+            return
+        console.print(f"[bold green]🚀 {len(files)}ファイルを送信 (workers={args.workers})[/bold green]")
+        started = time.perf_counter()
+        stats = run_files(files, creator, workers=args.workers, handler=replay_file)
+        report_throughput(stats, time.perf_counter() - started)
+        console.print(f"  📡 API: {creator.scheduler.summary()}")
+        return
+
+    # inputフォルダのファイルを検出
+    files = find_inputs(INPUT_DIR)
+
     if not files:
-        console.print("[red]❌ input/ にファイルが見つかりません (.xlsx/.docx/.doc)[/red]")
+        console.print("[red]❌ input/ にファイルが見つかりません (.xlsx/.docx/.doc/.csv/.tsv)[/red]")
         return
 
-    console.print(f"[bold green]🚀 {len(files)}ファイルを処理[/bold green]")
-    for f in files:
-        process_file(f, creator)
+    console.print(f"[bold green]🚀 {len(files)}ファイルを処理 (workers={args.workers})[/bold green]")
+    started = time.perf_counter()
+    files = start_doc_conversion(files, args.doc_workers)
+    if args.use_async:
+        stats = asyncio.run(run_files_async(files, creator, workers=args.workers,
+                                            parse_workers=args.parse_workers))
+    else:
+        stats = run_files(files, creator, workers=args.workers,
+                          parse_workers=args.parse_workers)
+    report_throughput(stats, time.perf_counter() - started)
+    console.print(f"  📡 API: {creator.scheduler.summary()}")
 
 if __name__ == "__main__":
     main()
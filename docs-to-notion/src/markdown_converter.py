@@ -2,17 +2,15 @@ from typing import List
 import re
 
 def convert_to_markdown(source, source_type: str = "auto") -> str:
-    """Excel SheetDataまたはWord DocElementリストをMarkdownに変換する"""
+    """
+    Word DocElementリストをMarkdownに変換する。
+    Excel / CSV の要素は excel_element_markdown で1つずつ変換する（シート単位の変換はない）。
+    """
     if source_type == "auto":
-        if hasattr(source, "name"):  # SheetData
-            source_type = "excel"
-        else:
-            source_type = "word"
-
-    if source_type == "word":
-        return _convert_word_elements(source)
-    else:
-        return _convert_excel_sheet(source)
+        source_type = "excel" if hasattr(source, "name") else "word"  # SheetData は name を持つ
+    if source_type != "word":
+        raise ValueError("Excel の Markdown 変換は excel_element_markdown を要素ごとに使ってください")
+    return _convert_word_elements(source)
 
 def _convert_word_elements(elements: List) -> str:
     """DocElementリストをMarkdownに変換する"""
@@ -48,7 +46,8 @@ def _convert_word_elements(elements: List) -> str:
                 md_parts.append(f"{indent}- {text}")
 
         elif el.type == "image":
-            md_parts.append(f"[画像: {el.content}]")
+            md_parts.append(_image_markdown(el.metadata.get("path"), el.metadata.get("caption", ""),
+                                            el.content))
             md_parts.append("")
 
         elif el.type == "divider":
@@ -81,37 +80,40 @@ def _clean_list_text(text: str) -> str:
     text = re.sub(r"^[①②③④⑤⑥⑦⑧⑨⑩]\s*", "", text)
     return text.strip()
 
-def _convert_excel_sheet(sheet) -> str:
-    """Excel SheetDataをMarkdownに変換する"""
+def excel_element_markdown(element: dict) -> str:
+    """シートの要素1つをMarkdown片（空行で終わる）にする。対象外の要素は空文字"""
     md_parts = []
-    md_parts.append(f"# {sheet.name}")
-    md_parts.append("")
-
-    from excel_reader import _iterate_elements
-    elements = _iterate_elements(sheet)
-
-    for element in elements:
-        if element["type"] == "heading":
-            level = element.get("level", 2)
-            md_parts.append(f"{'#' * level} {element['text']}")
-            md_parts.append("")
-        elif element["type"] == "table":
-            md_parts.append(_format_table(element["headers"], element["rows"]))
-            md_parts.append("")
-        elif element["type"] == "paragraph":
-            md_parts.append(element["text"])
-            md_parts.append("")
-        elif element["type"] == "list":
-            for item in element.get("items", []):
-                prefix = "-" if element.get("style") == "bullet" else f"{item.get('index', 1)}."
-                md_parts.append(f"{prefix} {item['text']}")
-            md_parts.append("")
-        elif element["type"] == "divider":
-            md_parts.append("---")
-            md_parts.append("")
-
+    if element["type"] == "heading":
+        level = element.get("level", 2)
+        md_parts.append(f"{'#' * level} {element['text']}")
+        md_parts.append("")
+    elif element["type"] == "table":
+        md_parts.append(_format_table(element["headers"], element["rows"]))
+        md_parts.append("")
+    elif element["type"] == "paragraph":
+        md_parts.append(element["text"])
+        md_parts.append("")
+    elif element["type"] == "list":
+        for item in element.get("items", []):
+            prefix = "-" if element.get("style") == "bullet" else f"{item.get('index', 1)}."
+            md_parts.append(f"{prefix} {item['text']}")
+        md_parts.append("")
+    elif element["type"] == "image":
+        md_parts.append(_image_markdown(element.get("path"), element.get("caption", ""),
+                                        element.get("name", "")))
+        md_parts.append("")
+    elif element["type"] == "divider":
+        md_parts.append("---")
+        md_parts.append("")
     return "\n".join(md_parts)
 
+def _image_markdown(path, caption: str, label: str) -> str:
+    """保存済みの画像は ![説明](パス)、保存できなかった画像（EMF など）は [画像: 名前]"""
+    caption = " ".join(caption.split()).replace("]", "］")
+    if path:
+        return f"![{caption}]({path})"
+    return f"[画像: {caption or label}]"
+
 def _format_table(headers: List, rows: List) -> str:
     """Markdownテーブルを生成する"""
     def escape(s):
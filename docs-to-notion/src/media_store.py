@@ -0,0 +1,142 @@
+"""
+文書に埋め込まれた画像の取り出しと、内容ハッシュ（SHA-256）による保存。
+
+Word / Excel の読み込み時に画像を媒体フォルダ（環境変数 NOTION_MEDIA_DIR、
+未設定なら一時ディレクトリ）へ "<sha256><拡張子>" の名前で書き出し、要素には保存先だけを持たせる。
+同じ画像（ロゴ・印影など）は何度出てきても1ファイルになる。
+
+ブロック列の中では "local_image" 型の擬似ブロックとして置き、UploadEngine が送信直前に
+Notion のファイルアップロードを参照する image ブロックに置き換える（Notion API のブロック型ではない）。
+アップロードは内容ハッシュごとに1回だけ行い、以降は同じ file_upload を参照する。
+"""
+import os, hashlib, tempfile, threading, posixpath, zipfile
+from typing import Dict, List, Optional, Tuple
+from lxml import etree
+
+MEDIA_DIR_ENV = "NOTION_MEDIA_DIR"
+LOCAL_IMAGE = "local_image"
+SINGLE_PART_MAX = 20 * 1024 * 1024   # これを超えるファイルは分割して送る
+PART_SIZE = 10 * 1024 * 1024
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+IMAGE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+
+# Notion の image ブロックが受け付ける形式（EMF / WMF などはプレースホルダーのまま）
+IMAGE_TYPES = {
+    ".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".gif": "image/gif",
+    ".bmp": "image/bmp", ".svg": "image/svg+xml", ".tif": "image/tiff", ".tiff": "image/tiff",
+    ".heic": "image/heic", ".webp": "image/webp",
+}
+
+def media_dir() -> str:
+    return os.environ.get(MEDIA_DIR_ENV) or os.path.join(tempfile.gettempdir(), "docs-to-notion-media")
+
+def store_media(data: bytes, name: str) -> Optional[str]:
+    """
+    画像を媒体フォルダに保存し、保存先のパスを返す（同じ内容は既存のファイルを使う）。
+    Notion で表示できない形式の場合は None。
+    """
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in IMAGE_TYPES:
+        return None
+    folder = media_dir()
+    path = os.path.join(folder, hashlib.sha256(data).hexdigest() + ext)
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, path)
+    return path
+
+def read_rels(zf: zipfile.ZipFile, part: str) -> Dict[str, Tuple[str, str, bool]]:
+    """
+    OOXML パッケージ内の part のリレーションを r:id → (Type, Target, 外部参照か) で返す。
+    内部参照の Target はパッケージ内のパスに解決する。
+    """
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", name + ".rels")
+    if rels_path not in zf.NameToInfo:
+        return {}
+    rels = {}
+    for rel in etree.fromstring(zf.read(rels_path)).iterchildren(f"{{{PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target", "")
+        external = rel.get("TargetMode") == "External"
+        if not external:
+            target = posixpath.normpath(posixpath.join(folder, target)).lstrip("/")
+        rels[rel.get("Id")] = (rel.get("Type", ""), target, external)
+    return rels
+
+class PackageMedia:
+    """OOXML パッケージ内の1つのパートから参照される画像を保存する（同じ画像パートは1回だけ読む）"""
+
+    def __init__(self, zf: zipfile.ZipFile, rels: Dict[str, Tuple[str, str, bool]]):
+        self._zf = zf
+        self._rels = rels
+        self._stored: Dict[str, Optional[str]] = {}
+
+    def store(self, r_id: str) -> Tuple[str, Optional[str]]:
+        """r:id の画像を保存し、(ファイル名, 保存先のパス) を返す（保存できなければパスは None）"""
+        rel_type, target, external = self._rels.get(r_id, ("", "", True))
+        if rel_type != IMAGE_REL or external or target not in self._zf.NameToInfo:
+            return posixpath.basename(target), None
+        if target not in self._stored:
+            self._stored[target] = store_media(self._zf.read(target), target)
+        return posixpath.basename(target), self._stored[target]
+
+def local_image_block(path: str, caption: str = "") -> dict:
+    return {"object": "block", "type": LOCAL_IMAGE, LOCAL_IMAGE: {"path": path, "caption": caption}}
+
+def is_local_image(block: dict) -> bool:
+    return block.get("type") == LOCAL_IMAGE
+
+def media_key(spec: dict) -> str:
+    """擬似ブロックの画像の内容ハッシュ（保存先のファイル名）"""
+    return os.path.splitext(os.path.basename(spec["path"]))[0]
+
+def upload_parts(path: str) -> Tuple[str, str, List[bytes]]:
+    """アップロードする (ファイル名, Content-Type, 分割したデータ) を返す（1つなら単一パート）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    name = os.path.basename(path)
+    content_type = IMAGE_TYPES[os.path.splitext(name)[1].lower()]
+    if len(data) <= SINGLE_PART_MAX:
+        return name, content_type, [data]
+    return name, content_type, [data[i:i + PART_SIZE] for i in range(0, len(data), PART_SIZE)]
+
+def image_block(file_upload_id: str, caption: str = "") -> dict:
+    image = {"type": "file_upload", "file_upload": {"id": file_upload_id}}
+    if caption:
+        image["caption"] = [{"type": "text", "text": {"content": caption[:2000]}}]
+    return {"object": "block", "type": "image", "image": image}
+
+def placeholder_block(spec: dict) -> dict:
+    """アップロードできなかった画像の代わりに置く段落"""
+    label = spec.get("caption") or os.path.basename(spec["path"])
+    return {"object": "block", "type": "paragraph",
+            "paragraph": {"rich_text": [{"type": "text", "text": {"content": f"[画像: {label}]"}}]}}
+
+def media_specs(batches: List[List[dict]]) -> Dict[str, dict]:
+    """バッチ内の画像の擬似ブロックを内容ハッシュ → 指定にまとめる（同じ画像は1つ）"""
+    return {media_key(block[LOCAL_IMAGE]): block[LOCAL_IMAGE]
+            for batch in batches for block in batch if is_local_image(block)}
+
+def replace_media(batches: List[List[dict]], uploaded: Dict[str, Optional[str]]) -> List[List[dict]]:
+    """
+    画像の擬似ブロックを、内容ハッシュ → file_upload の ID に従って image ブロックに置き換える
+    （ID が None の画像はプレースホルダーの段落にする）。
+    """
+    replaced = []
+    for batch in batches:
+        if not any(is_local_image(block) for block in batch):
+            replaced.append(batch)
+            continue
+        out = []
+        for block in batch:
+            if is_local_image(block):
+                spec = block[LOCAL_IMAGE]
+                upload_id = uploaded.get(media_key(spec))
+                block = image_block(upload_id, spec.get("caption", "")) if upload_id \
+                    else placeholder_block(spec)
+            out.append(block)
+        replaced.append(out)
+    return replaced
@@ -1,116 +1,303 @@
-import os
-from notion_client import Client
+import os, asyncio
+from notion_client import APIResponseError
 from dotenv import load_dotenv
 from typing import List
 from datetime import datetime
+from rate_limiter import RequestScheduler, AsyncRequestScheduler
+from folder_cache import FolderCache
+from batch_packer import split_oversized_blocks
+from upload_journal import UploadJournal
+from sync_state import SyncState, block_hashes
+from upload_engine import UploadEngine, AsyncUploadEngine, get_engine, call_step
+from difflib import SequenceMatcher
 
 load_dotenv()
-BATCH_SIZE = 100  # Notion APIの上限
+# チームスペースのメインページ（親ページ）
+TEAMSPACE_ID = os.environ.get("NOTION_TEAMSPACE_ID", "30c03344-ad0f-808c-8470-c4534446ad65")
+DEFAULT_DATABASE_ID = "db4b008caf5a4240b942d0e44d09c1ac"
 
-class NotionPageCreator:
-    def __init__(self):
-        self.client = Client(auth=os.environ["NOTION_API_KEY"])
-        # チームスペースのメインページ（親ページ）
-        self.teamspace_id = "30c03344-ad0f-808c-8470-c4534446ad65" 
-        self.database_id = os.environ.get("NOTION_DATABASE_ID", "db4b008caf5a4240b942d0e44d09c1ac")
+class _CreatorSteps:
+    """
+    同期版・非同期版の PageCreator で共通の手順（フォルダIDのキャッシュと検索・作成、
+    データベース項目とコンテナページの作成内容）。手順は engine.run_steps で実行する。
+    """
 
-    def ensure_category_folder(self, category_name: str) -> str:
+    def _setup(self, engine, folder_cache_path: str, journal: UploadJournal):
+        # 全API呼び出しは共通エンジン（接続プール・レート制限・再試行）経由
+        self.engine = engine
+        self.client = self.engine.client
+        self.scheduler = self.engine.scheduler
+        # カテゴリー → フォルダページID（folder_cache_path 指定時はディスクにも保存）
+        self.folders = FolderCache(folder_cache_path)
+        # 途中失敗したページを再開するためのチェックポイント（任意）
+        self.journal = journal
+        self.teamspace_id = TEAMSPACE_ID
+        self.database_id = os.environ.get("NOTION_DATABASE_ID", DEFAULT_DATABASE_ID)
+
+    def _folder_steps(self, category_name: str):
+        """
+        キャッシュ済みならAPIを呼ばない。TTL切れのキャッシュは存在確認してから使う。
+        キャッシュに無ければ検索し、見つからなければ作成する。
+        """
+        cached = self.folders.get(category_name)
+        if cached:
+            page_id, fresh = cached
+            if fresh:
+                return page_id
+            if (yield from self._folder_exists_steps(page_id)):
+                self.folders.set(category_name, page_id)
+                return page_id
+            self.folders.invalidate(category_name)
+
+        page_id = yield from self._find_or_create_steps(category_name)
+        self.folders.set(category_name, page_id)
+        return page_id
+
+    def _folder_exists_steps(self, page_id: str):
+        try:
+            page = yield call_step(self.client.pages.retrieve, page_id=page_id, idempotent=True)
+        except APIResponseError as e:
+            if e.status == 404:
+                return False
+            raise
+        return not (page.get("archived") or page.get("in_trash"))
+
+    def _find_or_create_steps(self, category_name: str):
         """
         指定したカテゴリーのフォルダ（ページ）が存在するか確認し、なければ作成する。
         フォルダ内にはデータベースのリンクビューを設置する。
         """
         folder_title = f"📁 {category_name}"
-        
+
         # 1. 既存のフォルダ（ページ）を検索
-        search_results = self.client.search(
-            query=folder_title,
-            filter={"property": "object", "value": "page"}
-        ).get("results", [])
-        
-        for res in search_results:
-            title_list = res.get("properties", {}).get("title", {}).get("title", [])
-            if title_list and title_list[0].get("plain_text") == folder_title:
-                return res["id"]
+        search = yield call_step(self.client.search, query=folder_title,
+                                 filter={"property": "object", "value": "page"},
+                                 idempotent=True)
+        folder_id = _match_folder(search.get("results", []), folder_title)
+        if folder_id:
+            return folder_id
 
         # 2. 存在しない場合は新規作成
         print(f"  Creating category folder: {folder_title}")
-        
-        children = [
-            {
-                "object": "block",
-                "type": "heading_2",
-                "heading_2": {"rich_text": [{"type": "text", "text": {"content": f"{category_name} の文書一覧"}}]}
-            },
-            {
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {"rich_text": [
-                    {"type": "text", "text": {"content": "※以下のデータベースビューでサイドピークをご利用いただけます。"}},
-                    {"type": "text", "text": {"content": "\n（フィルター設定：カテゴリー が "}},
-                    {"type": "text", "annotations": {"italic": True}, "text": {"content": category_name}},
-                    {"type": "text", "text": {"content": " に一致するもの）"}}
-                ]}
-            },
-            {
-                "object": "block",
-                "type": "link_to_page",
-                "link_to_page": {
-                    "type": "database_id",
-                    "database_id": self.database_id
-                }
-            }
-        ]
-        
-        response = self.client.pages.create(
-            parent={"page_id": self.teamspace_id},
-            properties={"title": [{"text": {"content": folder_title}}]},
-            children=children
-        )
+        response = yield call_step(self.client.pages.create,
+                                   parent={"page_id": self.teamspace_id},
+                                   properties={"title": [{"text": {"content": folder_title}}]},
+                                   children=_folder_children(category_name, self.database_id))
+        return response["id"]
+
+    def _container_steps(self, title: str, parent_id: str = None):
+        response = yield call_step(self.client.pages.create,
+                                   parent={"page_id": parent_id or self.teamspace_id},
+                                   properties={"title": [{"text": {"content": title}}]},
+                                   children=[])
         return response["id"]
 
+    def _item_request(self, title: str, parent_id: str, ftype: str, source: str, cat: str):
+        """データベース項目の (parent, properties)。親IDが指定されていない場合はデータベースへ"""
+        print(f"  Creating database item: '{title}' (category: {cat})")
+        return ({"database_id": parent_id or self.database_id},
+                database_item_properties(title, ftype, source, cat))
+
+class NotionPageCreator(_CreatorSteps):
+    def __init__(self, scheduler: RequestScheduler = None, folder_cache_path: str = None,
+                 journal: UploadJournal = None, sync: SyncState = None,
+                 engine: UploadEngine = None):
+        self._setup(engine or (UploadEngine(scheduler=scheduler) if scheduler else get_engine()),
+                    folder_cache_path, journal)
+        # 差分同期用の既存ページ対応表（任意）
+        self.sync = sync
+
+    def ensure_category_folder(self, category_name: str) -> str:
+        """
+        指定したカテゴリーのフォルダ（ページ）のIDを返す。
+        キャッシュ済みならAPIを呼ばない。TTL切れのキャッシュは存在確認してから使う。
+        """
+        with self.folders.lock_for(category_name):
+            return self.engine.run_steps(self._folder_steps(category_name))
+
     def create_page(self, title: str, blocks: List[dict], parent_id: str = None, 
                     ftype: str = "Other", source: str = "", cat: str = "その他") -> str:
         """
-        ページを作成し、ブロックを100件ずつのバッチで追加する。
+        ページを作成し、ブロックをリクエスト上限に収まるバッチで追加する。
         """
-        # 親IDが指定されていない場合はデータベースへ
-        pid = parent_id or self.database_id
-        
-        # 最初の100件と残りを分割
-        first_batch = blocks[:BATCH_SIZE]
-        remaining = blocks[BATCH_SIZE:]
+        return self._create_page(title, blocks, parent_id, ftype, source, cat)[1]
 
-        print(f"  Creating database item: '{title}' (category: {cat})")
-        
-        parent_obj = {"database_id": pid}
-        properties = {
-            "Name": {"title": [{"text": {"content": title}}]},
-            "種別": {"select": {"name": ftype}},
-            "カテゴリー": {"select": {"name": cat}},
-            "元ファイル": {"rich_text": [{"text": {"content": source}}]},
-            "インポート日時": {"date": {"start": datetime.now().isoformat()}}
-        }
+    def _create_page(self, title: str, blocks: List[dict], parent_id: str,
+                     ftype: str, source: str, cat: str):
+        """create_page の本体。(page_id, url) を返す"""
+        parent, properties = self._item_request(title, parent_id, ftype, source, cat)
+        # 前回途中で失敗したページがあれば、エンジンがその続きから追加する
+        return self.engine.create_page(parent, properties, blocks,
+                                       journal=self.journal, source=source, title=title)
 
-        response = self.client.pages.create(
-            parent=parent_obj,
-            properties=properties,
-            children=first_batch
-        )
-        page_id = response["id"]
-        url = response["url"]
+    def replay_page(self, title: str, properties: dict, batches: List[List[dict]],
+                    source: str = "") -> str:
+        """compile 済みのプロパティとバッチからページを作成する（インポート日時は送信時刻にする）"""
+        properties = {**properties, **_import_date_property()}
+        print(f"  Creating database item: '{title}'")
+        _, url = self.engine.create_page_batches({"database_id": self.database_id}, properties,
+                                                 batches, journal=self.journal,
+                                                 source=source, title=title)
+        return url
 
-        for i in range(0, len(remaining), BATCH_SIZE):
-            batch = remaining[i:i + BATCH_SIZE]
-            self.client.blocks.children.append(block_id=page_id, children=batch)
+    def sync_page(self, title: str, blocks: List[dict], parent_id: str = None,
+                  ftype: str = "Other", source: str = "", cat: str = "その他"):
+        """
+        差分同期。同じ元ファイル・タイトルのページが既にあれば、
+        変わったブロックだけを追加・置換・削除する。なければ create_page と同じく新規作成する。
+        (url, 書き込んだブロック数) を返す。
+        """
+        blocks = split_oversized_blocks(blocks)
+        hashes = block_hashes(blocks)
+        entry = self.sync.get_page(source, title)
 
-        return url
+        if entry:
+            if entry["block_hashes"] == hashes:
+                print(f"  Unchanged: '{title}'")
+                return entry["url"], 0
+            try:
+                written = self._patch_page(entry["page_id"], entry["block_hashes"], blocks, hashes)
+                self.scheduler.call(self.client.pages.update, page_id=entry["page_id"],
+                                    properties=_import_date_property(), idempotent=True)
+                self.sync.save_page(source, title, entry["page_id"], entry["url"], hashes)
+                print(f"  Updated '{title}': {written} blocks written")
+                return entry["url"], written
+            except APIResponseError as e:
+                if e.status != 404:
+                    raise
+                print(f"  Synced page not found, recreating '{title}'")
+                self.sync.drop_page(source, title)
+
+        page_id, url = self._create_page(title, blocks, parent_id, ftype, source, cat)
+        self.sync.save_page(source, title, page_id, url, hashes)
+        return url, len(blocks)
+
+    def _patch_page(self, page_id: str, old_hashes: List[str], blocks: List[dict],
+                    new_hashes: List[str]) -> int:
+        """ハッシュ列の差分に従ってページ直下のブロックを書き換え、書き込んだブロック数を返す"""
+        ids = self._list_child_ids(page_id)
+        ops = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False).get_opcodes()
+        # 記録と実ページがずれている、または先頭への挿入が必要（after 指定ができない）場合は全置換
+        if len(ids) != len(old_hashes) or (ops and ops[0][0] in ("insert", "replace")
+                                           and ops[0][1] == 0 and ops[0][3] == 0):
+            ops = [("replace", 0, len(ids), 0, len(blocks))]
+        return self._apply_ops(page_id, ids, blocks, ops)
+
+    def _apply_ops(self, page_id: str, ids: List[str], blocks: List[dict], ops) -> int:
+        written = 0
+        anchor = None  # 直前に残す（または追加した）ブロックのID
+        for tag, i1, i2, j1, j2 in ops:
+            if tag == "equal":
+                anchor = ids[i2 - 1]
+                continue
+            if tag in ("delete", "replace"):
+                for block_id in ids[i1:i2]:
+                    self.scheduler.call(self.client.blocks.delete, block_id=block_id,
+                                        idempotent=True)
+            if tag in ("insert", "replace") and j2 > j1:
+                created = self.engine.append_blocks(page_id, blocks[j1:j2], after=anchor)
+                if created:
+                    anchor = created[-1]["id"]
+                written += j2 - j1
+        return written
+
+    def _list_child_ids(self, page_id: str) -> List[str]:
+        ids, cursor = [], None
+        while True:
+            kwargs = {"start_cursor": cursor} if cursor else {}
+            response = self.scheduler.call(self.client.blocks.children.list, block_id=page_id,
+                                           page_size=100, idempotent=True, **kwargs)
+            ids.extend(b["id"] for b in response.get("results", []))
+            if not response.get("has_more"):
+                return ids
+            cursor = response.get("next_cursor")
 
     def create_container_page(self, title: str, parent_id: str = None) -> str:
         """空のコンテナページを作成し、そのIDを返す"""
-        pid = parent_id or self.teamspace_id
-        response = self.client.pages.create(
-            parent={"page_id": pid},
-            properties={"title": [{"text": {"content": title}}]},
-            children=[]
-        )
-        return response["id"]
+        return self.engine.run_steps(self._container_steps(title, parent_id))
+
+class AsyncNotionPageCreator(_CreatorSteps):
+    """
+    NotionPageCreator の asyncio 版（create_page / ensure_category_folder /
+    create_container_page をコルーチンとして提供する）。
+    AsyncUploadEngine の接続プールを共有し、多数のアップロードを
+    スケジューラのレート制限の範囲で同時に進める。差分同期（sync）には対応しない。
+    """
+
+    def __init__(self, scheduler: AsyncRequestScheduler = None, folder_cache_path: str = None,
+                 journal: UploadJournal = None, max_connections: int = 10,
+                 engine: AsyncUploadEngine = None):
+        self._setup(engine or AsyncUploadEngine(scheduler=scheduler,
+                                                max_connections=max_connections),
+                    folder_cache_path, journal)
+        self._folder_locks = {}
+        self.sync = None
+
+    async def aclose(self):
+        await self.engine.aclose()
+
+    async def ensure_category_folder(self, category_name: str) -> str:
+        """NotionPageCreator.ensure_category_folder の非同期版"""
+        lock = self._folder_locks.setdefault(category_name, asyncio.Lock())
+        async with lock:
+            return await self.engine.run_steps(self._folder_steps(category_name))
+
+    async def create_page(self, title: str, blocks: List[dict], parent_id: str = None,
+                          ftype: str = "Other", source: str = "", cat: str = "その他") -> str:
+        """NotionPageCreator.create_page の非同期版（ページ内のバッチは順番に追加する）"""
+        parent, properties = self._item_request(title, parent_id, ftype, source, cat)
+        _, url = await self.engine.create_page(parent, properties, blocks, journal=self.journal,
+                                               source=source, title=title)
+        return url
+
+    async def create_container_page(self, title: str, parent_id: str = None) -> str:
+        """空のコンテナページを作成し、そのIDを返す"""
+        return await self.engine.run_steps(self._container_steps(title, parent_id))
+
+def database_item_properties(title: str, ftype: str, source: str, cat: str) -> dict:
+    """データベース項目（インポートした文書ページ）のプロパティ"""
+    return {
+        "Name": {"title": [{"text": {"content": title}}]},
+        "種別": {"select": {"name": ftype}},
+        "カテゴリー": {"select": {"name": cat}},
+        "元ファイル": {"rich_text": [{"text": {"content": source}}]},
+        **_import_date_property()
+    }
+
+def _import_date_property() -> dict:
+    return {"インポート日時": {"date": {"start": datetime.now().isoformat()}}}
+
+def _match_folder(search_results: List[dict], folder_title: str):
+    for res in search_results:
+        title_list = res.get("properties", {}).get("title", {}).get("title", [])
+        if title_list and title_list[0].get("plain_text") == folder_title:
+            return res["id"]
+    return None
+
+def _folder_children(category_name: str, database_id: str) -> List[dict]:
+    """カテゴリーフォルダの中身（見出し・説明・データベースへのリンク）"""
+    return [
+        {
+            "object": "block",
+            "type": "heading_2",
+            "heading_2": {"rich_text": [{"type": "text", "text": {"content": f"{category_name} の文書一覧"}}]}
+        },
+        {
+            "object": "block",
+            "type": "paragraph",
+            "paragraph": {"rich_text": [
+                {"type": "text", "text": {"content": "※以下のデータベースビューでサイドピークをご利用いただけます。"}},
+                {"type": "text", "text": {"content": "\n（フィルター設定：カテゴリー が "}},
+                {"type": "text", "annotations": {"italic": True}, "text": {"content": category_name}},
+                {"type": "text", "text": {"content": " に一致するもの）"}}
+            ]}
+        },
+        {
+            "object": "block",
+            "type": "link_to_page",
+            "link_to_page": {
+                "type": "database_id",
+                "database_id": database_id
+            }
+        }
+    ]
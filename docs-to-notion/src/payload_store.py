@@ -0,0 +1,109 @@
+"""
+変換結果（ページのプロパティとブロックのバッチ）を NDJSON で保存・読み出しする。
+
+compile で変換だけを先に済ませ、replay で後からまとめて Notion に送るための形式。
+1入力ファイル = 1出力ファイルで、各行は次のいずれか:
+    {"kind": "file",  "source": ..., "category": ..., "ftype": ...}
+    {"kind": "page",  "title": ..., "properties": {...}, "batches": N}
+    {"kind": "batch", "index": i, "children": [...]}
+拡張子 .gz は gzip、.zst は zstd（zstandard パッケージが必要）で圧縮する。
+書き込みは <出力先>.tmp に行い、正常に閉じてから出力先の名前に置き換える
+（途中で止まっても、途中までのファイルが replay に読まれない）。
+"""
+import io, os, json, gzip
+from typing import Iterator, List
+
+EXTENSIONS = {"none": ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+
+def open_ndjson(path: str, mode: str = "r", name: str = None):
+    """
+    圧縮形式を拡張子で判別してテキストモードで開く（mode は "r" か "w"）。
+    name を渡すと、path ではなく name の拡張子で判別する。
+    """
+    name = name or path
+    if name.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if name.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd 圧縮には zstandard が必要です (pip install zstandard)")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class PayloadWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self._f = open_ndjson(self.tmp_path, "w", name=path)
+
+    def write_file(self, source: str, category: str, ftype: str):
+        self._write({"kind": "file", "source": source, "category": category, "ftype": ftype})
+
+    def write_page(self, title: str, properties: dict, batches: List[List[dict]]):
+        self._write({"kind": "page", "title": title, "properties": properties,
+                     "batches": len(batches)})
+        for i, batch in enumerate(batches):
+            self._write({"kind": "batch", "index": i, "children": batch})
+
+    def _write(self, record: dict):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._f.write("\n")
+
+    def close(self):
+        """閉じて出力先の名前に置き換える（閉じるのに失敗したら一時ファイルを消す）"""
+        try:
+            self._f.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """書きかけの一時ファイルを捨てる（出力先の既存ファイルはそのまま）"""
+        try:
+            self._f.close()
+        except Exception:
+            pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def read_payload(path: str) -> Iterator[dict]:
+    """
+    保存済みファイルを先頭から読み、ファイル情報と1ページずつのデータを返す。
+    1ページ分のバッチだけをメモリに持つ:
+        {"kind": "file", ...} / {"kind": "page", ..., "batches": [[...], ...]}
+    """
+    page = None
+    with open_ndjson(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            kind = record["kind"]
+            if kind == "batch":
+                page["batches"].append(record["children"])
+                continue
+            if page:
+                yield page
+                page = None
+            if kind == "page":
+                page = {**record, "batches": []}
+            else:
+                yield record
+    if page:
+        yield page
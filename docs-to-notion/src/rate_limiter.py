@@ -0,0 +1,265 @@
+"""
+Notion API 呼び出しの共通スケジューラ。
+
+- トークンバケットで平均 3 req/s（NOTION_RATE_LIMIT で変更可）に制限する
+- 429 の Retry-After を全スレッド共通の待機として反映する
+- 失敗した呼び出しをジッター付き指数バックオフで再試行する
+- 送信数・スロットル数・再試行数・無駄打ち数などのカウンタを保持する
+"""
+import os, time, random, asyncio, threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+import httpx
+from dotenv import load_dotenv
+from notion_client.client import ClientOptions
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+load_dotenv()
+DEFAULT_RATE = float(os.environ.get("NOTION_RATE_LIMIT", "3"))  # Notionの平均上限
+DEFAULT_BURST = 3
+LATENCY_SAMPLES = 10000  # 応答時間を保持する件数（直近の分だけで集計する）
+
+# サーバーが処理せずに拒否したことが明らかなステータス → どの呼び出しでも再試行可
+REJECTED_STATUSES = {409, 429}
+# 処理されたか不明なステータス → 冪等な呼び出しのみ再試行
+TRANSIENT_STATUSES = {500, 502, 503, 504}
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """トークンを1つ取得するまで待機し、待った秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity,
+                                       self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Retry-After 等を受けて、全呼び出しを指定秒数止める"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+
+
+class RequestScheduler:
+    """Notion API 呼び出しをトークンバケット経由で実行し、必要に応じて再試行する"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.stats = {
+            "sent": 0,        # 実際に送ったリクエスト数（再試行を含む）
+            "throttled": 0,   # 429 を受けた回数
+            "retried": 0,     # 再試行した回数
+            "wasted": 0,      # 失敗に終わったリクエスト数
+            "failed": 0,      # 再試行を諦めた呼び出し数
+            "wait_seconds": 0.0,
+        }
+        # 直近 LATENCY_SAMPLES 件の応答時間（秒）。長い実行でも増え続けないよう古いものから捨てる
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def call(self, fn, *args, idempotent: bool = False, **kwargs):
+        """
+        fn(*args, **kwargs) をレート制限下で実行する。
+        idempotent=False の呼び出し（pages.create, blocks.children.append など）は、
+        サーバーが確実に処理していないエラーのときだけ再試行する。
+        """
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            self._count("sent", wait=waited)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+                self._record_latency(started)
+                return result
+            except Exception as e:
+                self._record_latency(started)
+                self._count("wasted")
+                status = getattr(e, "status", None) if isinstance(e, HTTPResponseError) else None
+                if status == 429:
+                    self._count("throttled")
+                if attempt >= self.max_retries or not _is_retryable(e, status, idempotent):
+                    self._count("failed")
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if status == 429:
+                    self.bucket.pause(delay)
+                attempt += 1
+                self._count("retried")
+                time.sleep(delay)
+
+    def summary(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return (f"送信 {s['sent']} / スロットル {s['throttled']} / 再試行 {s['retried']} / "
+                f"無駄打ち {s['wasted']} / 失敗 {s['failed']} / 待機 {s['wait_seconds']:.1f}秒")
+
+    def latency_percentile(self, p: float) -> float:
+        """直近の応答時間のパーセンタイル（秒）。p は 0〜100"""
+        with self._lock:
+            values = sorted(self.latencies)
+        if not values:
+            return 0.0
+        index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+        return values[index]
+
+    def _record_latency(self, started: float):
+        with self._lock:
+            self.latencies.append(time.perf_counter() - started)
+
+    def _count(self, key: str, wait: float = 0.0):
+        with self._lock:
+            self.stats[key] += 1
+            self.stats["wait_seconds"] += wait
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = _parse_retry_after(getattr(error, "headers", None))
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        # ジッター付き指数バックオフ（上限の半分〜上限）
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(ceiling / 2, ceiling)
+
+
+class AsyncTokenBucket(TokenBucket):
+    """asyncio 用のトークンバケット（待機中もイベントループを止めない）"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: int = DEFAULT_BURST):
+        super().__init__(rate, capacity)
+        self._async_lock = asyncio.Lock()
+
+    async def acquire_async(self) -> float:
+        waited = 0.0
+        while True:
+            async with self._async_lock:
+                with self._lock:
+                    now = time.monotonic()
+                    if now < self._paused_until:
+                        delay = self._paused_until - now
+                    else:
+                        self._tokens = min(self.capacity,
+                                           self._tokens + (now - self._updated) * self.rate)
+                        self._updated = now
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return waited
+                        delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+            waited += delay
+
+
+class AsyncRequestScheduler(RequestScheduler):
+    """RequestScheduler の asyncio 版。再試行の判定とカウンタは同じものを使う"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, **kwargs):
+        super().__init__(rate, burst, **kwargs)
+        self.bucket = AsyncTokenBucket(rate, burst)
+
+    async def call(self, fn, *args, idempotent: bool = False, **kwargs):
+        attempt = 0
+        while True:
+            waited = await self.bucket.acquire_async()
+            self._count("sent", wait=waited)
+            started = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+                self._record_latency(started)
+                return result
+            except Exception as e:
+                self._record_latency(started)
+                self._count("wasted")
+                status = getattr(e, "status", None) if isinstance(e, HTTPResponseError) else None
+                if status == 429:
+                    self._count("throttled")
+                if attempt >= self.max_retries or not _is_retryable(e, status, idempotent):
+                    self._count("failed")
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if status == 429:
+                    self.bucket.pause(delay)
+                attempt += 1
+                self._count("retried")
+                await asyncio.sleep(delay)
+
+
+def _is_retryable(error: Exception, status, idempotent: bool) -> bool:
+    if status in REJECTED_STATUSES:
+        return True
+    if status in TRANSIENT_STATUSES:
+        return idempotent
+    # 接続確立前の失敗はリクエストが届いていないので常に再試行できる
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+        return True
+    if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+        return idempotent
+    return False
+
+
+def _parse_retry_after(headers):
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def client_options(**kwargs) -> dict:
+    """
+    notion_client.Client に渡す引数を返す。NOTION_BASE_URL があれば接続先を差し替える。
+    SDK 自身が再試行する版（3.x 以降）では、その再試行を無効化してスケジューラに一元化する。
+    """
+    if "retry" in getattr(ClientOptions, "__dataclass_fields__", {}):
+        kwargs["retry"] = False
+    # ローカルの疑似サーバー等に向ける場合
+    if os.environ.get("NOTION_BASE_URL"):
+        kwargs.setdefault("base_url", os.environ["NOTION_BASE_URL"])
+    return kwargs
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+def get_scheduler() -> RequestScheduler:
+    """プロセス内で共有するスケジューラを返す"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
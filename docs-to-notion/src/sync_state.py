@@ -0,0 +1,88 @@
+"""
+差分同期のための状態記録（SQLite）。
+
+- 元ファイルごとの内容ハッシュ（変更のないファイルは再インポートしない）
+- 元ファイル・ページタイトルごとの既存ページIDと、ページ直下ブロックのハッシュ列
+  （次回はハッシュ列を比較して、変わったブロックだけを追加・置換・削除する）
+"""
+import json, hashlib, sqlite3, threading
+from datetime import datetime
+from typing import List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source     TEXT PRIMARY KEY,
+    sha256     TEXT NOT NULL,
+    synced_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    source       TEXT NOT NULL,
+    title        TEXT NOT NULL,
+    page_id      TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    block_hashes TEXT NOT NULL,
+    synced_at    TEXT NOT NULL,
+    PRIMARY KEY (source, title)
+);
+"""
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def block_hashes(blocks: List[dict]) -> List[str]:
+    """ページ直下の各ブロック（子要素を含む）のハッシュ"""
+    return [
+        hashlib.sha256(json.dumps(b, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        for b in blocks
+    ]
+
+class SyncState:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+
+    def file_unchanged(self, source: str, sha256: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT sha256 FROM files WHERE source = ?",
+                                     (source,)).fetchone()
+        return row is not None and row["sha256"] == sha256
+
+    def mark_file(self, source: str, sha256: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)",
+                               (source, sha256, _now()))
+
+    def get_page(self, source: str, title: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM pages WHERE source = ? AND title = ?", (source, title)
+            ).fetchone()
+        if not row:
+            return None
+        entry = dict(row)
+        entry["block_hashes"] = json.loads(entry["block_hashes"])
+        return entry
+
+    def save_page(self, source: str, title: str, page_id: str, url: str, hashes: List[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (source, title, page_id, url, json.dumps(hashes), _now()))
+
+    def drop_page(self, source: str, title: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE source = ? AND title = ?",
+                               (source, title))
+
+    def close(self):
+        self._conn.close()
+
+def _now() -> str:
+    return datetime.now().isoformat()
@@ -0,0 +1,428 @@
+"""
+Notion へのアップロード共通エンジン。
+
+main.py（NotionPageCreator）・create_iinkai.py・今後のスクリプトはすべてこのエンジンを通す。
+- キープアライブ付きの httpx 接続プールを1つ共有する（h2 があれば HTTP/2 も可）
+- 全API呼び出しを共通スケジューラ（レート制限・再試行）経由で実行する
+- ブロックをリクエスト上限に合わせてバッチに詰め、ページ作成＋追加を行う
+- journal を渡すとバッチごとにチェックポイントを記録し、再実行時に続きから再開する
+- インラインデータベースの擬似ブロックは、データベース作成＋行の並行追加に置き換える
+- 画像の擬似ブロックは、ページ作成前に並行してアップロードし image ブロックに置き換える
+  （同じ内容の画像はエンジンごとに1回だけアップロードし、以降は同じ file_upload を参照する）
+同期版と非同期版は同じ手順（_EngineSteps のジェネレーター）を使い、API の呼び出し方と
+並行処理の仕方（スレッドプールか asyncio か）だけが異なる。
+"""
+import os, asyncio, threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_EXCEPTION
+import httpx
+from notion_client import Client, AsyncClient, APIResponseError
+from dotenv import load_dotenv
+from typing import Dict, List, Optional, Tuple
+from rate_limiter import (RequestScheduler, AsyncRequestScheduler, client_options,
+                          get_scheduler)
+from batch_packer import pack_blocks, payload_size
+from upload_journal import UploadJournal, fingerprint
+from database_builder import DATABASE_BLOCK, is_database_batch, database_create_kwargs
+from media_store import media_specs, replace_media, upload_parts
+
+load_dotenv()
+DEFAULT_MAX_CONNECTIONS = 10
+
+def _http2_available(requested: bool) -> bool:
+    if not requested:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("  ⚠️ h2 が未インストールのため HTTP/1.1 で接続します (pip install httpx[http2])")
+        return False
+
+def _limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                        keepalive_expiry=60)
+
+
+# 手順のジェネレーターが yield する操作。結果（または例外）がジェネレーターに送り返される
+_CALL = "call"      # (_CALL, fn, args, kwargs): スケジューラ経由の API 呼び出し1回
+_MEDIA = "media"    # (_MEDIA, batches, start): 画像の擬似ブロックを image ブロックにしたバッチ
+_ROWS = "rows"      # (_ROWS, database_id, rows): データベースへの行の並行追加
+
+def call_step(fn, *args, **kwargs) -> tuple:
+    """API 呼び出し1回を表す操作（idempotent などの引数もそのまま渡す）"""
+    return (_CALL, fn, args, kwargs)
+
+
+class _EngineSteps:
+    """
+    同期版・非同期版エンジンで共通の手順（どの API をどの順に呼ぶか、ジャーナルの記録、
+    データベースのバッチの扱い、画像のアップロード結果の記録）。
+    手順はジェネレーターで書いて操作を yield し、実際の送信は各エンジンの run_steps が行う。
+    """
+
+    def _page_steps(self, parent: dict, properties: dict, batches: List[List[dict]],
+                    journal: Optional[UploadJournal], source: str, title: str):
+        journal = journal if source else None
+        fp = fingerprint(batches) if journal else None
+        entry = journal.get(source, title) if journal else None
+        if entry and entry["fingerprint"] == fp:
+            if entry["completed"]:
+                print(f"  Already uploaded: '{title}'")
+                return entry["page_id"], entry["url"]
+            print(f"  Resuming '{title}' from batch {entry['done_batches'] + 1}/{len(batches)}")
+            try:
+                resolved = yield (_MEDIA, batches, entry["done_batches"])
+                yield from self._append_steps(entry["page_id"], resolved, entry["done_batches"],
+                                              journal, source, title)
+                return entry["page_id"], entry["url"]
+            except APIResponseError as e:
+                if e.status != 404:
+                    raise
+                # 既存ページが削除されていた場合は作り直す
+                print(f"  Journaled page not found, recreating '{title}'")
+                journal.discard(source, title)
+
+        # 先頭がデータベースの場合はページ作成後に作るため、children なしで作成する
+        sent = 1 if batches and not is_database_batch(batches[0]) else 0
+        batches = yield (_MEDIA, batches, 0)
+        response = yield call_step(self.client.pages.create, parent=parent,
+                                   properties=properties, children=batches[0] if sent else [])
+        page_id = response["id"]
+        url = response["url"]
+        if journal:
+            journal.start(source, title, fp, page_id, url, len(batches), sent)
+
+        yield from self._append_steps(page_id, batches, sent, journal, source, title)
+        return page_id, url
+
+    def _append_steps(self, block_id: str, batches: List[List[dict]], start: int,
+                      journal: Optional[UploadJournal], source: str, title: str):
+        for i in range(start, len(batches)):
+            if is_database_batch(batches[i]):
+                yield from self._database_steps(block_id, batches[i][0][DATABASE_BLOCK])
+            else:
+                yield call_step(self.client.blocks.children.append,
+                                block_id=block_id, children=batches[i])
+            if journal:
+                journal.advance(source, title, i + 1)
+        if journal:
+            journal.complete(source, title)
+
+    def _database_steps(self, page_id: str, spec: dict):
+        response = yield call_step(self.client.databases.create,
+                                   **database_create_kwargs(page_id, spec))
+        database_id = response["id"]
+        print(f"  Inserting {len(spec['rows'])} rows into inline database '{spec['title']}'")
+        try:
+            yield (_ROWS, database_id, spec["rows"])
+        except Exception:
+            try:
+                yield call_step(self.client.blocks.delete, block_id=database_id, idempotent=True)
+            except Exception as e:
+                print(f"  ⚠️ 途中まで作成したデータベースを削除できませんでした ({database_id}): {e}")
+            raise
+        return database_id
+
+    def _upload_steps(self, path: str):
+        name, content_type, parts = upload_parts(path)
+        if len(parts) == 1:
+            upload = yield call_step(self.client.file_uploads.create, idempotent=True,
+                                     mode="single_part", filename=name, content_type=content_type)
+            yield call_step(self.client.file_uploads.send, upload["id"], idempotent=True,
+                            file=(name, parts[0], content_type))
+            return upload["id"]
+        upload = yield call_step(self.client.file_uploads.create, idempotent=True,
+                                 mode="multi_part", filename=name, content_type=content_type,
+                                 number_of_parts=len(parts))
+        for n, part in enumerate(parts, start=1):
+            yield call_step(self.client.file_uploads.send, upload["id"], idempotent=True,
+                            file=(name, part, content_type), part_number=str(n))
+        yield call_step(self.client.file_uploads.complete, upload["id"], idempotent=True)
+        return upload["id"]
+
+    def _claim_uploads(self, specs: Dict[str, dict], start_upload) -> dict:
+        """
+        画像ごとのアップロード（Future / タスク）を返す。未アップロードの画像は
+        start_upload(path) で送信を始め、他のページで送信中・送信済みのものはそれを使う。
+        """
+        handles = {}
+        for key, spec in specs.items():
+            if key not in self._uploads:
+                self._uploads[key] = start_upload(spec["path"])
+            handles[key] = self._uploads[key]
+        return handles
+
+    def _uploaded_ids(self, specs: Dict[str, dict], handles: dict,
+                      results: list) -> Dict[str, Optional[str]]:
+        """
+        アップロードの結果（file_upload の ID か例外）を画像ごとの ID にする。
+        失敗した画像は警告を出して None にし、記録から消して次に使うページで送り直す。
+        """
+        uploaded = {}
+        for key, result in zip(handles, results):
+            if isinstance(result, Exception):
+                print(f"  ⚠️ 画像をアップロードできませんでした ({specs[key]['path']}): {result}")
+                result = None
+                if self._uploads.get(key) is handles[key]:
+                    del self._uploads[key]
+            uploaded[key] = result
+        return uploaded
+
+
+class UploadEngine(_EngineSteps):
+    def __init__(self, scheduler: RequestScheduler = None,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS, http2: bool = False):
+        self.http = httpx.Client(limits=_limits(max_connections), http2=_http2_available(http2))
+        self.client = Client(client=self.http, **client_options(auth=os.environ["NOTION_API_KEY"]))
+        self.scheduler = scheduler or get_scheduler()
+        self.max_connections = max_connections
+        self._uploads: Dict[str, Future] = {}  # 画像の内容ハッシュ → file_upload の ID の Future
+        self._media_lock = threading.Lock()
+        self._media_pool = None
+        self._rows_pool = None  # インラインデータベースの行の追加用（全ページで共有）
+
+    def call(self, fn, *args, idempotent: bool = False, **kwargs):
+        """スケジューラ経由でAPIを呼ぶ"""
+        return self.scheduler.call(fn, *args, idempotent=idempotent, **kwargs)
+
+    def run_steps(self, steps):
+        """手順のジェネレーターを最後まで進め、その戻り値を返す（操作の例外は手順に送り返す）"""
+        result, error = None, None
+        while True:
+            try:
+                op = steps.throw(error) if error else steps.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                result, error = self._perform(op), None
+            except Exception as e:
+                result, error = None, e
+
+    def _perform(self, op: tuple):
+        kind, *args = op
+        if kind == _CALL:
+            fn, call_args, kwargs = args
+            return self.call(fn, *call_args, **kwargs)
+        if kind == _MEDIA:
+            return self.resolve_media(*args)
+        return self._insert_rows(*args)
+
+    def create_page(self, parent: dict, properties: dict, blocks: List[dict],
+                    journal: UploadJournal = None, source: str = "",
+                    title: str = "") -> Tuple[str, str]:
+        """
+        ページを作成し、残りのブロックをバッチで追加する。(page_id, url) を返す。
+        journal と source を渡した場合は、前回途中で失敗したページの続きから再開する。
+        """
+        batches = pack_blocks(blocks, first_reserve=payload_size(properties))
+        return self.create_page_batches(parent, properties, batches, journal, source, title)
+
+    def create_page_batches(self, parent: dict, properties: dict, batches: List[List[dict]],
+                            journal: UploadJournal = None, source: str = "",
+                            title: str = "") -> Tuple[str, str]:
+        """詰め済みのバッチ（先頭は pages.create と一緒に送る）からページを作成する"""
+        return self.run_steps(self._page_steps(parent, properties, batches, journal, source, title))
+
+    def append_batches(self, block_id: str, batches: List[List[dict]], start: int = 0,
+                       journal: UploadJournal = None, source: str = "", title: str = ""):
+        """batches[start:] を順に追加し、1バッチごとにチェックポイントを記録する"""
+        self.run_steps(self._append_steps(block_id, batches, start, journal, source, title))
+
+    def create_inline_database(self, page_id: str, spec: dict) -> str:
+        """
+        ページ末尾にインラインデータベースを作り、行を max_connections 本で並行して追加する
+        （送信間隔はスケジューラが制御する。スレッドはエンジンで共有し、表ごとには作らない）。
+        途中で失敗した場合はデータベースを削除してから例外を送出し、再開時に作り直す。
+        """
+        return self.run_steps(self._database_steps(page_id, spec))
+
+    def _insert_rows(self, database_id: str, rows: List[dict]):
+        pool = self._rows_executor()
+        futures = [pool.submit(self.call, self.client.pages.create,
+                               parent={"database_id": database_id}, properties=props)
+                   for props in rows]
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        error = next((f.exception() for f in done if f.exception()), None)
+        if error:
+            for f in futures:
+                f.cancel()
+            wait(futures)  # 送信中の行が終わってからデータベースを削除する
+            raise error
+
+    def _rows_executor(self) -> ThreadPoolExecutor:
+        with self._media_lock:
+            if self._rows_pool is None:
+                self._rows_pool = ThreadPoolExecutor(max_workers=self.max_connections,
+                                                     thread_name_prefix="rows")
+            return self._rows_pool
+
+    def append_blocks(self, block_id: str, blocks: List[dict], after: str = None) -> List[dict]:
+        """ブロックを追加し、作成されたブロックを返す（after 指定時はその直後に挿入）"""
+        created = []
+        for batch in self.resolve_media(pack_blocks(blocks)):
+            kwargs = {"after": after} if after else {}
+            response = self.call(self.client.blocks.children.append,
+                                 block_id=block_id, children=batch, **kwargs)
+            results = response.get("results", [])
+            if results:
+                after = results[-1]["id"]
+            created.extend(results)
+        return created
+
+    def resolve_media(self, batches: List[List[dict]], start: int = 0) -> List[List[dict]]:
+        """
+        batches[start:] の画像の擬似ブロックをアップロードして image ブロックに置き換える。
+        未アップロードの画像は max_connections 本で並行して送り、他のページで送信中・送信済みの
+        画像はその結果を待って使う。失敗した画像は警告を出してプレースホルダーの段落にする
+        （失敗は記録に残さず、次にその画像を使うページでアップロードし直す）。
+        """
+        specs = media_specs(batches[start:])
+        if not specs:
+            return batches
+        with self._media_lock:
+            handles = self._claim_uploads(specs, self._submit_upload)
+        results = []
+        for future in handles.values():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        with self._media_lock:
+            uploaded = self._uploaded_ids(specs, handles, results)
+        return batches[:start] + replace_media(batches[start:], uploaded)
+
+    def _submit_upload(self, path: str) -> Future:
+        if self._media_pool is None:
+            self._media_pool = ThreadPoolExecutor(max_workers=self.max_connections,
+                                                  thread_name_prefix="media")
+        return self._media_pool.submit(self.upload_file, path)
+
+    def upload_file(self, path: str) -> str:
+        """
+        ファイルを Notion にアップロードし、file_upload の ID を返す
+        （20MB を超えるファイルは分割して送る）。作成・送信はやり直しても害がないため再試行する。
+        """
+        return self.run_steps(self._upload_steps(path))
+
+    def close(self):
+        for pool in (self._media_pool, self._rows_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        self.http.close()
+
+
+class AsyncUploadEngine(_EngineSteps):
+    """UploadEngine の asyncio 版（httpx.AsyncClient の接続プールを共有する）"""
+
+    def __init__(self, scheduler: AsyncRequestScheduler = None,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS, http2: bool = False):
+        self.http = httpx.AsyncClient(limits=_limits(max_connections),
+                                      http2=_http2_available(http2))
+        self.client = AsyncClient(client=self.http,
+                                  **client_options(auth=os.environ["NOTION_API_KEY"]))
+        self.scheduler = scheduler or AsyncRequestScheduler()
+        self.max_connections = max_connections
+        self._uploads: Dict[str, asyncio.Task] = {}  # 画像の内容ハッシュ → アップロードのタスク
+        self._media_semaphore = None
+
+    async def call(self, fn, *args, idempotent: bool = False, **kwargs):
+        return await self.scheduler.call(fn, *args, idempotent=idempotent, **kwargs)
+
+    async def run_steps(self, steps):
+        """UploadEngine.run_steps の非同期版"""
+        result, error = None, None
+        while True:
+            try:
+                op = steps.throw(error) if error else steps.send(result)
+            except StopIteration as done:
+                return done.value
+            try:
+                result, error = await self._perform(op), None
+            except Exception as e:
+                result, error = None, e
+
+    async def _perform(self, op: tuple):
+        kind, *args = op
+        if kind == _CALL:
+            fn, call_args, kwargs = args
+            return await self.call(fn, *call_args, **kwargs)
+        if kind == _MEDIA:
+            return await self.resolve_media(*args)
+        return await self._insert_rows(*args)
+
+    async def create_page(self, parent: dict, properties: dict, blocks: List[dict],
+                          journal: UploadJournal = None, source: str = "",
+                          title: str = "") -> Tuple[str, str]:
+        """UploadEngine.create_page の非同期版（ページ内のバッチは順番に追加する）"""
+        batches = pack_blocks(blocks, first_reserve=payload_size(properties))
+        return await self.create_page_batches(parent, properties, batches, journal, source, title)
+
+    async def create_page_batches(self, parent: dict, properties: dict,
+                                  batches: List[List[dict]], journal: UploadJournal = None,
+                                  source: str = "", title: str = "") -> Tuple[str, str]:
+        return await self.run_steps(self._page_steps(parent, properties, batches, journal,
+                                                     source, title))
+
+    async def append_batches(self, block_id: str, batches: List[List[dict]], start: int = 0,
+                             journal: UploadJournal = None, source: str = "", title: str = ""):
+        await self.run_steps(self._append_steps(block_id, batches, start, journal, source, title))
+
+    async def create_inline_database(self, page_id: str, spec: dict) -> str:
+        """UploadEngine.create_inline_database の非同期版"""
+        return await self.run_steps(self._database_steps(page_id, spec))
+
+    async def _insert_rows(self, database_id: str, rows: List[dict]):
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def insert(props):
+            async with semaphore:
+                await self.call(self.client.pages.create,
+                                parent={"database_id": database_id}, properties=props)
+
+        tasks = [asyncio.ensure_future(insert(props)) for props in rows]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def resolve_media(self, batches: List[List[dict]],
+                            start: int = 0) -> List[List[dict]]:
+        """UploadEngine.resolve_media の非同期版（同時に送るのは max_connections 件まで）"""
+        specs = media_specs(batches[start:])
+        if not specs:
+            return batches
+        if self._media_semaphore is None:
+            self._media_semaphore = asyncio.Semaphore(self.max_connections)
+        handles = self._claim_uploads(
+            specs, lambda path: asyncio.ensure_future(self._upload_limited(path)))
+        results = await asyncio.gather(*handles.values(), return_exceptions=True)
+        uploaded = self._uploaded_ids(specs, handles, results)
+        return batches[:start] + replace_media(batches[start:], uploaded)
+
+    async def _upload_limited(self, path: str) -> str:
+        async with self._media_semaphore:
+            return await self.upload_file(path)
+
+    async def upload_file(self, path: str) -> str:
+        """UploadEngine.upload_file の非同期版"""
+        return await self.run_steps(self._upload_steps(path))
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+def get_engine() -> UploadEngine:
+    """プロセス内で共有する同期版エンジンを返す"""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = UploadEngine(
+                http2=os.environ.get("NOTION_HTTP2", "").lower() in ("1", "true", "yes"))
+        return _shared_engine
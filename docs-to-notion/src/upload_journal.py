@@ -0,0 +1,80 @@
+"""
+アップロードのチェックポイント記録（SQLite）。
+
+元ファイル・ページタイトルごとに、作成したページIDと追加済みバッチ数を記録する。
+途中のバッチで失敗しても、再実行時は既存ページの続きのバッチから再開できる。
+"""
+import json, hashlib, sqlite3, threading
+from datetime import datetime
+from typing import List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    source        TEXT NOT NULL,
+    title         TEXT NOT NULL,
+    fingerprint   TEXT NOT NULL,
+    page_id       TEXT NOT NULL,
+    url           TEXT NOT NULL,
+    total_batches INTEGER NOT NULL,
+    done_batches  INTEGER NOT NULL,
+    completed     INTEGER NOT NULL DEFAULT 0,
+    updated_at    TEXT NOT NULL,
+    PRIMARY KEY (source, title)
+)
+"""
+
+def fingerprint(batches: List[List[dict]]) -> str:
+    """バッチ内容のハッシュ（内容が変わった場合は再開せず新規作成する）"""
+    data = json.dumps(batches, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+class UploadJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(SCHEMA)
+
+    def get(self, source: str, title: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM uploads WHERE source = ? AND title = ?", (source, title)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def start(self, source: str, title: str, fp: str, page_id: str, url: str, total: int,
+              done: int = 1):
+        """ページ作成直後（通常は最初のバッチ送信済み）の状態を記録する"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                (source, title, fp, page_id, url, total, done, _now()))
+
+    def advance(self, source: str, title: str, done: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET done_batches = ?, updated_at = ? WHERE source = ? AND title = ?",
+                (done, _now(), source, title))
+
+    def complete(self, source: str, title: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE uploads SET completed = 1, updated_at = ? WHERE source = ? AND title = ?",
+                (_now(), source, title))
+
+    def discard(self, source: str, title: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE source = ? AND title = ?",
+                               (source, title))
+
+    def forget(self, source: str):
+        """アーカイブ済みファイルの記録を削除する"""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE source = ?", (source,))
+
+    def close(self):
+        self._conn.close()
+
+def _now() -> str:
+    return datetime.now().isoformat()
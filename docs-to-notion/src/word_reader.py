@@ -1,8 +1,22 @@
 from docx import Document
 from docx.oxml.ns import qn
+from docx.styles import BabelFish
+from lxml import etree
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import re
+import zipfile
+from media_store import PackageMedia, read_rels, store_media
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+WP_NS = "http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing"
+VML_NS = "urn:schemas-microsoft-com:vml"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+REL_TYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+
+JP_BULLETS = ("・", "●", "○", "■", "□", "◆", "※", "→")
 
 @dataclass
 class DocElement:
@@ -14,23 +28,451 @@ class DocElement:
     children: List = field(default_factory=list)
     metadata: dict = field(default_factory=dict)
 
+# --- lxml による1パス読み込み ---
+
+_W = f"{{{W_NS}}}"
+_BODY, _P, _TBL, _TR, _TC, _R = (_W + t for t in ("body", "p", "tbl", "tr", "tc", "r"))
+_HYPERLINK, _PPR, _RPR, _TCPR, _TRPR = (_W + t for t in ("hyperlink", "pPr", "rPr", "tcPr", "trPr"))
+_PSTYLE, _NUMPR, _NUMID, _ILVL = (_W + t for t in ("pStyle", "numPr", "numId", "ilvl"))
+_TBLGRID, _GRIDCOL, _TBLHEADER = (_W + t for t in ("tblGrid", "gridCol", "tblHeader"))
+_GRIDSPAN, _GRIDBEFORE, _VMERGE = (_W + t for t in ("gridSpan", "gridBefore", "vMerge"))
+_T, _TAB, _PTAB, _BR, _CR, _NO_BREAK_HYPHEN = (
+    _W + t for t in ("t", "tab", "ptab", "br", "cr", "noBreakHyphen"))
+_VAL, _TYPE = _W + "val", _W + "type"
+_R_ID, _R_EMBED = f"{{{R_NS}}}id", f"{{{R_NS}}}embed"
+_DRAWING, _PICT = _W + "drawing", _W + "pict"
+_BLIP, _DOCPR, _IMAGEDATA = f"{{{A_NS}}}blip", f"{{{WP_NS}}}docPr", f"{{{VML_NS}}}imagedata"
+_MC_FALLBACK = f"{{{MC_NS}}}Fallback"
+_OFF = ("0", "false", "off")
+# rPr の子要素 → rich_text のキー（python-docx の run.bold などと同じく直接書式だけを見る）
+_RUN_FLAGS = ((_W + "b", "bold"), (_W + "i", "italic"), (_W + "strike", "strikethrough"))
+_UNDERLINE = _W + "u"
+
+class DocxTables:
+    """
+    styles.xml・numbering.xml・リレーションから作る参照表。文書ごとに1回だけ作り、
+    段落ごとのスタイル名・番号書式・リンク先の解決は辞書引きで済ませる。
+    """
+    __slots__ = ("styles", "default_style", "num_formats", "links")
+
+    def __init__(self, styles: Dict[str, Tuple[str, Optional[Tuple[str, int]]]],
+                 default_style: Optional[str], num_formats: Dict[Tuple[str, int], str],
+                 links: Dict[str, str]):
+        self.styles = styles                # styleId → (表示名, スタイルの番号設定 (numId, ilvl))
+        self.default_style = default_style  # pStyle がない段落のスタイル
+        self.num_formats = num_formats      # (numId, ilvl) → numFmt（"bullet", "decimal" など）
+        self.links = links                  # r:id → ハイパーリンク先
+
+    def paragraph_style(self, style_id: Optional[str]) -> Tuple[str, Optional[Tuple[str, int]]]:
+        # 未定義の styleId は python-docx と同じく既定の段落スタイルとして扱う
+        return (self.styles.get(style_id) or self.styles.get(self.default_style)
+                or ("", None))
+
 def read_word(file_path: str) -> List[DocElement]:
-    """Wordファイルを読み込み、DocElementのリストとして返す"""
+    """
+    Wordファイルを読み込み、DocElementのリストとして返す。
+    word/document.xml を lxml の iterparse で先頭から1回だけ読み、
+    本文直下の段落・表が閉じるたびに DocElement にして、読み終えた要素は捨てる。
+    段落・表のセル内の画像は媒体フォルダに保存し、その段落・表の後ろに image 要素として置く。
+    ヘッダーの画像（ロゴなど）は文書の先頭に、フッターの画像は末尾に1回ずつ置く。
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        main = _main_part(zf)
+        rels = read_rels(zf, main)
+        tables = load_docx_tables(zf, rels)
+        media = PackageMedia(zf, rels)
+        headers, footers = _header_footer_images(zf, rels)
+        elements = headers
+        with zf.open(main) as src:
+            for el in _iter_body(src):
+                if el.tag == _P:
+                    item = _fast_paragraph(el, tables)
+                else:
+                    item = parse_table(el)
+                if item:
+                    elements.append(item)
+                elements.extend(_drawing_images(el, media.store))
+    return elements + footers
+
+def load_docx_tables(zf: zipfile.ZipFile, rels: Dict[str, Tuple[str, str, bool]]) -> DocxTables:
+    """本文パートのリレーションからスタイル・番号定義・リンク先の参照表を作る"""
+    styles, default_style, num_formats, links = {}, None, {}, {}
+    for r_id, (rel_type, target, external) in rels.items():
+        if rel_type == REL_TYPE + "hyperlink":
+            links[r_id] = target
+        elif external or target not in zf.NameToInfo:
+            continue
+        elif rel_type == REL_TYPE + "styles":
+            styles, default_style = _load_styles(zf.read(target))
+        elif rel_type == REL_TYPE + "numbering":
+            num_formats = _load_numbering(zf.read(target))
+    return DocxTables(styles, default_style, num_formats, links)
+
+def _header_footer_images(zf: zipfile.ZipFile, rels: Dict[str, Tuple[str, str, bool]]):
+    """ヘッダー・フッターのパートの画像を (ヘッダーの画像, フッターの画像) で返す"""
+    found = {"header": [], "footer": []}
+    for rel_type, target, external in rels.values():
+        kind = rel_type[len(REL_TYPE):]
+        if kind not in found or external or target not in zf.NameToInfo:
+            continue
+        media = PackageMedia(zf, read_rels(zf, target))
+        found[kind].extend(_drawing_images(etree.fromstring(zf.read(target)), media.store))
+    return _unique_images(found["header"]), _unique_images(found["footer"])
+
+def _unique_images(images: List[DocElement]) -> List[DocElement]:
+    """先頭ページ用・偶数ページ用などで同じ画像が重なるため、1つにまとめる"""
+    seen, unique = set(), []
+    for image in images:
+        key = image.metadata["path"] or image.content
+        if key not in seen:
+            seen.add(key)
+            unique.append(image)
+    return unique
+
+def _main_part(zf: zipfile.ZipFile) -> str:
+    for rel_type, target, _ in read_rels(zf, "").values():
+        if rel_type == REL_TYPE + "officeDocument":
+            return target
+    return "word/document.xml"
+
+def _load_styles(xml: bytes):
+    """段落スタイルの styleId → (表示名, 番号設定) と既定の段落スタイルIDを返す"""
+    raw, default_style = {}, None
+    for style in etree.fromstring(xml).iterchildren(_W + "style"):
+        if style.get(_TYPE) != "paragraph":
+            continue
+        style_id = style.get(_W + "styleId")
+        if style.get(_W + "default") in ("1", "true", "on"):
+            default_style = style_id
+        name = style.find(_W + "name")
+        based_on = style.find(_W + "basedOn")
+        num_pr = style.find(f"{_PPR}/{_NUMPR}")
+        raw[style_id] = (
+            BabelFish.internal2ui(name.get(_VAL, "")) if name is not None else "",
+            based_on.get(_VAL) if based_on is not None else None,
+            _num_ref(num_pr, None) if num_pr is not None else None,
+        )
+
+    def inherited_num(style_id):
+        # 番号設定は basedOn を辿って継承する（循環参照に備えて訪問済みを記録）
+        seen = set()
+        while style_id in raw and style_id not in seen:
+            seen.add(style_id)
+            _, based_on, num = raw[style_id]
+            if num is not None:
+                return num
+            style_id = based_on
+        return None
+
+    styles = {sid: (name, inherited_num(sid)) for sid, (name, _, _) in raw.items()}
+    return styles, default_style
+
+def _load_numbering(xml: bytes) -> Dict[Tuple[str, int], str]:
+    """numbering.xml から (numId, ilvl) → numFmt の表を作る（lvlOverride も反映）"""
+    root = etree.fromstring(xml)
+    abstract = {}
+    for an in root.iterchildren(_W + "abstractNum"):
+        abstract[an.get(_W + "abstractNumId")] = _level_formats(an)
+    formats = {}
+    for num in root.iterchildren(_W + "num"):
+        abstract_id = num.find(_W + "abstractNumId")
+        levels = dict(abstract.get(abstract_id.get(_VAL) if abstract_id is not None else None, {}))
+        for override in num.iterchildren(_W + "lvlOverride"):
+            levels.update(_level_formats(override))
+        num_id = num.get(_W + "numId")
+        for ilvl, fmt in levels.items():
+            formats[(num_id, ilvl)] = fmt
+    return formats
+
+def _level_formats(parent) -> Dict[int, str]:
+    formats = {}
+    for lvl in parent.iterchildren(_W + "lvl"):
+        fmt = lvl.find(_W + "numFmt")
+        if fmt is not None:
+            formats[int(lvl.get(_W + "ilvl", 0))] = fmt.get(_VAL, "")
+    return formats
+
+def _num_ref(num_pr, inherited: Optional[Tuple[str, int]]) -> Optional[Tuple[str, int]]:
+    """
+    numPr から (numId, ilvl) を返す。省略された値はスタイルの番号設定を引き継ぐ。
+    numId="0" は番号の解除なので None（numId のない numPr は書式不明のリストとして "" にする）。
+    """
+    num_id, ilvl = inherited or ("", 0)
+    el = num_pr.find(_NUMID)
+    if el is not None:
+        num_id = el.get(_VAL, "")
+    el = num_pr.find(_ILVL)
+    if el is not None:
+        ilvl = int(el.get(_VAL, 0))
+    return None if num_id == "0" else (num_id, ilvl)
+
+def _iter_body(source):
+    """
+    本文直下の段落・表を、要素が閉じるたびに返す。
+    返した要素とそれより前の兄弟要素はその後で削除し、メモリ使用量を文書の大きさによらず抑える。
+    表の中の段落・入れ子の表は外側の表と一緒に扱うため、ここでは返さない。
+    """
+    for _, el in etree.iterparse(source, events=("end",), tag=(_P, _TBL),
+                                 huge_tree=True, remove_comments=True):
+        parent = el.getparent()
+        if parent is None or parent.tag != _BODY:
+            continue
+        yield el
+        el.clear(keep_tail=True)
+        while el.getprevious() is not None:
+            del parent[0]
+
+def _fast_paragraph(p, tables: DocxTables) -> Optional[DocElement]:
+    runs = _paragraph_runs(p, tables.links)
+    text = "".join(run["text"] for run in runs).strip()
+    if not text:
+        return None
+
+    style_id, num_pr = None, None
+    ppr = p.find(_PPR)
+    if ppr is not None:
+        pstyle = ppr.find(_PSTYLE)
+        style_id = pstyle.get(_VAL) if pstyle is not None else None
+        num_pr = ppr.find(_NUMPR)
+    style_name, style_num = tables.paragraph_style(style_id)
+
+    heading = _heading_element(text, style_name)
+    if heading:
+        return heading
+
+    num = _num_ref(num_pr, style_num) if num_pr is not None else style_num
+    if num is not None or text.startswith(JP_BULLETS):
+        num_format = tables.num_formats.get(num) if num else None
+        return DocElement(type="list", content=text, level=num[1] if num else 0,
+                          style=_list_style(style_name, text, num_format))
+
+    rich_text = [run for run in runs if run["text"]]
+    return DocElement(type="paragraph", content=text,
+                      metadata={"rich_text": rich_text})
+
+def _paragraph_runs(p, links: Dict[str, str]) -> List[dict]:
+    """段落直下のラン（ハイパーリンク内のランを含む）を rich_text の要素にする"""
+    runs = []
+    for child in p:
+        if child.tag == _R:
+            runs.append(_run_entry(child))
+        elif child.tag == _HYPERLINK:
+            link = links.get(child.get(_R_ID))
+            for r in child.iterchildren(_R):
+                entry = _run_entry(r)
+                if link:
+                    entry["link"] = link
+                runs.append(entry)
+    return runs
+
+def _drawing_images(el, store) -> List[DocElement]:
+    """
+    段落・表（セル内を含む）・ヘッダーなどの中の画像（w:drawing の a:blip、旧形式の w:pict の
+    v:imagedata）を image 要素にする。mc:Fallback 内の代替表示は同じ画像のため数えない。
+    store(r:id) は (ファイル名, 保存先のパス) を返す（表示できない形式はパスが None）。
+    """
+    images = []
+    for drawing in el.iter(_DRAWING, _PICT):
+        if _in_fallback(drawing, el):
+            continue
+        doc_pr = drawing.find(f".//{_DOCPR}")
+        caption = (doc_pr.get("descr") or doc_pr.get("title") or "") if doc_pr is not None else ""
+        for blip in drawing.iter(_BLIP, _IMAGEDATA):
+            r_id = blip.get(_R_EMBED) or blip.get(_R_ID)
+            if not r_id:
+                continue
+            name, path = store(r_id)
+            images.append(DocElement(type="image", content=caption or name,
+                                     metadata={"path": path, "caption": caption}))
+    return images
+
+def _in_fallback(node, root) -> bool:
+    while node is not None and node is not root:
+        if node.tag == _MC_FALLBACK:
+            return True
+        node = node.getparent()
+    return False
+
+def _run_entry(r) -> dict:
+    parts = []
+    _run_text(r, parts)
+    entry = {"text": "".join(parts)}
+    rpr = r.find(_RPR)
+    if rpr is not None:
+        for flag, key in _RUN_FLAGS:
+            if _on(rpr, flag):
+                entry[key] = True
+        el = rpr.find(_UNDERLINE)
+        if el is not None and el.get(_VAL, "none") != "none":
+            entry["underline"] = True
+    return entry
+
+def _run_text(r, parts: List[str]):
+    """ランの文字（w:t）とタブ・改行などを python-docx の run.text と同じ規則で parts に追加する"""
+    for child in r:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or "")
+        elif tag == _TAB or tag == _PTAB:
+            parts.append("\t")
+        elif tag == _BR:
+            # 改ページ・段区切りは python-docx と同じく空文字
+            if child.get(_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _CR:
+            parts.append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            parts.append("-")
+
+class TableCell:
+    """表のセル1つ。結合セルは左上の位置と、縦・横に占める行数・列数を持つ"""
+    __slots__ = ("row", "col", "rows", "cols", "text")
+
+    def __init__(self, row: int, col: int, cols: int, text: str):
+        self.row = row
+        self.col = col
+        self.rows = 1
+        self.cols = cols
+        self.text = text
+
+def parse_table(tbl) -> Optional[DocElement]:
+    """
+    w:tbl を1回だけ読み、tblGrid の列にそろえた行のリストにする。
+    w:tc ごとに gridSpan で占める列数を、w:vMerge="continue" で上のセルの続きかを判定し、
+    セルのプロキシは作らない（表の大きさに比例した時間で済む）。
+
+    - 横結合: 左端の列にだけ値を入れ、残りの列は空欄にする（列の位置が見出しとずれない）
+    - 縦結合: 続きの行にも同じ値を入れる
+    - 見出し: 先頭から続く「見出し行として繰り返す」（w:tblHeader）行。
+      複数ある場合は列ごとに「上 / 下」とつなげ（例: 「期間 / 開始」「期間 / 終了」）、
+      指定がなければ1行目を見出しにする
+    結合セルの位置は metadata["spans"] に {"row", "col", "rows", "cols"} で入れる。
+    """
+    grid = tbl.find(_TBLGRID)
+    width = len(grid.findall(_GRIDCOL)) if grid is not None else 0
+    grid_rows, cells, header_rows = [], [], 0
+    above = {}  # グリッド列 → 直前の行でその列から始まるセル
+    for r, tr in enumerate(tbl.iterchildren(_TR)):
+        trpr = tr.find(_TRPR)
+        if header_rows == r and _on(trpr, _TBLHEADER):
+            header_rows += 1
+        row = {}
+        col = _int_val(trpr, _GRIDBEFORE, 0)
+        for tc in tr.iterchildren(_TC):
+            span, vmerge, paragraphs = 1, None, []
+            for child in tc:
+                if child.tag == _P:
+                    paragraphs.append(child)
+                elif child.tag == _TCPR:
+                    span, vmerge = _cell_merge(child)
+            cell = above.get(col) if vmerge == "continue" else None
+            if cell is not None and cell.cols == span:
+                cell.rows += 1
+            else:
+                # セル直下の段落だけを読む（入れ子の表の中身は含めない）
+                text = "\n".join(_paragraph_text(p) for p in paragraphs).strip()
+                cell = TableCell(r, col, span, text)
+                cells.append(cell)
+            row[col] = cell
+            col += span
+        grid_rows.append(row)
+        above = row
+        width = max(width, col)
+
+    if not grid_rows:
+        return None
+
+    rows_data = []
+    for row in grid_rows:
+        values = [""] * width
+        for col, cell in row.items():
+            values[col] = cell.text
+        rows_data.append(values)
+
+    header_rows = header_rows or 1
+    headers = rows_data[0]
+    if header_rows > 1:
+        # 見出し行を重ねる場合は、横結合した上位の見出しを覆う列すべてに付ける
+        stacked = []
+        for row in grid_rows[:header_rows]:
+            values = [""] * width
+            for col, cell in row.items():
+                values[col:col + cell.cols] = [cell.text] * cell.cols
+            stacked.append(values[:width])
+        headers = [" / ".join(dict.fromkeys(v for v in column if v)) for column in zip(*stacked)]
+
+    return DocElement(
+        type="table",
+        children=rows_data,
+        metadata={
+            "headers": headers,
+            "data_rows": rows_data[header_rows:],
+            "header_rows": header_rows,
+            "spans": [{"row": c.row, "col": c.col, "rows": c.rows, "cols": c.cols}
+                      for c in cells if c.rows > 1 or c.cols > 1],
+        }
+    )
+
+def _cell_merge(tcpr) -> Tuple[int, Optional[str]]:
+    """tcPr から (横に占める列数, vMerge の値) を返す"""
+    span, vmerge = 1, None
+    for child in tcpr:
+        if child.tag == _GRIDSPAN:
+            span = max(int(child.get(_VAL, 1)), 1)
+        elif child.tag == _VMERGE:
+            vmerge = child.get(_VAL, "continue")
+    return span, vmerge
+
+def _int_val(parent, tag: str, default: int) -> int:
+    el = parent.find(tag) if parent is not None else None
+    return int(el.get(_VAL, default)) if el is not None else default
+
+def _on(parent, tag: str) -> bool:
+    el = parent.find(tag) if parent is not None else None
+    return el is not None and el.get(_VAL, "true") not in _OFF
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for child in p:
+        if child.tag == _R:
+            _run_text(child, parts)
+        elif child.tag == _HYPERLINK:
+            for r in child.iterchildren(_R):
+                _run_text(r, parts)
+    return "".join(parts)
+
+# --- python-docx による読み込み ---
+
+def read_word_docx(file_path: str) -> List[DocElement]:
+    """
+    python-docx のオブジェクトを経由する従来の読み込み。
+    read_word と同じ DocElement を返す（比較・検証用の参照実装）。
+    """
     doc = Document(file_path)
-    elements = []
+    found = {"header": [], "footer": []}
+    for rel in doc.part.rels.values():
+        kind = rel.reltype[len(REL_TYPE):]
+        if kind in found and not rel.is_external:
+            part = rel.target_part
+            found[kind].extend(_drawing_images(part.element,
+                                               lambda r_id, part=part: _store_image(part, r_id)))
+    elements = _unique_images(found["header"])
 
+    store = lambda r_id: _store_image(doc.part, r_id)
     for block in _iter_block_items(doc):
         tag = block.tag.split("}")[-1] if "}" in block.tag else block.tag
         if tag == "tbl":
             table = _parse_table(block, doc)
             if table:
                 elements.append(table)
+            elements.extend(_drawing_images(block, store))
         elif tag == "p":
             para = _parse_paragraph(block, doc)
             if para:
                 elements.append(para)
+            elements.extend(_drawing_images(block, store))
 
-    return elements
+    return elements + _unique_images(found["footer"])
 
 def _iter_block_items(doc):
     """文書bodyの直下のブロック要素を出現順に取得"""
@@ -49,16 +491,9 @@ def _parse_paragraph(element, doc) -> Optional[DocElement]:
 
     style_name = para.style.name if para.style else ""
 
-    # 見出し判定
-    if style_name.startswith("Heading") or style_name.startswith("見出し"):
-        level = _extract_heading_level(style_name)
-        return DocElement(type="heading", content=text, level=level)
-
-    # Title / Subtitle スタイル
-    if style_name in ("Title", "タイトル"):
-        return DocElement(type="heading", content=text, level=1)
-    if style_name in ("Subtitle", "サブタイトル"):
-        return DocElement(type="heading", content=text, level=2)
+    heading = _heading_element(text, style_name)
+    if heading:
+        return heading
 
     # リスト判定
     if _is_list_item(para):
@@ -72,67 +507,59 @@ def _parse_paragraph(element, doc) -> Optional[DocElement]:
     return DocElement(type="paragraph", content=text,
                       metadata={"rich_text": rich_text})
 
-def _parse_table(element, doc) -> Optional[DocElement]:
-    """XMLテーブル要素をDocElementに変換する"""
-    from docx.table import Table
-    table = Table(element, doc)
-
-    rows_data = []
-    for row in table.rows:
-        row_cells = [cell.text.strip() for cell in row.cells]
-        # 結合セルの重複を除去
-        row_cells = _deduplicate_cells(row_cells, row)
-        rows_data.append(row_cells)
+def _store_image(source_part, r_id: str):
+    part = source_part.related_parts.get(r_id)
+    if part is None:
+        return "", None
+    name = part.partname.split("/")[-1]
+    return name, store_media(part.blob, name)
 
-    if not rows_data:
-        return None
+def _parse_table(element, doc) -> Optional[DocElement]:
+    """XMLテーブル要素をDocElementに変換する（結合セルの扱いは parse_table を参照）"""
+    return parse_table(element)
 
-    return DocElement(
-        type="table",
-        children=rows_data,
-        metadata={
-            "headers": rows_data[0] if rows_data else [],
-            "data_rows": rows_data[1:] if len(rows_data) > 1 else []
-        }
-    )
+def _heading_element(text: str, style_name: str) -> Optional[DocElement]:
+    # 見出し判定
+    if style_name.startswith("Heading") or style_name.startswith("見出し"):
+        level = _extract_heading_level(style_name)
+        return DocElement(type="heading", content=text, level=level)
 
-def _deduplicate_cells(cell_texts: List[str], row) -> List[str]:
-    """
-    python-docxの結合セルによる重複を除去する。
-    同じ _tc オブジェクトを複数回持つセルをスキップする。
-    """
-    seen = set()
-    unique = []
-    for i, cell in enumerate(row.cells):
-        cell_id = id(cell._tc)
-        if cell_id not in seen:
-            seen.add(cell_id)
-            unique.append(cell_texts[i] if i < len(cell_texts) else "")
-    return unique
+    # Title / Subtitle スタイル
+    if style_name in ("Title", "タイトル"):
+        return DocElement(type="heading", content=text, level=1)
+    if style_name in ("Subtitle", "サブタイトル"):
+        return DocElement(type="heading", content=text, level=2)
+    return None
 
 def _extract_heading_level(style_name: str) -> int:
     match = re.search(r"\d+", style_name)
     return min(int(match.group()) if match else 1, 3)
 
 def _is_list_item(para) -> bool:
-    numPr = para._element.find(qn("w:pPr/w:numPr"))
+    numPr = para._element.find(f"{qn('w:pPr')}/{qn('w:numPr')}")
     if numPr is not None:
         return True
     text = para.text.strip()
-    jp_bullets = ("・", "●", "○", "■", "□", "◆", "※", "→")
-    return text.startswith(jp_bullets)
+    return text.startswith(JP_BULLETS)
 
 def _get_list_style(para) -> str:
     style_name = para.style.name if para.style else ""
+    return _list_style(style_name, para.text.strip())
+
+def _list_style(style_name: str, text: str, num_format: Optional[str] = None) -> str:
+    """スタイル名 → 番号定義の書式（分かる場合）→ 先頭の番号の順に判定する"""
     if "Number" in style_name or "番号" in style_name:
         return "numbered"
-    text = para.text.strip()
+    if num_format == "bullet":
+        return "bullet"
+    if num_format and num_format != "none":
+        return "numbered"
     if re.match(r"^\d+[.）)]\s", text):
         return "numbered"
     return "bullet"
 
 def _get_indent_level(para) -> int:
-    numPr = para._element.find(qn("w:pPr/w:numPr"))
+    numPr = para._element.find(f"{qn('w:pPr')}/{qn('w:numPr')}")
     if numPr is not None:
         ilvl = numPr.find(qn("w:ilvl"))
         if ilvl is not None:
@@ -175,24 +602,6 @@ def _get_hyperlink(run) -> Optional[str]:
                 pass
     return None
 
-# --- .doc → .docx 変換 ---
-
-def convert_doc_to_docx(doc_path: str) -> str:
-    """LibreOfficeを使って.docを.docxに変換する"""
-    import subprocess, os
-    output_dir = os.path.dirname(doc_path)
-    result = subprocess.run(
-        ["libreoffice", "--headless", "--convert-to", "docx",
-         doc_path, "--outdir", output_dir],
-        capture_output=True, text=True, timeout=120
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"LibreOffice変換エラー: {result.stderr}")
-    docx_path = os.path.splitext(doc_path)[0] + ".docx"
-    if not os.path.exists(docx_path):
-        raise FileNotFoundError(f"変換後ファイルが見つかりません: {docx_path}")
-    return docx_path
-
 # --- mammothフォールバック ---
 
 def read_word_with_mammoth(file_path: str) -> str: